@@ -0,0 +1,323 @@
+import json
+import os
+import random
+from html import escape
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+PERSONS_SITE: str = "missingpersons.police.uk"
+PEOPLE_SITE: str = "missingpeople.org.uk"
+
+PERSONS_SEARCH_PATH: str = "/en-gb/case-search/"
+PEOPLE_SEARCH_PATH: str = "/appeal-search"
+
+MANIFEST: str = "manifest.json"
+
+
+def fixture_key(url: str) -> str:
+    """
+    Returns the key a page is stored under: its path and its query parameters in sorted order,
+    so the same page is found whatever order the parameters were written in.
+    Args:
+        url: absolute or relative URL of the page
+    Returns:
+        Key of the page in a fixture manifest
+    """
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if not parts.query:
+        return path
+    return f"{path}?{urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))}"
+
+
+class FixtureSite:
+    """
+    Recorded (or generated) pages of one website, stored as HTML files plus a manifest
+    mapping each page key to its file.
+    Args:
+        root:
+            str - fixture directory holding one sub-directory per site
+        site:
+            str - host name of the site, e.g. "missingpersons.police.uk"
+    """
+
+    def __init__(self, root: str, site: str):
+        self.path = os.path.join(root, site)
+        self.site = site
+
+        manifest_path = os.path.join(self.path, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest: Dict[str, str] = json.load(f)
+        else:
+            self.manifest = {}
+
+    def __len__(self) -> int:
+        return len(self.manifest)
+
+    def add(self, url: str, page_source: str) -> None:
+        """
+        Stores a page under the key of its URL.
+        """
+        file_name = f"pages/{len(self.manifest):06d}.html"
+        self.manifest[fixture_key(url)] = file_name
+
+        os.makedirs(os.path.join(self.path, "pages"), exist_ok=True)
+        with open(os.path.join(self.path, file_name), "w", encoding="utf-8") as f:
+            f.write(page_source)
+
+    def alias(self, url: str, stored_url: str) -> None:
+        """
+        Serves the page stored for stored_url under url as well.
+        """
+        self.manifest[fixture_key(url)] = self.manifest[fixture_key(stored_url)]
+
+    def read(self, url: str) -> Optional[bytes]:
+        """
+        Returns the stored page for a URL, or None if it was not recorded.
+        """
+        file_name = self.manifest.get(fixture_key(url))
+        if file_name is None:
+            return None
+        with open(os.path.join(self.path, file_name), "rb") as f:
+            return f.read()
+
+    def save(self) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, MANIFEST), "w") as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+
+
+# Value pools of the generated pages
+GENDERS = ["Male", "Female", "Unknown"]
+ETHNICITIES = ["White - North European", "Black", "Asian", "Unknown", ""]
+BUILDS = ["Slim", "Medium", "Large", ""]
+HAIR = ["Brown", "Black", "Grey", "Blonde", "Bald", ""]
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September",
+          "October", "November", "December"]
+CLOTHING = ["FOOTWEAR - TRAINERS - BLACK", "TOP - T-SHIRT - WHITE - PLAIN", "TROUSERS - JEANS - BLUE",
+            "COAT - PARKA - GREEN - CHECKED - HOODED", "UNDERWEAR - BOXER SHORTS - GREY"]
+FEATURES = ["TATTOO - ARM - LEFT - ROSE", "SCAR - FACE - CHEEK", "PIERCING - EAR - RIGHT - STUD",
+            "MARK - HAND - RIGHT - BIRTHMARK"]
+POSSESSIONS = ["(1) Wallet (1) Keys", "Mobile phone, Watch, Lighter", "(1) Rucksack", ""]
+ROADS = ["High Street", "Station Road", "Church Lane", ""]
+COUNTIES = ["KENT", "ESSEX", "DEVON", "CUMBRIA", ""]
+FINDERS = ["Member of public", "Police", "Dog walker", ""]
+
+
+def _entry(key: str, value: str) -> str:
+    return f'<div class="Entry"><div class="Key">{escape(key)}</div><div class="Value">{value}</div></div>'
+
+
+def _date(rng: random.Random) -> str:
+    return f"{rng.randint(1, 28)} {rng.choice(MONTHS)} {rng.randint(1970, 2023)}"
+
+
+def _lines(rng: random.Random, pool: List[str]) -> str:
+    return "<br>".join(escape(line) for line in rng.sample(pool, rng.randint(1, len(pool))))
+
+
+def generate_case_page(case_id: int, rng: random.Random) -> str:
+    """
+    Generates a case page laid out like the missingpersons.police.uk case pages.
+    """
+    min_age = rng.randint(15, 70)
+    entries = [
+        _entry("Date found", _date(rng)),
+        _entry("Body or remains", rng.choice(["Body", "Remains"])),
+        _entry("Eye colour", rng.choice(["Blue", "Brown", "Green", "Unknown"])),
+        _entry("Gender", rng.choice(GENDERS)),
+        _entry("Age range", f"{min_age} - {min_age + rng.randint(0, 20)}"),
+    ]
+    optional = [
+        ("Ethnicity", escape(rng.choice(ETHNICITIES))),
+        ("Height", f"{rng.randint(150, 195)}cm ({rng.randint(4, 6)}ft {rng.randint(0, 11)}in)"),
+        ("Build", rng.choice(BUILDS)),
+        ("Hair", rng.choice(HAIR)),
+        ("Estimated death", _date(rng)),
+        ("Clothing", _lines(rng, CLOTHING)),
+        ("Distinguishing features", _lines(rng, FEATURES)),
+        ("Possessions", escape(rng.choice(POSSESSIONS))),
+        ("Circumstances", "Found near the river bank by a member of the public."),
+    ]
+    entries.extend(_entry(key, value) for key, value in optional if value and rng.random() < 0.8)
+
+    location = "".join(
+        f'<span class="{class_name}">{escape(value)}</span>'
+        for class_name, value in (("Road", rng.choice(ROADS)), ("County", rng.choice(COUNTIES)),
+                                  ("Country", "England"))
+        if value
+    )
+    finder = rng.choice(FINDERS)
+    if finder:
+        location += f"<strong>{escape(finder)}</strong>"
+
+    return (
+        "<html><head><title>Case</title><script>var tracking = true;</script></head><body>\n"
+        f'<h1 class="PageTitle">Case Ref:\n {23 - case_id % 20:02d}-{case_id:06d} </h1>\n'
+        f'<div class="CaseData">\n{"".join(entries)}\n</div>\n'
+        f'<div class="CaseMap">{location}</div>\n'
+        "</body></html>"
+    )
+
+
+def generate_listing_tile(case_id: int, case_page: str) -> str:
+    """
+    Generates the listing tile of a case, summarising its case page. The scraper learns which
+    label holds which field from a few full cases (see learn_tile_labels), so the wording of the
+    labels is not shared with it.
+    """
+    from missing_individuals.missing_persons.common.parse_html import parse_case_page
+
+    raw_case = parse_case_page(case_page)
+    lines = [raw_case["CASE_NUMBER"], f"Gender: {raw_case['GENDER']}", f"Date found: {raw_case['DATE_FOUND']}"]
+    if raw_case.get("LOCATION_COUNTY"):
+        lines.append(f"Location: {raw_case['LOCATION_COUNTY'].title()}")
+
+    return f'<a href="/en-gb/case/{case_id}"><div class="Tile">{"<br>".join(escape(line) for line in lines)}</div></a>'
+
+
+def generate_listing_page(page: int, pages: int, tiles: List[str], total: int) -> str:
+    """
+    Generates a case-search listing page with its result count, Pagination banner and CaseGrid of
+    tiles. As on the live site, the banner only links the first, last and nearby pages, eliding
+    the rest, and ends with next/last anchors.
+    """
+    def page_href(n: int) -> str:
+        return "?" + urlencode({"perPage": 100, "page": n})
+
+    shown = sorted({1, pages} | set(range(max(1, page - 2), min(pages, page + 2) + 1)))
+    pagination = []
+    for previous, n in zip([0] + shown, shown):
+        if n - previous > 1:
+            pagination.append('<span>&hellip;</span>')
+        pagination.append(f'<a href="{page_href(n)}">{n}</a>')
+    pagination += [f'<a href="{page_href(min(page + 1, pages))}">Next</a>', f'<a href="{page_href(pages)}">Last</a>']
+
+    result_count = f"Showing {len(tiles)} of {total:,} results"
+
+    return (
+        "<html><body>\n"
+        '<div class="Dialog"><p>This site contains distressing content.</p><a href="#">Close</a></div>\n'
+        '<select id="setPerPage"><option>20 per page</option><option>100 per page</option></select>\n'
+        f'<p class="ResultCount">{result_count}</p>\n'
+        f'<div class="Pagination">{"".join(pagination)}</div>\n'
+        f'<div class="CaseGrid">{"".join(tiles)}</div>\n'
+        "</body></html>"
+    )
+
+
+def generate_appeal_page(appeal_id: int, rng: random.Random) -> str:
+    """
+    Generates an appeal page laid out like the missingpeople.org.uk appeal pages.
+    The last two list items (sharing links) are skipped by the scraper.
+    """
+    fields = [
+        ("Age", str(rng.randint(12, 80))),
+        ("Missing from", rng.choice(["London", "Leeds", "Bristol", "Glasgow"])),
+        ("Missing since", _date(rng)),
+        ("Gender", rng.choice(GENDERS)),
+    ]
+    items = "".join(f"<li><h2>{key}</h2><span>{escape(value)}</span></li>" for key, value in fields)
+    items += '<li><a href="#">Share on Facebook</a></li><li><a href="#">Share on X</a></li>'
+
+    return (
+        "<html><body>\n"
+        '<div class="modal"><button class="close">Close</button></div>\n'
+        f'<div class="main_content_cell"><h1>Appeal {appeal_id}</h1><ul>{items}</ul></div>\n'
+        "</body></html>"
+    )
+
+
+def generate_appeal_search_page(appeal_ids: List[int]) -> str:
+    links = "".join(f'<a href="/appeal/{appeal_id}">Appeal {appeal_id}</a>' for appeal_id in appeal_ids)
+    return (
+        "<html><body>\n"
+        '<div id="cookie-law-info-bar"><span>We use cookies.</span><a href="#">Accept</a></div>\n'
+        f'<div class="section__content">{links}</div>\n'
+        "</body></html>"
+    )
+
+
+def generate_fixtures(root: str, cases: int = 500, appeals: int = 200, per_page: int = 100, seed: int = 0) -> None:
+    """
+    Generates a deterministic set of fixture pages for both sites.
+    Args:
+        root: fixture directory to write into
+        cases: number of missingpersons.police.uk case pages
+        appeals: number of missingpeople.org.uk appeal pages
+        per_page: cases per listing page
+        seed: random seed of the generated values
+    """
+    rng = random.Random(seed)
+
+    persons = FixtureSite(root, PERSONS_SITE)
+    case_ids = list(range(1, cases + 1))
+    tiles = []
+    for case_id in case_ids:
+        case_page = generate_case_page(case_id, rng)
+        persons.add(f"/en-gb/case/{case_id}", case_page)
+        tiles.append(generate_listing_tile(case_id, case_page))
+
+    pages = max(1, -(-cases // per_page))
+    for page in range(1, pages + 1):
+        listing_url = f"{PERSONS_SEARCH_PATH}?{urlencode({'perPage': 100, 'page': page})}"
+        page_tiles = tiles[(page - 1) * per_page:page * per_page]
+        persons.add(listing_url, generate_listing_page(page, pages, page_tiles, total=cases))
+
+    # The first listing page is also served for the bare and page-size-only search URLs
+    first_page = f"{PERSONS_SEARCH_PATH}?{urlencode({'perPage': 100, 'page': 1})}"
+    persons.alias(PERSONS_SEARCH_PATH, first_page)
+    persons.alias(f"{PERSONS_SEARCH_PATH}?{urlencode({'perPage': 100})}", first_page)
+    persons.save()
+
+    people = FixtureSite(root, PEOPLE_SITE)
+    appeal_ids = list(range(1, appeals + 1))
+    people.add(f"{PEOPLE_SEARCH_PATH}?loaded=100", generate_appeal_search_page(appeal_ids))
+    for appeal_id in appeal_ids:
+        people.add(f"/appeal/{appeal_id}", generate_appeal_page(appeal_id, rng))
+    people.save()
+
+
+def record_fixtures(root: str, cases: int = 200, appeals: int = 100) -> None:
+    """
+    Records the live listing pages and the first case and appeal pages of both sites, so the
+    benchmarks can be run against real markup.
+    Args:
+        root: fixture directory to write into
+        cases: maximum number of case pages to record
+        appeals: maximum number of appeal pages to record
+    """
+    from missing_individuals.missing_people.common.extract_all import ExtractMissingPeople
+    from missing_individuals.missing_people.common.parse_html import parse_appeal_urls
+    from missing_individuals.missing_persons.common.extract_urls import ExtractMissingPersonsUrls
+    from missing_individuals.missing_persons.common.parse_html import parse_listing_case_urls
+    from missing_individuals.utils.fetch import HttpFetchBackend
+    from missing_individuals.utils.parsing import make_soup
+
+    persons = FixtureSite(root, PERSONS_SITE)
+    with HttpFetchBackend(cookies=ExtractMissingPersonsUrls.WARNING_COOKIE) as backend:
+        search_url = ExtractMissingPersonsUrls.build_search_url()
+        search_page = backend.get(search_url)
+        persons.add(search_url, search_page)
+        persons.alias(ExtractMissingPersonsUrls.URL, search_url)
+
+        search_soup = make_soup(search_page)
+        case_urls = parse_listing_case_urls(search_soup, base_url=search_url)
+        for url in ExtractMissingPersonsUrls.listing_page_urls(search_soup, url=search_url)[1:]:
+            page_source = backend.get(url)
+            persons.add(url, page_source)
+            case_urls.extend(parse_listing_case_urls(page_source, base_url=url))
+
+        for url in case_urls[:cases]:
+            persons.add(url, backend.get(url))
+    persons.save()
+
+    people = FixtureSite(root, PEOPLE_SITE)
+    with HttpFetchBackend() as backend:
+        search_page = backend.get(ExtractMissingPeople.URL)
+        people.add(ExtractMissingPeople.URL, search_page)
+
+        for url in parse_appeal_urls(search_page, base_url=ExtractMissingPeople.URL)[:appeals]:
+            people.add(url, backend.get(url))
+    people.save()
@@ -0,0 +1,111 @@
+import resource
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+PERCENTILES: Tuple[int, ...] = (50, 90, 99)
+
+
+def peak_rss_mb() -> float:
+    """
+    Returns the peak resident set size of this process so far, in MB. Browser processes are
+    not included.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return round(peak / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)
+
+
+class RoundTripCounter:
+    """
+    Counts the commands a webdriver sends to the browser. Element lookups, waits, clicks and text
+    reads of the driver's elements all go through driver.execute, so each call is one round trip.
+    Args:
+        driver:
+            webdriver.Chrome - driver to count the commands of
+    """
+
+    def __init__(self, driver):
+        self.count = 0
+        execute = driver.execute
+
+        def counted_execute(*args, **kwargs):
+            self.count += 1
+            return execute(*args, **kwargs)
+
+        driver.execute = counted_execute
+
+    def __call__(self) -> int:
+        return self.count
+
+
+def measure(
+    func: Callable[[Any], Any],
+    items: Sequence[Any],
+    round_trips: Optional[Callable[[], int]] = None,
+    count: Optional[int] = None,
+) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    Calls func on each item in turn, timing every call.
+    Args:
+        func: function to benchmark
+        items: arguments func is called with, one call each
+        round_trips: optional callable returning a running count of requests or driver commands
+        count: number of items processed, if it differs from the number of calls (batch functions)
+    Returns:
+        The results of func, and a report of the throughput, latency percentiles, round trips
+        per item and the peak RSS
+    """
+    results = []
+    latencies = []
+    trips_before = round_trips() if round_trips is not None else None
+
+    started = time.perf_counter()
+    for item in items:
+        call_started = time.perf_counter()
+        results.append(func(item))
+        latencies.append(time.perf_counter() - call_started)
+    seconds = time.perf_counter() - started
+
+    count = len(items) if count is None else count
+    latencies_ms = np.array(latencies) * 1000
+
+    report = {
+        "items": count,
+        "seconds": round(seconds, 4),
+        "items_per_sec": round(count / seconds, 2) if seconds > 0 else None,
+        "latency_ms": {
+            **{f"p{p}": round(float(np.percentile(latencies_ms, p)), 3) for p in PERCENTILES},
+            "max": round(float(latencies_ms.max()), 3),
+        } if latencies else None,
+        "round_trips_per_item": (
+            round((round_trips() - trips_before) / count, 2) if round_trips is not None and count else None
+        ),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    return results, report
+
+
+def compare_reports(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compares the throughput of each benchmark with a baseline report.
+    Args:
+        report: benchmark report of this run
+        baseline: earlier benchmark report
+        tolerance: fraction by which throughput may drop before it counts as a regression
+    Returns:
+        Descriptions of the benchmarks that regressed
+    """
+    regressions = []
+    for name, result in report["benchmarks"].items():
+        before = baseline.get("benchmarks", {}).get(name)
+        if not before or not before.get("items_per_sec") or not result.get("items_per_sec"):
+            continue
+
+        if result["items_per_sec"] < before["items_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {result['items_per_sec']} items/sec, down from {before['items_per_sec']}"
+            )
+    return regressions
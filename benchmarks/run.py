@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the scrapers and the case engineering against fixture pages served locally")
+    parser.add_argument(
+        '--fixtures', default=None,
+        help="Fixture directory, one sub-directory per site (defaults to data/benchmark_fixtures)")
+    parser.add_argument(
+        '--generate', action='store_true',
+        help="(Re)generate synthetic fixture pages before running")
+    parser.add_argument(
+        '--record', action='store_true',
+        help="Record the live listing, case and appeal pages as fixtures before running")
+    parser.add_argument(
+        '--cases', type=int, default=500,
+        help="Number of case pages to generate or record")
+    parser.add_argument(
+        '--appeals', type=int, default=200,
+        help="Number of appeal pages to generate or record")
+    parser.add_argument(
+        '--engineer-rows', type=int, default=20000,
+        help="Number of raw cases the engineering benchmarks clean (fixture cases repeated)")
+    parser.add_argument(
+        '--chrome', action='store_true',
+        help="Also benchmark the Chrome scrapers (needs Chrome installed)")
+    parser.add_argument(
+        '--output', default=None,
+        help="Path of the JSON report (defaults to data/benchmarks/benchmark_<timestamp>.json)")
+    parser.add_argument(
+        '--baseline', default=None,
+        help="Earlier JSON report to compare throughput against; exits non-zero on a regression")
+    parser.add_argument(
+        '--tolerance', type=float, default=0.2,
+        help="Fraction by which throughput may drop below the baseline (with --baseline)")
+    parser.add_argument(
+        '--lean-browser', action='store_true',
+        help="Run Chrome headless with eager page loads, a small window, no extensions and no images, "
+             "stylesheets, fonts or media")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+
+    args = parse_args(argv)
+
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+    from benchmarks.fixtures import (PEOPLE_SEARCH_PATH, PEOPLE_SITE, PERSONS_SEARCH_PATH,
+                                     PERSONS_SITE, FixtureSite, generate_fixtures, record_fixtures)
+    from benchmarks.measure import RoundTripCounter, compare_reports, measure
+    from benchmarks.server import FixtureServer
+
+    import missing_individuals.utils.utils as utils
+    from missing_individuals import BuildRawData, EngineerRawData, ExtractMissingPersonsUrls
+    from missing_individuals.missing_people.common.extract_all import ExtractMissingPeople
+    from missing_individuals.missing_people.common.parse_html import parse_appeal_page, parse_appeal_urls
+    from missing_individuals.missing_persons.common.case_record import CaseRecord
+    from missing_individuals.missing_persons.common.parse_html import parse_case_page
+    from missing_individuals.missing_persons.common.summary import TILE_FIELDS, learn_tile_labels, summarise_tile
+    from missing_individuals.utils.fetch import HttpFetchBackend
+
+    data_path, chromedriver_path = utils.build_dirs()
+    fixtures = args.fixtures or f"{data_path}/benchmark_fixtures"
+
+    if args.record:
+        record_fixtures(fixtures, cases=args.cases, appeals=args.appeals)
+    elif args.generate or not os.path.exists(os.path.join(fixtures, PERSONS_SITE)):
+        generate_fixtures(fixtures, cases=args.cases, appeals=args.appeals)
+
+    benchmarks: Dict[str, Dict[str, Any]] = {}
+    parity: Dict[str, bool] = {}
+
+    persons_server = FixtureServer(FixtureSite(fixtures, PERSONS_SITE)).start()
+    people_server = FixtureServer(FixtureSite(fixtures, PEOPLE_SITE)).start()
+
+    def server_requests(server: FixtureServer):
+        return lambda: server.requests
+
+    # missingpersons.police.uk over HTTP
+    with HttpFetchBackend(base_url=persons_server.url, cookies=ExtractMissingPersonsUrls.WARNING_COOKIE) as backend:
+        extract = ExtractMissingPersonsUrls(backend=backend)
+        extract.return_page_urls()
+
+        listings, benchmarks['persons_listing_http'] = measure(
+            extract.extract_page_case_tiles, extract.page_urls, round_trips=server_requests(persons_server))
+        tiles = [tile for listing in listings for tile in listing]
+        case_urls = [tile["URL"] for tile in tiles]
+
+        raw_cases, benchmarks['persons_cases_http'] = measure(
+            lambda url: parse_case_page(backend.get(url)), case_urls, round_trips=server_requests(persons_server))
+
+    # missingpeople.org.uk over HTTP
+    with HttpFetchBackend(base_url=people_server.url) as backend:
+        (appeal_urls,), benchmarks['people_listing_http'] = measure(
+            lambda url: parse_appeal_urls(backend.get(url), base_url=url), [ExtractMissingPeople.URL],
+            round_trips=server_requests(people_server))
+
+        appeals, benchmarks['people_appeals_http'] = measure(
+            lambda url: parse_appeal_page(backend.get(url)), appeal_urls, round_trips=server_requests(people_server))
+
+    if args.chrome:
+        from missing_individuals.utils.browser import build_chrome_driver
+
+        driver = build_chrome_driver(chromedriver_path=chromedriver_path, headless=True, lean=args.lean_browser)
+        driver_round_trips = RoundTripCounter(driver)
+
+        # The scrapers navigate to their class URL, so point it at the local server
+        LocalPersonsUrls = type(
+            "LocalPersonsUrls", (ExtractMissingPersonsUrls,), {"URL": persons_server.url + PERSONS_SEARCH_PATH})
+        LocalPeople = type(
+            "LocalPeople", (ExtractMissingPeople,),
+            {"URL": f"{people_server.url}{PEOPLE_SEARCH_PATH}?loaded={ExtractMissingPeople.LOADED_PAGES}"})
+
+        def local_url(url: str, server: FixtureServer) -> str:
+            return HttpFetchBackend(base_url=server.url).rebase_url(url)
+
+        try:
+            extract = LocalPersonsUrls(driver=driver)
+            extract.return_page_urls()
+            _, benchmarks['persons_listing_chrome'] = measure(
+                extract.extract_page_case_urls, extract.page_urls, round_trips=driver_round_trips)
+
+            chrome_urls = [local_url(url, persons_server) for url in case_urls]
+            for name, snapshot in (('persons_cases_chrome_elements', False), ('persons_cases_chrome_snapshot', True)):
+
+                def build_case(url: str) -> Dict[str, str]:
+                    driver.get(url)
+                    return BuildRawData(driver=driver, snapshot=snapshot).build_raw_case_dict()
+
+                chrome_cases, benchmarks[name] = measure(build_case, chrome_urls, round_trips=driver_round_trips)
+                parity[f"{name}_matches_http"] = chrome_cases == raw_cases
+
+            people = LocalPeople(driver=driver)
+            _, benchmarks['people_listing_chrome'] = measure(
+                lambda _: people.extract_all_urls(), [people.URL], round_trips=driver_round_trips)
+
+            chrome_appeals, benchmarks['people_appeals_chrome'] = measure(
+                people.extract_data_from_url, people.url_list, round_trips=driver_round_trips)
+            parity['people_appeals_chrome_matches_http'] = chrome_appeals == appeals
+        finally:
+            driver.quit()
+
+    persons_server.stop()
+    people_server.stop()
+
+    # Engineering, on the fixture cases repeated up to engineer_rows
+    engineer_input = (raw_cases * (args.engineer_rows // max(len(raw_cases), 1) + 1))[:args.engineer_rows]
+
+    clean_cases, benchmarks['engineer_rows'] = measure(
+        lambda raw: EngineerRawData.format_raw_case_dict(case_date_dict=raw), engineer_input)
+    (clean_frame,), benchmarks['engineer_frame'] = measure(
+        EngineerRawData.format_raw_case_frame, [engineer_input], count=len(engineer_input))
+    parity['engineer_frame_matches_rows'] = clean_frame.to_dict('records') == clean_cases
+
+    # Records must give back exactly the cleaned case, including empty descriptors and possessions
+    record_cases = clean_cases[:1000] + [
+        {**case, 'DISTINGUISHING_FEATURES': {}, 'CLOTHING': {}, 'POSSESSIONS': []} for case in clean_cases[:1]]
+    parity['case_records_round_trip'] = all(
+        CaseRecord.from_dict(case).to_dict() == case for case in record_cases)
+
+    # Summaries, read with the tile labels learned from the first cases, must agree with every full case
+    cases = [EngineerRawData.format_raw_case_dict(case_date_dict=raw) for raw in raw_cases]
+    labels = learn_tile_labels(tiles[:5], cases[:5])
+    summaries = [summarise_tile(tile, labels=labels) for tile in tiles]
+    parity['summaries_match_cases'] = set(labels.values()) == set(TILE_FIELDS) and all(
+        summary[field] == case[case_field]
+        for summary, case in zip(summaries, cases) for field, case_field in TILE_FIELDS.items())
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "fixtures": {"cases": len(case_urls), "appeals": len(appeal_urls)},
+        "benchmarks": benchmarks,
+        "parity": parity,
+    }
+
+    output = args.output or f"{data_path}/benchmarks/benchmark_{datetime.now().strftime('%Y_%m_%d_%H%M%S')}.json"
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, result in benchmarks.items():
+        latency = result["latency_ms"] or {}
+        print(f"{name:32} {result['items']:>7} items {result['items_per_sec'] or 0:>10.1f}/s "
+              f"p50 {latency.get('p50', 0):>8.2f}ms p99 {latency.get('p99', 0):>8.2f}ms "
+              f"round trips {result['round_trips_per_item'] if result['round_trips_per_item'] is not None else '-'}")
+    print(f"Report written to {output}")
+
+    failures = [f"Parity check failed: {name}" for name, ok in parity.items() if not ok]
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures += compare_reports(report, json.load(f), tolerance=args.tolerance)
+
+    for failure in failures:
+        print(failure)
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
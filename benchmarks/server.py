@@ -0,0 +1,74 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.fixtures import FixtureSite
+
+
+class FixtureServer:
+    """
+    Local HTTP server standing in for one website, serving its fixture pages from a background
+    thread. Pages that were not recorded get a 404.
+    Args:
+        site:
+            FixtureSite - pages to serve
+        host:
+            str - interface to listen on
+        port:
+            int - port to listen on; 0 picks a free one
+    """
+
+    def __init__(self, site: FixtureSite, host: str = "127.0.0.1", port: int = 0):
+        self.site = site
+        self.requests = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this each keep-alive
+            # response waits out the client's delayed ACK
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                server.requests += 1
+                body = server.site.read(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FixtureServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -1,7 +1,31 @@
+import importlib
+from typing import TYPE_CHECKING
+
 from .missing_persons.common.engineer_case_data import EngineerRawData
-from .missing_persons.common.extract_case_files import BuildRawData
-from .missing_persons.common.extract_urls import ExtractMissingPersonsUrls
+
+if TYPE_CHECKING:
+    from .missing_persons.common.extract_case_files import BuildRawData
+    from .missing_persons.common.extract_urls import ExtractMissingPersonsUrls
+
+# Scraping classes pull in selenium, so they are only imported on first use
+_LAZY_IMPORTS = {
+    'BuildRawData': '.missing_persons.common.extract_case_files',
+    'ExtractMissingPersonsUrls': '.missing_persons.common.extract_urls',
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
+
 
 __all__ = [
-    EngineerRawData, BuildRawData, ExtractMissingPersonsUrls,
+    'EngineerRawData', 'BuildRawData', 'ExtractMissingPersonsUrls',
 ]
@@ -0,0 +1,8 @@
+from .blocking import BlockingIndex
+from .link import link_records
+from .prepare import prepare_appeals, prepare_cases
+from .scoring import score_candidates
+
+__all__ = [
+    BlockingIndex, link_records, prepare_appeals, prepare_cases, score_candidates,
+]
@@ -0,0 +1,120 @@
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .prepare import AREA, DAY, as_array
+
+DAYS_PER_YEAR: float = 365.25
+
+# Block of appeals whose age or area is unknown; every case is compared with it
+UNKNOWN: int = -1
+
+
+def expand_ranges(lo: np.ndarray, hi: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Expands per-row ranges [lo, hi) into (row, position) pairs without a Python loop.
+    Args:
+        lo: start of each row's range
+        hi: end (exclusive) of each row's range
+    Returns:
+        Arrays of the row and the position of every pair
+    """
+    counts = np.maximum(hi - lo, 0)
+    starts = np.cumsum(counts) - counts
+    rows = np.repeat(np.arange(len(lo)), counts)
+    positions = np.repeat(lo - starts, counts) + np.arange(counts.sum())
+    return rows, positions
+
+
+class BlockingIndex:
+    """
+    Index of appeals for generating candidate case pairs without comparing every appeal with
+    every case. Appeals are grouped into blocks by age band (and optionally by area), and the
+    appeals of each block are sorted by the day they went missing. For each case, only the blocks
+    whose ages could have grown into the case's age range are searched, and within each block only
+    the appeals that went missing in the max_years before the case was found (a binary search).
+    Appeals without a missing date cannot be placed in a window and are never paired.
+    Args:
+        appeals:
+            pd.DataFrame - appeals from prepare_appeals
+        band_width:
+            int - years per age band
+        by_area:
+            bool - only pair appeals and cases from the same area; a side whose area is unknown
+            is paired with every area
+    """
+
+    def __init__(self, appeals: pd.DataFrame, band_width: int = 5, by_area: bool = False):
+        self.band_width = band_width
+        self.by_area = by_area
+        self.size = len(appeals)
+
+        days = as_array(appeals[DAY])
+        ages = as_array(appeals["AGE"])
+
+        bands = np.full(len(appeals), UNKNOWN)
+        known_age = ~np.isnan(ages)
+        bands[known_age] = np.floor(ages[known_age] / band_width).astype(int)
+
+        if by_area:
+            area_codes, self.areas = pd.factorize(appeals[AREA])
+        else:
+            area_codes, self.areas = np.full(len(appeals), UNKNOWN), pd.Index([])
+
+        self.blocks: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray]] = {}
+        dated = np.flatnonzero(~np.isnan(days))
+        keys = pd.DataFrame({"area": area_codes[dated], "band": bands[dated]})
+        for (area, band), members in keys.groupby(["area", "band"]).indices.items():
+            positions = dated[members]
+            order = np.argsort(days[positions], kind="stable")
+            self.blocks[(int(area), int(band))] = (days[positions][order], positions[order])
+
+    def candidates(
+        self, cases: pd.DataFrame, max_years: float = 30, age_tolerance: float = 5
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Generates the candidate pairs of appeals and cases.
+        Args:
+            cases: cases from prepare_cases
+            max_years: longest time between going missing and being found that is considered
+            age_tolerance: years by which an age may fall outside a case's estimated age range
+        Returns:
+            Arrays of the appeal positions and case positions (iloc) of every candidate pair
+        """
+        days = as_array(cases[DAY])
+        min_age = np.nan_to_num(as_array(cases["MIN_AGE"]), nan=-np.inf) - age_tolerance
+        max_age = np.nan_to_num(as_array(cases["MAX_AGE"]), nan=np.inf) + age_tolerance
+        max_days = max_years * DAYS_PER_YEAR
+
+        if self.by_area:
+            case_areas = self.areas.get_indexer(cases[AREA])
+            unknown_area = cases[AREA].isna().to_numpy()
+
+        dated = ~np.isnan(days)
+        appeal_positions, case_positions = [], []
+        for (area, band), (block_days, positions) in self.blocks.items():
+            mask = dated.copy()
+
+            # Someone aged a when they went missing is aged a to a + max_years when found
+            if band != UNKNOWN:
+                band_low, band_high = band * self.band_width, (band + 1) * self.band_width
+                mask &= (band_low <= max_age) & (band_high + max_years >= min_age)
+
+            if self.by_area and area != UNKNOWN:
+                mask &= (case_areas == area) | unknown_area
+
+            selected = np.flatnonzero(mask)
+            if not len(selected):
+                continue
+
+            lo = np.searchsorted(block_days, days[selected] - max_days, side="left")
+            hi = np.searchsorted(block_days, days[selected], side="right")
+            rows, block_positions = expand_ranges(lo, hi)
+
+            appeal_positions.append(positions[block_positions])
+            case_positions.append(selected[rows])
+
+        if not appeal_positions:
+            return np.array([], dtype=int), np.array([], dtype=int)
+        return np.concatenate(appeal_positions), np.concatenate(case_positions)
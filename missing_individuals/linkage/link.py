@@ -0,0 +1,75 @@
+from typing import Dict, Optional, Union
+
+import pandas as pd
+
+from .blocking import BlockingIndex
+from .prepare import prepare_appeals, prepare_cases
+from .scoring import WEIGHTS, score_candidates
+
+
+def link_records(
+    appeals: Union[pd.DataFrame, str],
+    cases: Union[pd.DataFrame, str],
+    max_years: float = 30,
+    age_tolerance: float = 5,
+    band_width: int = 5,
+    by_area: bool = False,
+    half_life_years: float = 2,
+    weights: Dict[str, float] = WEIGHTS,
+    top_k: Optional[int] = 10,
+    min_score: float = 0,
+) -> pd.DataFrame:
+    """
+    Ranks the unidentified person cases that could be each missing person.
+    Candidate pairs come from a BlockingIndex (age bands, an optional area block and a window of
+    max_years before each case was found). Pairs with an estimated age more than age_tolerance
+    years outside the case's age range are dropped, and the rest are scored by score_candidates.
+    Args:
+        appeals: missing people appeals (data frame or CSV path), as scraped by ExtractMissingPeople
+        cases: cleaned cases (data frame or CSV path), as produced by EngineerRawData
+        max_years: longest time between going missing and being found that is considered
+        age_tolerance: years by which an estimated age may fall outside a case's age range
+        band_width: years per age band of the blocking index
+        by_area: only pair appeals and cases from the same area
+        half_life_years: years between going missing and being found at which the date score halves
+        weights: weight of each feature score
+        top_k: number of candidates kept per appeal (all if None)
+        min_score: lowest score kept
+    Returns:
+        Data frame of candidate pairs, best first, with the appeal's NAME and REFERENCE_NO, the
+        CASE_NUMBER, the feature scores, SCORE and the RANK of the case among the appeal's
+        candidates; APPEAL_INDEX and CASE_INDEX are the index labels of the inputs
+    """
+    appeals = prepare_appeals(appeals)
+    cases = prepare_cases(cases)
+
+    index = BlockingIndex(appeals, band_width=band_width, by_area=by_area)
+    appeal_positions, case_positions = index.candidates(cases, max_years=max_years, age_tolerance=age_tolerance)
+
+    scores = score_candidates(
+        appeals, cases, appeal_positions, case_positions,
+        age_tolerance=age_tolerance, half_life_years=half_life_years, weights=weights,
+    )
+
+    # Blocks are coarse, so drop the pairs whose exact age is out of range
+    compatible = (scores["AGE_SCORE"] > 0) & (scores["SCORE"] >= min_score)
+    scores = scores[compatible]
+
+    scores = scores.sort_values(["APPEAL_POSITION", "SCORE"], ascending=[True, False], kind="stable")
+    scores["RANK"] = scores.groupby("APPEAL_POSITION").cumcount() + 1
+    if top_k is not None:
+        scores = scores[scores["RANK"] <= top_k]
+
+    appeal_rows = scores["APPEAL_POSITION"].to_numpy()
+    case_rows = scores["CASE_POSITION"].to_numpy()
+    links = pd.DataFrame({
+        "APPEAL_INDEX": appeals.index[appeal_rows],
+        "NAME": appeals["NAME"].to_numpy()[appeal_rows],
+        "REFERENCE_NO": appeals["REFERENCE_NO"].to_numpy()[appeal_rows],
+        "CASE_INDEX": cases.index[case_rows],
+        "CASE_NUMBER": cases["CASE_NUMBER"].to_numpy()[case_rows],
+    })
+    for column in ("ELAPSED_YEARS", "ESTIMATED_AGE", "AGE_SCORE", "DATE_SCORE", "LOCATION_SCORE", "SCORE", "RANK"):
+        links[column] = scores[column].to_numpy()
+
+    return links.sort_values(["SCORE", "RANK"], ascending=[False, True], kind="stable", ignore_index=True)
@@ -0,0 +1,102 @@
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+# Format of MISSING SINCE on missingpeople.org.uk appeals
+MISSING_SINCE_FORMAT: str = "%d/%m/%Y"
+
+# Columns shared by prepared appeals and cases
+LOCATION = "LOCATION"
+AREA = "AREA"
+DAY = "DAY"
+
+
+def _normalise_columns(df: pd.DataFrame) -> pd.DataFrame:
+    # Appeals are written with the headings as scraped ("AGE AT DISAPPEARANCE")
+    return df.rename(columns=lambda column: str(column).strip().upper().replace(" ", "_"))
+
+
+def _days(dates: pd.Series) -> pd.Series:
+    """
+    Days since the epoch, as floats so that missing dates are NaN.
+    """
+    return (dates - pd.Timestamp("1970-01-01")) / pd.Timedelta(days=1)
+
+
+def _location_key(text: pd.Series) -> pd.Series:
+    return text.astype("string").str.lower().str.replace(r"[^a-z ]", " ", regex=True) \
+        .str.split().str.join(" ").replace("", pd.NA)
+
+
+def prepare_appeals(appeals: Union[pd.DataFrame, str]) -> pd.DataFrame:
+    """
+    Brings missing people appeals (from ExtractMissingPeople) into the shape used for linkage.
+    Args:
+        appeals: data frame of appeals, or the path of an appeals CSV
+    Returns:
+        Data frame on the appeals' index with:
+            NAME, REFERENCE_NO
+            AGE - age at disappearance (float, NaN if unknown)
+            DAY - day they went missing, in days since the epoch (float, NaN if unknown)
+            LOCATION - normalised "missing from" text, e.g. "stratford upon avon warwickshire"
+            AREA - its last part (county or city), e.g. "warwickshire"
+    """
+    if isinstance(appeals, str):
+        appeals = pd.read_csv(appeals, dtype=str)
+    appeals = _normalise_columns(appeals)
+
+    missing_from = appeals.get("MISSING_FROM", pd.Series(pd.NA, index=appeals.index)).astype("string")
+
+    return pd.DataFrame({
+        "NAME": appeals.get("NAME"),
+        "REFERENCE_NO": appeals.get("REFERENCE_NO"),
+        "AGE": pd.to_numeric(appeals.get("AGE_AT_DISAPPEARANCE"), errors="coerce"),
+        DAY: _days(pd.to_datetime(appeals.get("MISSING_SINCE"), format=MISSING_SINCE_FORMAT, errors="coerce")),
+        LOCATION: _location_key(missing_from),
+        AREA: _location_key(missing_from.str.split(",").str[-1]),
+    }, index=appeals.index)
+
+
+def prepare_cases(cases: Union[pd.DataFrame, str]) -> pd.DataFrame:
+    """
+    Brings cleaned unidentified person cases (from EngineerRawData) into the shape used for linkage.
+    Args:
+        cases: data frame of cleaned cases, or the path of a cases CSV
+    Returns:
+        Data frame on the cases' index with:
+            CASE_NUMBER, GENDER
+            MIN_AGE, MAX_AGE - estimated age range (floats, NaN if unknown)
+            HEIGHT_CM - height (float, NaN if unknown)
+            DAY - day they were found, in days since the epoch (float, NaN if unknown)
+            LOCATION - normalised road, county and country
+            AREA - normalised county
+    """
+    if isinstance(cases, str):
+        cases = pd.read_csv(cases, dtype=str)
+    cases = _normalise_columns(cases)
+
+    def column(name: str) -> pd.Series:
+        return cases[name] if name in cases else pd.Series(pd.NA, index=cases.index, dtype="string")
+
+    location = column("LOCATION_ROAD").astype("string").fillna("") + " " \
+        + column("LOCATION_COUNTY").astype("string").fillna("") + " " \
+        + column("LOCATION_COUNTRY").astype("string").fillna("")
+
+    return pd.DataFrame({
+        "CASE_NUMBER": column("CASE_NUMBER"),
+        "GENDER": column("GENDER"),
+        "MIN_AGE": pd.to_numeric(column("MIN_AGE"), errors="coerce").astype(float),
+        "MAX_AGE": pd.to_numeric(column("MAX_AGE"), errors="coerce").astype(float),
+        "HEIGHT_CM": pd.to_numeric(column("HEIGHT_CM"), errors="coerce").astype(float),
+        DAY: _days(pd.to_datetime(column("DATE_FOUND"), errors="coerce")),
+        LOCATION: _location_key(location),
+        AREA: _location_key(column("LOCATION_COUNTY")),
+    }, index=cases.index)
+
+
+def as_array(column: pd.Series) -> np.ndarray:
+    """
+    Float array of a numeric column, with NaN for missing values.
+    """
+    return column.to_numpy(dtype=float, na_value=np.nan)
@@ -0,0 +1,75 @@
+import argparse
+import os
+from datetime import date
+from typing import List, Optional
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(
+        description="Rank the unidentified person cases that could be each missing people appeal")
+    parser.add_argument(
+        '--appeals', required=True,
+        help="CSV or Parquet file of missing people appeals")
+    parser.add_argument(
+        '--cases', required=True,
+        help="CSV or Parquet file of cleaned unidentified person cases")
+    parser.add_argument(
+        '--output', default=None,
+        help="CSV file the candidate pairs are written to (defaults to data/linkage_<date>.csv)")
+    parser.add_argument(
+        '--max-years', type=float, default=30,
+        help="Longest time between going missing and being found that is considered")
+    parser.add_argument(
+        '--age-tolerance', type=float, default=5,
+        help="Years by which an estimated age may fall outside a case's age range")
+    parser.add_argument(
+        '--by-area', action='store_true',
+        help="Only pair appeals and cases from the same county or city")
+    parser.add_argument(
+        '--top-k', type=int, default=10,
+        help="Number of candidate cases kept per appeal")
+    parser.add_argument(
+        '--min-score', type=float, default=0,
+        help="Lowest score kept")
+
+    return parser.parse_args(argv)
+
+
+def read_table(path: str):
+    import pandas as pd
+
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, dtype=str)
+
+
+def main(argv: Optional[List[str]] = None):
+
+    args = parse_args(argv)
+
+    import missing_individuals.utils.utils as utils
+    from missing_individuals.linkage import link_records
+
+    links = link_records(
+        read_table(args.appeals),
+        read_table(args.cases),
+        max_years=args.max_years,
+        age_tolerance=args.age_tolerance,
+        by_area=args.by_area,
+        top_k=args.top_k,
+        min_score=args.min_score,
+    )
+
+    output = args.output
+    if output is None:
+        data_path = utils.build_dirs()[0]
+        output = f"{data_path}/linkage_{date.today().strftime('%Y_%m_%d')}.csv"
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    links.to_csv(output, index=False)
+    print(f"Wrote {len(links)} candidate pairs for {links['APPEAL_INDEX'].nunique()} appeals to {output}")
+
+
+if __name__ == "__main__":
+    main()
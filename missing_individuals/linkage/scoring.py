@@ -0,0 +1,119 @@
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .blocking import DAYS_PER_YEAR
+from .prepare import AREA, DAY, LOCATION, as_array
+
+# Weight of each feature score in the overall score
+WEIGHTS: Dict[str, float] = {"AGE_SCORE": 0.4, "DATE_SCORE": 0.3, "LOCATION_SCORE": 0.3}
+
+# Feature score given when one side of a pair is unknown
+UNKNOWN_SCORE: float = 0.5
+
+
+def _place_codes(places: pd.DataFrame) -> Tuple[np.ndarray, list]:
+    """
+    Codes each row of a side by its distinct (LOCATION, AREA), with None for unknown text.
+    """
+    codes, uniques = pd.MultiIndex.from_frame(places[[LOCATION, AREA]].astype(object)).factorize()
+    distinct = [tuple(None if pd.isna(part) else part for part in place) for place in uniques]
+    return codes, distinct
+
+
+def _location_score(appeal_place: tuple, case_place: tuple) -> float:
+    (appeal_location, appeal_area), (case_location, case_area) = appeal_place, case_place
+    if appeal_location is None or case_location is None:
+        return UNKNOWN_SCORE
+    if appeal_area is not None and appeal_area == case_area:
+        return 1.0
+
+    appeal_words, case_words = f" {appeal_location} ", f" {case_location} "
+    if (appeal_area is not None and f" {appeal_area} " in case_words) \
+            or (case_area is not None and f" {case_area} " in appeal_words):
+        return 0.75
+    return 0.0
+
+
+def _location_scores(
+    appeals: pd.DataFrame, cases: pd.DataFrame, appeal_positions: np.ndarray, case_positions: np.ndarray
+) -> np.ndarray:
+    """
+    Scores how well the places of each pair agree: 1 for the same area, 0.75 when the area of one
+    side is named in the location of the other, UNKNOWN_SCORE when either is unknown and 0 otherwise.
+    Text is only compared once per distinct combination of places.
+    """
+    if not len(appeal_positions):
+        return np.array([], dtype=float)
+
+    appeal_codes, appeal_places = _place_codes(appeals)
+    case_codes, case_places = _place_codes(cases)
+
+    pair_codes = appeal_codes[appeal_positions].astype(np.int64) * max(len(case_places), 1) \
+        + case_codes[case_positions]
+    distinct, inverse = np.unique(pair_codes, return_inverse=True)
+
+    distinct_scores = np.array([
+        _location_score(appeal_places[code // len(case_places)], case_places[code % len(case_places)])
+        for code in distinct
+    ], dtype=float)
+    return distinct_scores[inverse]
+
+
+def score_candidates(
+    appeals: pd.DataFrame,
+    cases: pd.DataFrame,
+    appeal_positions: np.ndarray,
+    case_positions: np.ndarray,
+    age_tolerance: float = 5,
+    half_life_years: float = 2,
+    weights: Dict[str, float] = WEIGHTS,
+) -> pd.DataFrame:
+    """
+    Scores candidate pairs column-wise over all pairs at once.
+    Args:
+        appeals: appeals from prepare_appeals
+        cases: cases from prepare_cases
+        appeal_positions: appeal position (iloc) of each pair
+        case_positions: case position (iloc) of each pair
+        age_tolerance: years outside the case's age range at which the age score reaches 0
+        half_life_years: years between going missing and being found at which the date score halves
+        weights: weight of each feature score
+    Returns:
+        Data frame with one row per pair of:
+            APPEAL_POSITION, CASE_POSITION
+            ELAPSED_YEARS - years between going missing and being found
+            ESTIMATED_AGE - age at disappearance plus the elapsed years
+            AGE_SCORE, DATE_SCORE, LOCATION_SCORE - feature scores from 0 to 1
+            SCORE - weighted sum of the feature scores
+    """
+    elapsed = (as_array(cases[DAY])[case_positions] - as_array(appeals[DAY])[appeal_positions]) / DAYS_PER_YEAR
+    estimated_age = as_array(appeals["AGE"])[appeal_positions] + elapsed
+
+    # Distance of the estimated age outside the case's age range, 0 inside it
+    min_age = as_array(cases["MIN_AGE"])[case_positions]
+    max_age = as_array(cases["MAX_AGE"])[case_positions]
+    with np.errstate(invalid="ignore"):
+        below = np.nan_to_num(min_age - estimated_age, nan=0.0)
+        above = np.nan_to_num(estimated_age - max_age, nan=0.0)
+    distance = np.maximum(np.maximum(below, above), 0)
+    age_score = np.clip(1 - distance / age_tolerance, 0, 1) if age_tolerance > 0 else (distance == 0).astype(float)
+    age_unknown = np.isnan(estimated_age) | (np.isnan(min_age) & np.isnan(max_age))
+    age_score = np.where(age_unknown, UNKNOWN_SCORE, age_score)
+
+    date_score = np.power(0.5, np.maximum(elapsed, 0) / half_life_years)
+
+    location_score = _location_scores(appeals, cases, appeal_positions, case_positions)
+
+    scores = pd.DataFrame({
+        "APPEAL_POSITION": appeal_positions,
+        "CASE_POSITION": case_positions,
+        "ELAPSED_YEARS": elapsed,
+        "ESTIMATED_AGE": estimated_age,
+        "AGE_SCORE": age_score,
+        "DATE_SCORE": date_score,
+        "LOCATION_SCORE": location_score,
+    })
+    scores["SCORE"] = sum(scores[feature] * weight for feature, weight in weights.items()) / sum(weights.values())
+    return scores
@@ -0,0 +1,19 @@
+import trio
+
+from missing_individuals.utils.crawler import AsyncCrawler
+
+from .extract_all import ExtractMissingPeople
+from .parse_html import parse_appeal_page, parse_appeal_urls
+
+# Processing function for AsyncCrawler: parses an appeal page into its field dictionary
+process_appeal_page = parse_appeal_page
+
+
+async def discover_appeal_urls(crawler: AsyncCrawler, url_send: trio.MemorySendChannel) -> None:
+    """
+    Discovery coroutine for AsyncCrawler: loads the appeal search page and sends every appeal URL.
+    """
+    search_page = await crawler.fetch(ExtractMissingPeople.URL)
+
+    for position, url in enumerate(parse_appeal_urls(search_page, base_url=ExtractMissingPeople.URL)):
+        await url_send.send((position, url))
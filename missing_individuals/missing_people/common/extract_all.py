@@ -1,11 +1,17 @@
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 import pandas as pd
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as ec
 from selenium.webdriver.support.ui import WebDriverWait
 
+from missing_individuals.utils.browser import wait_visible
+from missing_individuals.utils.metrics import METRICS
+from missing_individuals.utils.pool import WorkerPool
+from missing_individuals.utils.writer import ChunkedWriter
+
 
 class ExtractMissingPeople:
 
@@ -15,29 +21,52 @@ class ExtractMissingPeople:
     LOADED_PAGES: int = 100
     URL: str = f"https://www.missingpeople.org.uk/appeal-search?loaded={LOADED_PAGES}"
 
-    def accept_cookies_banner(self):
-
-        cookie_banner = WebDriverWait(
-            self.driver, 5).until(
-                ec.visibility_of_any_elements_located(
-                    (By.ID, 'cookie-law-info-bar')))[0]
+    # Output columns of the appeals: the name and the appeal headings used for linkage. Any other
+    # heading an appeal shows goes into OTHER_FIELDS
+    COLUMNS: List[str] = ["NAME", "REFERENCE NO", "AGE AT DISAPPEARANCE", "MISSING SINCE", "MISSING FROM"]
+    OTHER_FIELDS: str = "OTHER FIELDS"
 
-        accept_button = WebDriverWait(
-            cookie_banner, 5).until(
-                ec.visibility_of_any_elements_located(
-                    (By.TAG_NAME, 'a')))[-1]
+    def accept_cookies_banner(self):
+        """
+        Accepts the cookie banner, if one is shown.
+        """
+        try:
+            cookie_banner = WebDriverWait(
+                self.driver, 5).until(
+                    ec.visibility_of_any_elements_located(
+                        (By.ID, 'cookie-law-info-bar')))[0]
+
+            accept_button = WebDriverWait(
+                cookie_banner, 5).until(
+                    ec.visibility_of_any_elements_located(
+                        (By.TAG_NAME, 'a')))[-1]
+        except TimeoutException:
+            return
 
         accept_button.click()
 
     def close_pop_up(self):
-
-        pop_up = WebDriverWait(
-            self.driver, 5).until(
-                ec.visibility_of_any_elements_located(
-                    (By.CLASS_NAME, 'close')))[0]
+        """
+        Closes the pop-up, if one is shown.
+        """
+        try:
+            pop_up = WebDriverWait(
+                self.driver, 5).until(
+                    ec.visibility_of_any_elements_located(
+                        (By.CLASS_NAME, 'close')))[0]
+        except TimeoutException:
+            return
 
         pop_up.click()
 
+    def iter_case_urls(self) -> Iterator[str]:
+        """
+        Yields the appeal URLs of the appeal search page. The links are all read before the
+        first is yielded, so the driver can be used for the appeals in the meantime.
+        """
+        self.extract_all_urls()
+        yield from self.url_list
+
     def extract_all_urls(self) -> List[str]:
 
         self.driver.get(url=self.URL)
@@ -45,69 +74,117 @@ class ExtractMissingPeople:
         self.accept_cookies_banner()
 
         self.url_list = []
-        all_content = WebDriverWait(
-            self.driver, 5).until(
-                ec.visibility_of_any_elements_located(
-                    (By.CLASS_NAME, 'section__content')))
+        all_content = wait_visible(self.driver, By.CLASS_NAME, 'section__content', page="Appeal search page")
 
-        all_a_tags = WebDriverWait(
-            all_content[0], 5).until(
-                ec.visibility_of_any_elements_located(
-                    (By.TAG_NAME, 'a')))
+        all_a_tags = wait_visible(all_content[0], By.TAG_NAME, 'a', page="Appeal search page")
 
         for url in all_a_tags:
             self.url_list.append(url.get_attribute("href"))
 
-    def extract_all_data_from_urls(self) -> pd.DataFrame:
+        return self.url_list
 
-        self.df_full = pd.DataFrame()
-        for url in self.url_list:
+    def extract_data_from_url(self, url: str) -> Dict[str, str]:
 
-            try:
-                self.driver.get(url=url)
-                self.close_pop_up()
-
-                self.item_dict = {}
-
-                # Extract the main content
-                main_content = WebDriverWait(
-                    self.driver, 5).until(
-                        ec.visibility_of_any_elements_located(
-                            (By.CLASS_NAME, 'main_content_cell')))[0]
-
-                # Get name
-                self.item_dict["NAME"] = WebDriverWait(
-                    main_content, 5).until(
-                        ec.visibility_of_any_elements_located(
-                            (By.TAG_NAME, 'h1')))[0].text
-
-                item_content = WebDriverWait(
-                    main_content, 5).until(
-                        ec.visibility_of_any_elements_located(
-                            (By.TAG_NAME, 'li')))
-
-                for item in item_content[:-2]:
-
-                    item_name = WebDriverWait(
-                        item, 5).until(
-                            ec.visibility_of_any_elements_located(
-                                (By.TAG_NAME, 'h2')))[0].text
-                    item_value = WebDriverWait(
-                            item, 5).until(
-                                ec.visibility_of_any_elements_located(
-                                    (By.TAG_NAME, 'span')))[0].text
-
-                    self.item_dict[item_name] = item_value
-            except Exception as e:
-                pass
+        with METRICS.timer('navigate'):
+            self.driver.get(url=url)
+
+        with METRICS.timer('extract'):
+            return self._extract_item_dict()
+
+    def _extract_item_dict(self) -> Dict[str, str]:
 
-        self.df_full = pd.concat(
-            [self.df_full, pd.DataFrame(self.item_dict, index=[0])])
+        self.close_pop_up()
 
-    def run(self):
+        item_dict = {}
+
+        # Extract the main content
+        main_content = wait_visible(self.driver, By.CLASS_NAME, 'main_content_cell', page="Appeal page")[0]
+
+        # Get name
+        item_dict["NAME"] = wait_visible(main_content, By.TAG_NAME, 'h1', page="Appeal page")[0].text
+
+        item_content = wait_visible(main_content, By.TAG_NAME, 'li', page="Appeal page")
+
+        for item in item_content[:-2]:
+
+            item_name = wait_visible(item, By.TAG_NAME, 'h2', page="Appeal page")[0].text
+            item_value = wait_visible(item, By.TAG_NAME, 'span', page="Appeal page")[0].text
+
+            item_dict[item_name] = item_value
+
+        return item_dict
+
+    def iter_cases(self, urls: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, Dict[str, str]]]:
+        """
+        Yields each appeal as soon as it has been extracted, so that writing (or any other stage)
+        can start before the crawl is finished. Appeals that cannot be extracted are skipped and
+        recorded with their error in self.failures.
+        Args:
+            urls: appeal URLs to extract; defaults to iter_case_urls()
+        Returns:
+            Iterator of (appeal URL, appeal dictionary)
+        """
+        self.failures = []
+
+        for url in (self.iter_case_urls() if urls is None else urls):
+            try:
+                item_dict = self.extract_data_from_url(url)
+            except Exception as e:
+                self.failures.append((url, e))
+                continue
+
+            yield url, item_dict
+
+    def extract_all_data_from_urls(
+        self,
+        pool: Optional[WorkerPool] = None,
+        writer: Optional[ChunkedWriter] = None,
+    ) -> Optional[pd.DataFrame]:
+        """
+        Extracts the appeal data from every URL in url_list.
+        Args:
+            pool: optional WorkerPool of webdrivers to spread the URLs over
+            writer: optional ChunkedWriter the appeals are streamed to, instead of being held in df_full
+        Returns:
+            Data frame with one row per appeal, in url_list order (None if a writer is given).
+            URLs that could not be extracted are recorded with their error in self.failures.
+        """
+        item_dicts = []
+        self.failures = []
+
+        extracted = 0
+
+        def sink(url: str, item_dict: Dict[str, str]) -> None:
+            nonlocal extracted
+            extracted += 1
+            print(f"Extracted appeal {extracted} out of {len(self.url_list)}")
+
+            if writer is not None:
+                writer.write(item_dict, key=url)
+            else:
+                item_dicts.append(item_dict)
+
+        if pool is not None:
+            pool.map(
+                lambda driver, url: (url, ExtractMissingPeople(driver=driver).extract_data_from_url(url)),
+                self.url_list,
+                sink=lambda result: sink(*result),
+            )
+            self.failures = pool.failures
+        else:
+            for url, item_dict in self.iter_cases(self.url_list):
+                sink(url, item_dict)
+
+        if writer is not None:
+            self.df_full = None
+        else:
+            self.df_full = pd.DataFrame(item_dicts)
+        return self.df_full
+
+    def run(self, pool: Optional[WorkerPool] = None, writer: Optional[ChunkedWriter] = None):
 
         # Extract all URLs
         self.extract_all_urls()
 
         # Extract data frame
-        self.extract_all_data_from_urls()
+        self.extract_all_data_from_urls(pool=pool, writer=writer)
@@ -0,0 +1,68 @@
+from typing import Dict, List
+from urllib.parse import urljoin
+
+from missing_individuals.utils.parsing import find_visible, make_soup, visible_text
+
+
+def parse_appeal_urls(page_source: str, base_url: str) -> List[str]:
+    """
+    Extracts the appeal URLs from the appeal search page.
+    Mirrors ExtractMissingPeople.extract_all_urls.
+    Args:
+        page_source: raw HTML of the appeal search page
+        base_url: URL the page was loaded from, used to resolve relative links
+    Returns:
+        List of absolute appeal URLs
+    Raises:
+        ValueError: if the page has no section__content element
+    """
+    soup = make_soup(page_source)
+
+    all_content = find_visible(soup, class_name='section__content')
+    if not all_content:
+        raise ValueError("Appeal search page has no section__content element")
+
+    return [
+        urljoin(base_url, tag.get('href'))
+        for tag in find_visible(all_content[0], tag_name='a') if tag.get('href')
+    ]
+
+
+def parse_appeal_page(page_source: str) -> Dict[str, str]:
+    """
+    Builds the appeal dictionary from a static snapshot of an appeal page.
+    Mirrors ExtractMissingPeople.extract_data_from_url.
+    Args:
+        page_source: raw HTML of a missingpeople.org.uk appeal page
+    Returns:
+        Dictionary of the appeal fields, keyed by their headings
+    Raises:
+        ValueError: if the page has no main content, name or appeal fields
+    """
+    soup = make_soup(page_source)
+
+    main_content = find_visible(soup, class_name='main_content_cell')
+    if not main_content:
+        raise ValueError("Appeal page has no main_content_cell element")
+
+    item_dict = {}
+
+    # Get name
+    name = find_visible(main_content[0], tag_name='h1')
+    if not name:
+        raise ValueError("Appeal page has no name")
+    item_dict["NAME"] = visible_text(name[0])
+
+    item_content = find_visible(main_content[0], tag_name='li')
+    if not item_content:
+        raise ValueError("Appeal page has no appeal fields")
+
+    for item in item_content[:-2]:
+        item_name = find_visible(item, tag_name='h2')
+        item_value = find_visible(item, tag_name='span')
+        if not item_name or not item_value:
+            raise ValueError("Appeal field is missing its heading or value")
+
+        item_dict[visible_text(item_name[0])] = visible_text(item_value[0])
+
+    return item_dict
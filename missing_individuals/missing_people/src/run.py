@@ -1,32 +1,218 @@
-import sys
+import argparse
+import os
 from datetime import date
+from typing import List, Optional
 
-import chromedriver_autoinstaller
-from selenium import webdriver
 
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
 
-def main():
+    parser = argparse.ArgumentParser(
+        description="Scrape missing people appeals from missingpeople.org.uk")
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help="Number of headless Chrome sessions to spread the appeal pages over")
+    parser.add_argument(
+        '--failure-budget', type=int, default=5,
+        help="Failed pages after which a worker gives up (with --workers)")
+    parser.add_argument(
+        '--max-attempts', type=int, default=3,
+        help="Attempts at an appeal page before it counts as failed; only timeouts, dropped connections, "
+             "rate limiting and server errors are retried, after an exponential backoff with jitter")
+    parser.add_argument(
+        '--backoff', type=float, default=2,
+        help="Upper bound in seconds of the first retry backoff, doubled for every further retry")
+    parser.add_argument(
+        '--page-deadline', type=float, default=120,
+        help="Seconds after which an appeal page is abandoned (and its browser session replaced) and retried later")
+    parser.add_argument(
+        '--breaker-threshold', type=int, default=5,
+        help="Consecutive transient failures against a host after which its pages fail fast for a while")
+    parser.add_argument(
+        '--breaker-cooldown', type=float, default=60,
+        help="Seconds a host is left alone once its circuit breaker opens")
+    parser.add_argument(
+        '--async-crawl', action='store_true',
+        help="Fetch the appeal pages concurrently with the trio crawl engine over HTTP (no browser)")
+    parser.add_argument(
+        '--concurrency', type=int, default=8,
+        help="Maximum number of requests in flight (with --async-crawl)")
+    parser.add_argument(
+        '--rate-per-host', type=float, default=2.0,
+        help="Sustained requests per second allowed to each host (with --async-crawl)")
+    parser.add_argument(
+        '--timeout', type=float, default=30,
+        help="Seconds before a single request is abandoned (with --async-crawl)")
+    parser.add_argument(
+        '--chunk-size', type=int, default=500,
+        help="Number of appeals buffered before they are written out")
+    parser.add_argument(
+        '--parquet', action='store_true',
+        help="Also write the appeals to a Parquet file alongside the CSV")
+    parser.add_argument(
+        '--checkpoint-dir', default=None,
+        help="Where run progress is checkpointed (defaults to data/checkpoints/missing_people)")
+    parser.add_argument(
+        '--resume', action='store_true',
+        help="Resume the checkpointed run: skip discovery and finished appeals, retry failed ones")
+    parser.add_argument(
+        '--output-dir', default=None,
+        help="Directory the scraped data and metrics are written to (defaults to data/)")
+    parser.add_argument(
+        '--metrics-path', default=None,
+        help="Path (without extension) of the JSON and Prometheus metrics files "
+             "(defaults to <output dir>/metrics/missing_people)")
+    parser.add_argument(
+        '--lean-browser', action='store_true',
+        help="Run Chrome headless with eager page loads, a small window, no extensions and no images, "
+             "stylesheets, fonts or media")
 
-    todays_date = date.today().strftime("%Y_%m_%d")
-    FILE_NAME: str = f'missing_people_{todays_date}.csv'
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+
+    args = parse_args(argv)
+
+    if args.resume and args.async_crawl:
+        raise SystemExit("--resume cannot be combined with --async-crawl")
 
-    folder_path = '../../../'
-    sys.path.append(folder_path)
+    todays_date = date.today().strftime("%Y_%m_%d")
+    FILE_STEM: str = f'missing_people_{todays_date}'
 
     from missing_individuals.missing_people.common.extract_all import ExtractMissingPeople
 
     import missing_individuals.utils.utils as utils
+    from missing_individuals.utils.browser import build_chrome_driver
+    from missing_individuals.utils.checkpoint import Checkpoint
+    from missing_individuals.utils.metrics import METRICS
+    from missing_individuals.utils.pool import WorkerPool
+    from missing_individuals.utils.retry import CircuitBreaker, RetryPolicy
+    from missing_individuals.utils.writer import ChunkedWriter
 
     data_path, chromedriver_path = utils.build_dirs()
 
-    chromedriver_autoinstaller.install(path=chromedriver_path)
-    driver = webdriver.Chrome()
+    output_path = args.output_dir or data_path
+    os.makedirs(output_path, exist_ok=True)
+    output_stem = f"{output_path}/{FILE_STEM}"
+
+    def report_metrics() -> None:
+        metrics_path = args.metrics_path or f"{output_path}/metrics/missing_people"
+        METRICS.write(metrics_path)
+        print(METRICS.summary())
+        print(f"Metrics written to {metrics_path}.json and {metrics_path}.prom")
+
+    retry = RetryPolicy(
+        max_attempts=args.max_attempts,
+        base_delay=args.backoff,
+        deadline=args.page_deadline,
+        breaker=CircuitBreaker(threshold=args.breaker_threshold, cooldown=args.breaker_cooldown),
+    )
+
+    checkpoint = None
+    if not args.async_crawl:
+        checkpoint = Checkpoint(args.checkpoint_dir or f"{data_path}/checkpoints/missing_people")
+        if args.resume:
+            if not checkpoint.has_urls():
+                raise SystemExit(f"No checkpoint to resume from in {checkpoint.path}")
+            # Resumed runs append to the output of the run they continue
+            output_stem = checkpoint.metadata()['output']
+            if not os.path.dirname(output_stem):
+                output_stem = f"{data_path}/{output_stem}"
+        else:
+            checkpoint.clear()
+
+    writer = ChunkedWriter(
+        path_stem=output_stem,
+        chunk_size=args.chunk_size,
+        formats=('csv', 'parquet') if args.parquet else ('csv',),
+        columns=ExtractMissingPeople.COLUMNS,
+        extra_column=ExtractMissingPeople.OTHER_FIELDS,
+        on_flush=(lambda records, urls: checkpoint.mark_completed(urls)) if checkpoint is not None else None,
+        append=args.resume,
+    )
 
-    # Extract all URLs
+    if args.async_crawl:
+        from missing_individuals.missing_people.common.crawl import (discover_appeal_urls,
+                                                                     process_appeal_page)
+        from missing_individuals.utils.crawler import AsyncCrawler
+        from missing_individuals.utils.fetch import HttpFetchBackend
+
+        with HttpFetchBackend(pool_size=args.concurrency, timeout=args.timeout) as backend:
+            crawler = AsyncCrawler(
+                backend=backend,
+                concurrency=args.concurrency,
+                rate_per_host=args.rate_per_host,
+                timeout=args.timeout,
+                retry=retry,
+            )
+            crawler.run(discover_appeal_urls, process_appeal_page, sink=writer.write)
+
+        for url, error in crawler.failures:
+            print(f"Failed to extract {url}: {error!r}")
+            METRICS.increment('page_failures', error=type(error).__name__)
+
+        writer.close()
+        report_metrics()
+        return
+
+    # The discovery session, only started when the appeal search page is read
+    driver = None
     extract = ExtractMissingPeople(driver=driver)
-    extract.run()
 
-    extract.df_full.to_csv(f"{data_path}/{FILE_NAME}", index=False)
+    if args.resume:
+        # Skip discovery and every appeal already on disk
+        extract.url_list = checkpoint.pending()
+        print(f"Resuming: {len(extract.url_list)} appeals left, {len(checkpoint.failed())} of them failed last time")
+        METRICS.increment('retries', len(checkpoint.failed()), backend='resume')
+    else:
+        # Extract all URLs
+        driver = extract.driver = build_chrome_driver(chromedriver_path=chromedriver_path, lean=args.lean_browser)
+        try:
+            extract.extract_all_urls()
+        finally:
+            # Several workers run headless sessions of their own, a single worker reuses this one
+            if args.workers > 1:
+                driver.quit()
+                driver = extract.driver = None
+        checkpoint.save_urls(extract.url_list, output=output_stem)
+
+    if args.workers > 1:
+        pool = WorkerPool(
+            workers=args.workers,
+            session_factory=lambda: build_chrome_driver(
+                chromedriver_path=chromedriver_path, headless=True, lean=args.lean_browser),
+            session_closer=lambda worker_driver: worker_driver.quit(),
+            failure_budget=args.failure_budget,
+            retry=retry,
+        )
+    else:
+        # A single worker on the discovery session if there was one, replaced by a new session
+        # if a page runs over its deadline
+        sessions = iter([driver] if driver is not None else [])
+        pool = WorkerPool(
+            workers=1,
+            session_factory=lambda: next(sessions, None) or build_chrome_driver(
+                chromedriver_path=chromedriver_path, lean=args.lean_browser),
+            session_closer=lambda worker_driver: worker_driver.quit(),
+            failure_budget=len(extract.url_list) + 1,
+            retry=retry,
+        )
+
+    extract.extract_all_data_from_urls(pool=pool, writer=writer)
+
+    for url, error in extract.failures:
+        print(f"Failed to extract {url}: {error!r}")
+        METRICS.increment('page_failures', error=type(error).__name__)
+        checkpoint.mark_failed(url, error)
+
+    writer.close()
+
+    if extract.failures:
+        print(f"{len(extract.failures)} appeals failed, re-run with --resume to retry them")
+    else:
+        checkpoint.clear()
+
+    report_metrics()
 
 
 if __name__ == "__main__":
@@ -1,7 +1,33 @@
+import importlib
+from typing import TYPE_CHECKING
+
 from .engineer_case_data import EngineerRawData
-from .extract_case_files import BuildRawData
-from .extract_urls import ExtractMissingPersonsUrls
+
+if TYPE_CHECKING:
+    from .extract_case_files import BuildRawData
+    from .extract_urls import ExtractMissingPersonsUrls
+    from .parse_html import parse_case_page
+
+# Scraping and parsing backends pull in selenium and bs4, so they are only imported on first use
+_LAZY_IMPORTS = {
+    'BuildRawData': '.extract_case_files',
+    'ExtractMissingPersonsUrls': '.extract_urls',
+    'parse_case_page': '.parse_html',
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
+
 
 __all__ = [
-    EngineerRawData, BuildRawData, ExtractMissingPersonsUrls,
+    'EngineerRawData', 'BuildRawData', 'ExtractMissingPersonsUrls', 'parse_case_page',
 ]
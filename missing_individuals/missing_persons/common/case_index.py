@@ -0,0 +1,135 @@
+import hashlib
+import json
+import sqlite3
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def content_hash(value: Any) -> str:
+    """
+    Returns a stable SHA-256 hex digest of a string, or of any JSON serialisable value.
+    """
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class CaseIndex:
+    """
+    Persistent SQLite index of the cases already scraped, used for incremental (delta) runs.
+
+    For every case URL it keeps the CASE_NUMBER, the date it was last seen on a listing page,
+    a hash of its listing tile (used to spot changed cases without opening them) and a hash of
+    its cleaned case data.
+
+    The connection may be used from worker threads, as long as calls are not made concurrently.
+
+    Args:
+        path:
+            str - path of the SQLite database file, created if it does not exist
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cases (
+                url TEXT PRIMARY KEY,
+                case_number TEXT,
+                last_seen TEXT NOT NULL,
+                listing_hash TEXT,
+                content_hash TEXT
+            )
+            """
+        )
+        self.connection.commit()
+
+    def get(self, url: str) -> Optional[Dict[str, str]]:
+        """
+        Returns the index entry of a case URL, or None if the case has not been seen before.
+        """
+        row = self.connection.execute("SELECT * FROM cases WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def is_unchanged(self, url: str, listing_hash: str) -> bool:
+        """
+        Returns True if the case has been scraped before and its listing tile has not changed since.
+        """
+        entry = self.get(url)
+        return entry is not None and entry["content_hash"] is not None and entry["listing_hash"] == listing_hash
+
+    def mark_seen(self, urls: Iterable[str], seen: Optional[date] = None) -> None:
+        """
+        Updates the last seen date of cases that are still listed but were not re-scraped.
+        """
+        seen = (seen or date.today()).isoformat()
+        self.connection.executemany(
+            "UPDATE cases SET last_seen = ? WHERE url = ?", [(seen, url) for url in urls])
+        self.connection.commit()
+
+    def update(
+        self,
+        url: str,
+        case_number: str,
+        listing_hash: Optional[str],
+        content_hash: str,
+        seen: Optional[date] = None,
+    ) -> None:
+        """
+        Records a scraped case.
+        """
+        self.connection.execute(
+            """
+            INSERT INTO cases (url, case_number, last_seen, listing_hash, content_hash)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                case_number = excluded.case_number,
+                last_seen = excluded.last_seen,
+                listing_hash = excluded.listing_hash,
+                content_hash = excluded.content_hash
+            """,
+            (url, case_number, (seen or date.today()).isoformat(), listing_hash, content_hash),
+        )
+        self.connection.commit()
+
+    def mark_summarised(self, summaries: Iterable[Dict[str, Any]], seen: Optional[date] = None) -> None:
+        """
+        Records cases read from their listing tiles only (see summarise_tile). New cases, and cases
+        whose tile changed, are left without a content hash, so they count as pending enrichment
+        until a full scrape records them with update.
+        """
+        seen = (seen or date.today()).isoformat()
+        self.connection.executemany(
+            """
+            INSERT INTO cases (url, case_number, last_seen, listing_hash, content_hash)
+            VALUES (?, ?, ?, ?, NULL)
+            ON CONFLICT(url) DO UPDATE SET
+                case_number = COALESCE(excluded.case_number, cases.case_number),
+                last_seen = excluded.last_seen,
+                content_hash = CASE
+                    WHEN cases.listing_hash = excluded.listing_hash THEN cases.content_hash
+                END,
+                listing_hash = excluded.listing_hash
+            """,
+            [(summary['URL'], summary['CASE_NUMBER'], seen, summary['LISTING_HASH']) for summary in summaries],
+        )
+        self.connection.commit()
+
+    def pending_enrichment(self) -> List[str]:
+        """
+        Returns the URLs of the cases only known from their listing tiles, most recently seen first.
+        """
+        rows = self.connection.execute(
+            "SELECT url FROM cases WHERE content_hash IS NULL ORDER BY last_seen DESC, rowid").fetchall()
+        return [row['url'] for row in rows]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,146 @@
+import sys
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from .engineer_case_data import DESCRIPTOR_CACHE_SIZE, EngineerRawData
+
+# Low-cardinality text fields, interned so every case shares one string object per value
+CATEGORICAL_FIELDS: Tuple[str, ...] = (
+    'LOCATION_COUNTY', 'LOCATION_COUNTRY', 'FINDING_PARTY', 'GENDER', 'ETHNICITY', 'BUILD',
+    'BODY_OR_REMAINS', 'HAIR', 'FACIAL_HAIR', 'EYE_COLOUR',
+)
+
+# Numbered descriptor fields ({"CLOTHING_1": {...}}), held as tuples of shared items
+DESCRIPTOR_FIELDS: Tuple[str, ...] = ('DISTINGUISHING_FEATURES', 'CLOTHING')
+
+# Descriptor items as (key, ((field, value), ...))
+DescriptorItems = Tuple[Tuple[str, Tuple[Tuple[str, Optional[str]], ...]], ...]
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@lru_cache(maxsize=DESCRIPTOR_CACHE_SIZE)
+def _shared(value: tuple) -> tuple:
+    # Returns the first equal tuple seen, so repeated descriptor items are held once
+    return value
+
+
+def _pack_descriptors(descriptors: Optional[Dict[str, Dict[str, str]]]) -> Optional[DescriptorItems]:
+    if descriptors is None:
+        return None
+    return tuple(
+        (_intern(key), _shared(tuple((_intern(field), _intern(value)) for field, value in item.items())))
+        for key, item in descriptors.items()
+    )
+
+
+def _unpack_descriptors(items: Optional[DescriptorItems]) -> Optional[Dict[str, Dict[str, str]]]:
+    if items is None:
+        return None
+    return {key: dict(pairs) for key, pairs in items}
+
+
+class CaseRecord:
+    """
+    Compact cleaned case, holding the same values as the dictionary from
+    EngineerRawData.format_raw_case_dict in slots instead of a per-case dictionary.
+
+    Categorical fields are interned, and descriptor items and possessions are tuples of shared
+    values, so an archive of cases held in memory stores each repeated value once.
+    Records are immutable by convention; use to_dict for a dictionary that can be changed.
+    """
+
+    __slots__ = tuple(EngineerRawData.CLEAN_COLUMNS)
+
+    def __init__(self, **fields: Any):
+        for name in self.__slots__:
+            value = fields.get(name)
+            if name in CATEGORICAL_FIELDS:
+                value = _intern(value)
+            elif name in DESCRIPTOR_FIELDS and isinstance(value, dict):
+                value = _pack_descriptors(value)
+            elif name == 'POSSESSIONS' and value is not None:
+                value = _shared(tuple(_intern(item) for item in value))
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def from_dict(cls, case_dict: Dict[str, Any]) -> "CaseRecord":
+        """
+        Builds a record from a cleaned case dictionary (from EngineerRawData.format_raw_case_dict).
+        """
+        return cls(**case_dict)
+
+    @classmethod
+    def from_frame(cls, cases: pd.DataFrame) -> List["CaseRecord"]:
+        """
+        Builds records from a data frame of cleaned cases (from EngineerRawData.format_raw_case_frame).
+        """
+        return [cls(**case_dict) for case_dict in cases.to_dict('records')]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns the case as a new dictionary, in the shape of format_raw_case_dict.
+        """
+        case_dict = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if name in DESCRIPTOR_FIELDS:
+                value = _unpack_descriptors(value)
+            elif name == 'POSSESSIONS' and value is not None:
+                value = list(value)
+            case_dict[name] = value
+        return case_dict
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, CaseRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __hash__(self) -> int:
+        return hash(self.CASE_NUMBER)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(CASE_NUMBER={self.CASE_NUMBER!r})"
+
+    def __getstate__(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state: Tuple[Any, ...]):
+        for name, value in zip(self.__slots__, state):
+            object.__setattr__(self, name, value)
+
+
+def records_to_frame(records: Iterable[CaseRecord]) -> pd.DataFrame:
+    """
+    Converts case records to a data frame with categorical columns for the categorical fields
+    and nullable integer ages.
+    Args:
+        records: case records
+    Returns:
+        Data frame with the EngineerRawData.CLEAN_COLUMNS columns, one row per case. Descriptor
+        and possession cells hold the same dictionaries and lists as format_raw_case_frame
+    """
+    records = list(records)
+
+    columns = {}
+    for name in CaseRecord.__slots__:
+        values = [getattr(record, name) for record in records]
+        if name in CATEGORICAL_FIELDS:
+            columns[name] = pd.Categorical(values)
+        elif name in ('MIN_AGE', 'MAX_AGE'):
+            columns[name] = pd.array(values, dtype='Int16')
+        elif name in DESCRIPTOR_FIELDS:
+            columns[name] = pd.Series([_unpack_descriptors(value) for value in values], dtype=object)
+        elif name == 'POSSESSIONS':
+            columns[name] = pd.Series([None if value is None else list(value) for value in values], dtype=object)
+        else:
+            columns[name] = pd.Series(values, dtype=object)
+
+    return pd.DataFrame(columns)
@@ -0,0 +1,77 @@
+from typing import Any, Dict, List, Optional
+
+import pyarrow as pa
+
+from .engineer_case_data import CLOTHING_FIELDS, FEATURE_FIELDS
+
+# Low-cardinality fields stored dictionary-encoded
+CATEGORICAL_FIELDS = ('GENDER', 'ETHNICITY', 'BUILD', 'HAIR')
+
+# Descriptor fields stored as a list of structs, one per described item
+DESCRIPTOR_FIELDS: Dict[str, tuple] = {
+    'DISTINGUISHING_FEATURES': FEATURE_FIELDS,
+    'CLOTHING': CLOTHING_FIELDS,
+}
+
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+
+def _descriptor_type(fields: tuple) -> pa.DataType:
+    return pa.list_(pa.struct([(field, pa.string()) for field in fields]))
+
+
+# Column types of the cleaned cases, in EngineerRawData.CLEAN_COLUMNS order
+CASE_SCHEMA = pa.schema([
+    ('CASE_NUMBER', pa.string()),
+    ('LOCATION_ROAD', pa.string()),
+    ('LOCATION_COUNTY', pa.string()),
+    ('LOCATION_COUNTRY', pa.string()),
+    ('FINDING_PARTY', pa.string()),
+    ('GENDER', CATEGORY),
+    ('MIN_AGE', pa.int16()),
+    ('MAX_AGE', pa.int16()),
+    ('ETHNICITY', CATEGORY),
+    ('HEIGHT_CM', pa.int16()),
+    ('BUILD', CATEGORY),
+    ('DATE_FOUND', pa.date32()),
+    ('ESTIMATED_DEATH', pa.date32()),
+    ('BODY_OR_REMAINS', pa.string()),
+    ('HAIR', CATEGORY),
+    ('FACIAL_HAIR', pa.string()),
+    ('EYE_COLOUR', pa.string()),
+    ('DISTINGUISHING_FEATURES', _descriptor_type(FEATURE_FIELDS)),
+    ('CLOTHING', _descriptor_type(CLOTHING_FIELDS)),
+    ('POSSESSIONS', pa.list_(pa.string())),
+    ('CIRCUMSTANCES', pa.string()),
+    ('JEWELLERY', pa.string()),
+    ('KNOWN_NOT_TO_BE', pa.string()),
+])
+
+
+def _height_cm(height: Any) -> Optional[int]:
+    if height is None or isinstance(height, int):
+        return height
+    height = str(height).strip()
+    return int(height) if height.isdigit() else None
+
+
+def _descriptor_items(descriptors: Optional[Dict[str, Dict[str, str]]]) -> Optional[List[Dict[str, str]]]:
+    if descriptors is None:
+        return None
+    return list(descriptors.values())
+
+
+def columnar_case(case_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reshapes a cleaned case dictionary (from EngineerRawData) to fit CASE_SCHEMA.
+    Args:
+        case_dict: cleaned case dictionary
+    Returns:
+        New dictionary with the height as an integer and the numbered descriptor dictionaries
+        ({"CLOTHING_1": {...}, ...}) as lists of items
+    """
+    row = dict(case_dict)
+    row['HEIGHT_CM'] = _height_cm(row.get('HEIGHT_CM'))
+    for name in DESCRIPTOR_FIELDS:
+        row[name] = _descriptor_items(row.get(name))
+    return row
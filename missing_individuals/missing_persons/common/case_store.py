@@ -0,0 +1,362 @@
+import ast
+import sqlite3
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import pandas as pd
+
+from .engineer_case_data import CLOTHING_FIELDS, FEATURE_FIELDS
+
+# Scalar columns of the cases table, with their SQLite types
+CASE_COLUMNS: Dict[str, str] = {
+    'CASE_NUMBER': 'TEXT NOT NULL UNIQUE',
+    'LOCATION_ROAD': 'TEXT',
+    'LOCATION_COUNTY': 'TEXT',
+    'LOCATION_COUNTRY': 'TEXT',
+    'FINDING_PARTY': 'TEXT',
+    'GENDER': 'TEXT',
+    'MIN_AGE': 'INTEGER',
+    'MAX_AGE': 'INTEGER',
+    'ETHNICITY': 'TEXT',
+    'HEIGHT_CM': 'INTEGER',
+    'BUILD': 'TEXT',
+    'DATE_FOUND': 'TEXT',
+    'ESTIMATED_DEATH': 'TEXT',
+    'BODY_OR_REMAINS': 'TEXT',
+    'HAIR': 'TEXT',
+    'FACIAL_HAIR': 'TEXT',
+    'EYE_COLOUR': 'TEXT',
+    'CIRCUMSTANCES': 'TEXT',
+    'JEWELLERY': 'TEXT',
+    'KNOWN_NOT_TO_BE': 'TEXT',
+    'UPDATED': 'TEXT',
+}
+
+# Descriptor fields stored in child tables, one row per described item: (table, item prefix, fields)
+DESCRIPTOR_TABLES: Dict[str, tuple] = {
+    'CLOTHING': ('clothing', 'CLOTHING', CLOTHING_FIELDS),
+    'DISTINGUISHING_FEATURES': ('features', 'FEATURE', FEATURE_FIELDS),
+}
+
+# B-tree indexes, named by what they serve
+INDEXES: Dict[str, str] = {
+    'cases_date_found': 'cases (DATE_FOUND)',
+    'cases_location': 'cases (LOCATION_COUNTY, LOCATION_ROAD)',
+    'cases_gender_age': 'cases (GENDER, MIN_AGE, MAX_AGE)',
+    'clothing_category': 'clothing (CATEGORY, SUBCATEGORY)',
+    'clothing_subcategory': 'clothing (SUBCATEGORY)',
+    'features_category': 'features (CATEGORY, SUBCATEGORY)',
+    'possessions_item': 'possessions (ITEM, CASE_NUMBER)',
+}
+
+# Free text searched through FTS5
+TEXT_COLUMNS = ('CIRCUMSTANCES', 'CLOTHING', 'JEWELLERY')
+
+
+def _iso_date(value: Any) -> Optional[str]:
+    if value is None or value is pd.NaT or (isinstance(value, float) and pd.isna(value)):
+        return None
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)[:10]
+
+
+def _integer(value: Any) -> Optional[int]:
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    value = str(value).strip()
+    return int(float(value)) if value.replace('.', '', 1).isdigit() else None
+
+
+@lru_cache(maxsize=8192)
+def _literal(text: str) -> Any:
+    # CSV outputs hold descriptors and possessions as Python literals, which repeat across cases
+    return ast.literal_eval(text) if text.strip() else None
+
+
+def _descriptor_items(value: Any, prefix: str) -> Dict[str, Dict[str, str]]:
+    """
+    Numbered descriptor items ({"CLOTHING_1": {...}}) of a cleaned case, also accepting the text
+    form they take in CSV outputs and the list form of the columnar outputs.
+    """
+    if isinstance(value, str):
+        value = _literal(value)
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return {}
+    if isinstance(value, dict):
+        return value
+    return {f"{prefix}_{n}": dict(item) for n, item in enumerate(value, start=1)}
+
+
+def _possessions(value: Any) -> List[str]:
+    if isinstance(value, str):
+        value = _literal(value)
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return []
+    return list(value)
+
+
+def _descriptor_text(items: Dict[str, Dict[str, str]]) -> str:
+    return '\n'.join(' - '.join(part for part in item.values() if part) for item in items.values())
+
+
+class CaseStore:
+    """
+    Local SQLite store of cleaned cases (from EngineerRawData), for answering questions about them
+    from disk instead of loading whole CSV outputs.
+
+    Scalar fields live in a cases table keyed on CASE_NUMBER, with B-tree indexes on the date found,
+    location, gender and age range. Clothing, distinguishing features and possessions are normalised
+    into child tables with one row per item, and CIRCUMSTANCES, CLOTHING and JEWELLERY text is
+    indexed with FTS5 (keyed on the case's CASE_ID). Writing a case that is already stored replaces it.
+
+    The connection may be used from worker threads, as long as calls are not made concurrently.
+
+    Args:
+        path:
+            str - path of the SQLite database file, created if it does not exist
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA foreign_keys = ON")
+
+        columns = ',\n'.join(f"{name} {sql_type}" for name, sql_type in CASE_COLUMNS.items())
+        self.connection.execute(f"CREATE TABLE IF NOT EXISTS cases (CASE_ID INTEGER PRIMARY KEY, {columns})")
+
+        for table, _, fields in DESCRIPTOR_TABLES.values():
+            field_columns = ', '.join(f"{field} TEXT" for field in fields)
+            self.connection.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    CASE_NUMBER TEXT NOT NULL REFERENCES cases (CASE_NUMBER) ON DELETE CASCADE,
+                    ITEM TEXT NOT NULL,
+                    {field_columns},
+                    PRIMARY KEY (CASE_NUMBER, ITEM)
+                )
+                """
+            )
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS possessions (
+                CASE_NUMBER TEXT NOT NULL REFERENCES cases (CASE_NUMBER) ON DELETE CASCADE,
+                POSITION INTEGER NOT NULL,
+                ITEM TEXT NOT NULL,
+                PRIMARY KEY (CASE_NUMBER, POSITION)
+            )
+            """
+        )
+        for name, target in INDEXES.items():
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+        self.connection.execute(
+            f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS cases_text USING fts5 ({', '.join(TEXT_COLUMNS)})
+            """
+        )
+        self.connection.commit()
+
+    def upsert(self, cases: Iterable[Dict[str, Any]]) -> int:
+        """
+        Inserts cleaned cases, replacing the stored version of any CASE_NUMBER already present.
+        All the cases are written in one transaction.
+        Args:
+            cases: cleaned case dictionaries, as returned by EngineerRawData.format_raw_case_dict
+                (or rows read back from its CSV and Parquet outputs)
+        Returns:
+            Number of cases written
+        """
+        updated = date.today().isoformat()
+        scalar_names = [name for name in CASE_COLUMNS if name != 'UPDATED']
+        insert_case = (
+            f"INSERT INTO cases ({', '.join(CASE_COLUMNS)}) VALUES ({', '.join('?' * len(CASE_COLUMNS))}) "
+            f"ON CONFLICT(CASE_NUMBER) DO UPDATE SET "
+            + ', '.join(f"{name} = excluded.{name}" for name in CASE_COLUMNS if name != 'CASE_NUMBER')
+            + " RETURNING CASE_ID"
+        )
+
+        n = 0
+        with self.connection:
+            for case in cases:
+                case_number = case['CASE_NUMBER']
+                row = []
+                for name in scalar_names:
+                    value = case.get(name)
+                    if name in ('MIN_AGE', 'MAX_AGE', 'HEIGHT_CM'):
+                        value = _integer(value)
+                    elif name in ('DATE_FOUND', 'ESTIMATED_DEATH'):
+                        value = _iso_date(value)
+                    elif value is not None and pd.isna(value):
+                        value = None
+                    row.append(value)
+                case_id = self.connection.execute(insert_case, row + [updated]).fetchone()[0]
+
+                # Child rows are replaced wholesale, as items can be added or removed between scrapes
+                descriptors = {}
+                for name, (table, prefix, fields) in DESCRIPTOR_TABLES.items():
+                    descriptors[name] = _descriptor_items(case.get(name), prefix)
+                    self.connection.execute(f"DELETE FROM {table} WHERE CASE_NUMBER = ?", (case_number,))
+                    self.connection.executemany(
+                        f"INSERT INTO {table} (CASE_NUMBER, ITEM, {', '.join(fields)}) "
+                        f"VALUES (?, ?, {', '.join('?' * len(fields))})",
+                        [(case_number, item, *(values.get(field) for field in fields))
+                         for item, values in descriptors[name].items()],
+                    )
+
+                self.connection.execute("DELETE FROM possessions WHERE CASE_NUMBER = ?", (case_number,))
+                self.connection.executemany(
+                    "INSERT INTO possessions (CASE_NUMBER, POSITION, ITEM) VALUES (?, ?, ?)",
+                    [(case_number, position, item)
+                     for position, item in enumerate(_possessions(case.get('POSSESSIONS')), start=1)],
+                )
+
+                self.connection.execute("DELETE FROM cases_text WHERE rowid = ?", (case_id,))
+                self.connection.execute(
+                    f"INSERT INTO cases_text (rowid, {', '.join(TEXT_COLUMNS)}) VALUES (?, ?, ?, ?)",
+                    (case_id, row[scalar_names.index('CIRCUMSTANCES')],
+                     _descriptor_text(descriptors['CLOTHING']), row[scalar_names.index('JEWELLERY')]),
+                )
+                n += 1
+
+        return n
+
+    def load(self, path: str, chunk_size: int = 5000) -> int:
+        """
+        Upserts the cases of a CSV or Parquet output of the scraper.
+        Args:
+            path: path of the CSV or Parquet file (or Parquet dataset directory)
+            chunk_size: number of CSV rows read and written at a time
+        Returns:
+            Number of cases written
+        """
+        if path.endswith('.csv'):
+            # Empty CSV cells are the None values of the cleaned cases
+            chunks = (
+                chunk.replace('', None)
+                for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_size)
+            )
+        else:
+            chunks = [pd.read_parquet(path)]
+
+        n = 0
+        for chunk in chunks:
+            n += self.upsert(chunk.to_dict('records'))
+        return n
+
+    def delete(self, case_numbers: Iterable[str]) -> None:
+        """
+        Removes cases, and their child rows, from the store.
+        """
+        with self.connection:
+            for case_number in case_numbers:
+                row = self.connection.execute(
+                    "DELETE FROM cases WHERE CASE_NUMBER = ? RETURNING CASE_ID", (case_number,)).fetchone()
+                if row is not None:
+                    self.connection.execute("DELETE FROM cases_text WHERE rowid = ?", (row[0],))
+
+    def get(self, case_number: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns a stored case in the shape of format_raw_case_dict, or None if it is not stored.
+        Dates are returned as ISO strings.
+        """
+        row = self.connection.execute("SELECT * FROM cases WHERE CASE_NUMBER = ?", (case_number,)).fetchone()
+        if row is None:
+            return None
+
+        case = dict(row)
+        del case['CASE_ID'], case['UPDATED']
+        for name, (table, _, fields) in DESCRIPTOR_TABLES.items():
+            items = self.connection.execute(
+                f"SELECT * FROM {table} WHERE CASE_NUMBER = ? ORDER BY rowid", (case_number,)).fetchall()
+            case[name] = {item['ITEM']: {field: item[field] for field in fields} for item in items} or None
+
+        possessions = self.connection.execute(
+            "SELECT ITEM FROM possessions WHERE CASE_NUMBER = ? ORDER BY POSITION", (case_number,)).fetchall()
+        case['POSSESSIONS'] = [item['ITEM'] for item in possessions] or None
+        return case
+
+    def search(
+        self,
+        gender: Optional[str] = None,
+        age: Optional[Union[int, tuple]] = None,
+        county: Optional[str] = None,
+        found_from: Optional[Union[date, str]] = None,
+        found_to: Optional[Union[date, str]] = None,
+        clothing: Optional[str] = None,
+        possession: Optional[str] = None,
+        text: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """
+        Finds the cases matching every given filter, e.g.
+        search(gender='male', age=(20, 30), county='kent', clothing='trainers').
+        Args:
+            gender: gender, e.g. "male"
+            age: age, or (lowest, highest) ages, that the case's estimated age range overlaps
+            county: county found in, e.g. "kent"
+            found_from: earliest date found
+            found_to: latest date found
+            clothing: category or subcategory of a clothing item, e.g. "trainers" or "footwear"
+            possession: possession, e.g. "mobile phone"
+            text: FTS5 query over the circumstances, clothing and jewellery text, e.g. "tattoo OR ring"
+            limit: maximum number of cases returned
+        Returns:
+            Data frame of the scalar fields of the matching cases, most recently found first
+        """
+        conditions, parameters = [], []
+
+        if gender is not None:
+            conditions.append("GENDER = ?")
+            parameters.append(gender.lower())
+        if age is not None:
+            lowest, highest = age if isinstance(age, tuple) else (age, age)
+            conditions.append("MAX_AGE >= ? AND MIN_AGE <= ?")
+            parameters += [lowest, highest]
+        if county is not None:
+            conditions.append("LOCATION_COUNTY = ?")
+            parameters.append(county.lower())
+        if found_from is not None:
+            conditions.append("DATE_FOUND >= ?")
+            parameters.append(_iso_date(found_from))
+        if found_to is not None:
+            conditions.append("DATE_FOUND <= ?")
+            parameters.append(_iso_date(found_to))
+        if clothing is not None:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM clothing WHERE clothing.CASE_NUMBER = cases.CASE_NUMBER "
+                "AND ? IN (clothing.CATEGORY, clothing.SUBCATEGORY))")
+            parameters.append(clothing.upper())
+        if possession is not None:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM possessions WHERE possessions.CASE_NUMBER = cases.CASE_NUMBER "
+                "AND possessions.ITEM = ?)")
+            parameters.append(possession.lower())
+        if text is not None:
+            conditions.append("CASE_ID IN (SELECT rowid FROM cases_text WHERE cases_text MATCH ?)")
+            parameters.append(text)
+
+        query = f"SELECT {', '.join(CASE_COLUMNS)} FROM cases"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY DATE_FOUND DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters.append(limit)
+
+        return pd.read_sql_query(query, self.connection, params=parameters)
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM cases").fetchone()[0]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,54 @@
+from typing import Dict, Union
+
+import trio
+from bs4 import BeautifulSoup
+
+from missing_individuals.utils.crawler import AsyncCrawler
+from missing_individuals.utils.metrics import METRICS
+from missing_individuals.utils.parsing import make_soup
+
+from .engineer_case_data import EngineerRawData
+from .extract_urls import ExtractMissingPersonsUrls
+from .parse_html import parse_case_page, parse_listing_case_urls
+
+
+async def discover_case_urls(crawler: AsyncCrawler, url_send: trio.MemorySendChannel) -> None:
+    """
+    Discovery coroutine for AsyncCrawler: loads the search page, works out the URL of every listing
+    page from it (see ExtractMissingPersonsUrls.listing_page_urls), fetches them all concurrently
+    and sends each case URL as soon as its listing page has been parsed.
+    Case URLs are keyed by (listing page, position) so the output keeps the listing order.
+    """
+    search_url = ExtractMissingPersonsUrls.build_search_url()
+    # Parsed once, for both the pagination and the tiles of the first page
+    search_page = make_soup(await crawler.fetch(search_url))
+    page_urls = ExtractMissingPersonsUrls.listing_page_urls(search_page, url=search_url)[1:]
+
+    async def send_listing_page(
+            page_index: int, url: str, page_source: Union[str, BeautifulSoup, None] = None) -> None:
+        try:
+            if page_source is None:
+                page_source = await crawler.fetch(url)
+            case_urls = parse_listing_case_urls(page_source, base_url=url)
+        except Exception as e:
+            crawler.failures.append((url, e))
+            return
+
+        for position, case_url in enumerate(case_urls):
+            await url_send.send(((page_index, position), case_url))
+
+    async with trio.open_nursery() as nursery:
+        nursery.start_soon(send_listing_page, 0, search_url, search_page)
+        for page_index, url in enumerate(page_urls, start=1):
+            nursery.start_soon(send_listing_page, page_index, url)
+
+
+def process_case_page(page_source: str) -> Dict[str, str]:
+    """
+    Processing function for AsyncCrawler: parses and cleans a case page.
+    """
+    with METRICS.timer('extract'):
+        raw_case_dict = parse_case_page(page_source=page_source)
+
+    with METRICS.timer('engineer'):
+        return EngineerRawData.format_raw_case_dict(case_date_dict=raw_case_dict)
@@ -1,6 +1,62 @@
+import re
 import string
 from datetime import datetime
-from typing import Dict, List
+from functools import lru_cache
+from itertools import zip_longest
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from .case_record import CaseRecord
+
+# Descriptor lines ("FOOTWEAR - TRAINERS - BLACK") repeat across thousands of cases,
+# so each distinct line is only tokenised once
+DESCRIPTOR_CACHE_SIZE: int = 8192
+
+# Runs of text between the '-' separators of a descriptor line
+DESCRIPTOR_PART = re.compile(r'[^-]+')
+
+FEATURE_FIELDS: Tuple[str, ...] = ("CATEGORY", "SUBCATEGORY", "LOCATION", "DESCRIPTION")
+CLOTHING_FIELDS: Tuple[str, ...] = ("CATEGORY", "SUBCATEGORY", "COLOUR", "PATTERN", "DESCRIPTION")
+
+
+@lru_cache(maxsize=DESCRIPTOR_CACHE_SIZE)
+def _parse_descriptor_line(line: str, fields: Tuple[str, ...]) -> Optional[Tuple[Tuple[str, Optional[str]], ...]]:
+    """
+    Tokenises one descriptor line into (field, value) pairs, or None if it has fewer than two parts.
+    Parts of a single character are dropped and missing trailing fields are None.
+    """
+    parts = [part.strip().upper() for part in DESCRIPTOR_PART.findall(line) if len(part) > 1]
+    if len(parts) < 2:
+        return None
+    return tuple(zip_longest(fields, parts[:len(fields)]))
+
+
+@lru_cache(maxsize=DESCRIPTOR_CACHE_SIZE)
+def _parse_possessions(possessions_str: str) -> Tuple[str, ...]:
+    split_char = '(1)' if '(1)' in possessions_str else ','
+    return tuple(i.strip().lower() for i in possessions_str.split(split_char) if len(i) > 1)
+
+
+def _parse_descriptors(descriptors_str: str, prefix: str, fields: Tuple[str, ...]) -> Dict[str, Dict[str, str]]:
+    """
+    Parses a multi-line descriptor field into {f"{prefix}_{n}": {field: value}}, where n counts the
+    non-trivial lines. Each entry is a new dict, so results can be changed without touching the cache.
+    """
+    return_dict = {}
+    n = 0
+    for line in descriptors_str.split('\n'):
+        if len(line) <= 1:
+            continue
+        n += 1
+
+        pairs = _parse_descriptor_line(line, fields)
+        if pairs is not None:
+            return_dict[f"{prefix}_{n}"] = dict(pairs)
+
+    return return_dict
 
 
 class EngineerRawData:
@@ -8,6 +64,28 @@ class EngineerRawData:
     This class houses several methods to clean the extracted raw data.
     """
 
+    # Output columns of format_raw_case_dict, in order
+    CLEAN_COLUMNS: List[str] = [
+        'CASE_NUMBER', 'LOCATION_ROAD', 'LOCATION_COUNTY', 'LOCATION_COUNTRY', 'FINDING_PARTY',
+        'GENDER', 'MIN_AGE', 'MAX_AGE', 'ETHNICITY', 'HEIGHT_CM', 'BUILD', 'DATE_FOUND',
+        'ESTIMATED_DEATH', 'BODY_OR_REMAINS', 'HAIR', 'FACIAL_HAIR', 'EYE_COLOUR',
+        'DISTINGUISHING_FEATURES', 'CLOTHING', 'POSSESSIONS', 'CIRCUMSTANCES', 'JEWELLERY',
+        'KNOWN_NOT_TO_BE',
+    ]
+
+    # Raw fields that are only lower-cased, and whether they are optional
+    LOWER_CASE_FIELDS: Dict[str, bool] = {
+        'LOCATION_ROAD': True, 'LOCATION_COUNTY': True, 'LOCATION_COUNTRY': True,
+        'FINDING_PARTY': True, 'GENDER': False, 'ETHNICITY': True, 'BUILD': True,
+        'BODY_OR_REMAINS': False, 'HAIR': True, 'FACIAL_HAIR': True, 'EYE_COLOUR': False,
+        'CIRCUMSTANCES': True, 'JEWELLERY': True, 'KNOWN_NOT_TO_BE': True,
+    }
+
+    DATE_FORMAT: str = "%d %B %Y"
+
+    # Characters removed by clean_case_number
+    CASE_NUMBER_STRIP = re.compile(f"[^{re.escape(string.digits + string.punctuation)}]")
+
     @staticmethod
     def clean_case_number(case_number_str: str) -> str:
         """
@@ -31,7 +109,9 @@ class EngineerRawData:
         Returns:
             Dictionary of the min and maximum age values in the folm of {'MIN_AGE': x, 'MAX_AGE': y}
         """
-        split_values = [age for age in '18 - 30'.split() if age.isdigit()]
+        split_values = [int(age) for age in age_range_str.split() if age.isdigit()]
+        if not split_values:
+            return {"MIN_AGE": None, "MAX_AGE": None}
         return {"MIN_AGE": min(split_values), "MAX_AGE": max(split_values)}
 
     @staticmethod
@@ -54,8 +134,7 @@ class EngineerRawData:
         Returns:
             Date object
         """
-        date_format = "%d %B %Y"
-        return datetime.strptime(date_found, date_format).date()
+        return datetime.strptime(date_found, EngineerRawData.DATE_FORMAT).date()
 
     @staticmethod
     def rough_format_distinguishing_features(dist_features_str: str) -> Dict[str, str]:
@@ -73,31 +152,7 @@ class EngineerRawData:
         Although this is not always the case, often the 'Description' field is missing.
         In some cases this structure is not adhered to whatsoever and it is just a free text input.
         """
-        return_dict = {}
-
-        # Split the entry string into a list by the new line character
-        descriptors_list = [i for i in dist_features_str.split('\n') if len(i) > 1]
-
-        for n, entry in enumerate(descriptors_list, start=1):
-            # Attempt to split into the categories
-            category_items = [i.strip().upper() for i in entry.split('-') if len(i) > 1]
-
-            if len(category_items) < 2:
-                continue
-
-            category_dict = {
-                "CATEGORY": None,
-                "SUBCATEGORY": None,
-                "LOCATION": None,
-                "DESCRIPTION": None,
-            }
-
-            for j, key in zip(category_items, category_dict.keys()):
-                category_dict[key] = j
-
-            return_dict[f"FEATURE_{n}"] = category_dict
-
-        return return_dict
+        return _parse_descriptors(dist_features_str, prefix="FEATURE", fields=FEATURE_FIELDS)
 
     @staticmethod
     def rough_format_clothing(clothing_str: str) -> Dict[str, str]:
@@ -116,41 +171,27 @@ class EngineerRawData:
         Although this is not always the case, often the 'Description' field is missing.
         In some cases this structure is not adhered to whatsoever and it is just a free text input.
         """
-        return_dict = {}
-
-        # Split the entry string into a list by the new line character
-        descriptors_list = [i for i in clothing_str.split('\n') if len(i) > 1]
-
-        for n, entry in enumerate(descriptors_list, start=1):
-            # Attempt to split into the categories
-            category_items = [i.strip().upper() for i in entry.split('-') if len(i) > 1]
-
-            if len(category_items) < 2:
-                continue
-
-            category_dict = {
-                "CATEGORY": None,
-                "SUBCATEGORY": None,
-                "COLOUR": None,
-                "PATTERN": None,
-                "DESCRIPTION": None,
-            }
-
-            for j, key in zip(category_items, category_dict.keys()):
-                category_dict[key] = j
-
-            return_dict[f"CLOTHING_{n}"] = category_dict
-
-        return return_dict
+        return _parse_descriptors(clothing_str, prefix="CLOTHING", fields=CLOTHING_FIELDS)
 
     @staticmethod
     def format_possessions(possessions_str: str) -> List[str]:
 
-        split_char = ','
-        if '(1)' in possessions_str:
-            split_char = '(1)'
+        return list(_parse_possessions(possessions_str))
+
+    @staticmethod
+    def descriptor_cache_info() -> Dict[str, Dict[str, int]]:
+        """
+        Returns the hit/miss statistics of the descriptor and possessions parsing caches.
+        """
+        return {
+            name: cache.cache_info()._asdict()
+            for name, cache in (("descriptor_lines", _parse_descriptor_line), ("possessions", _parse_possessions))
+        }
 
-        return [i.strip().lower() for i in possessions_str.split(split_char) if len(i) > 1]
+    @staticmethod
+    def clear_descriptor_cache() -> None:
+        _parse_descriptor_line.cache_clear()
+        _parse_possessions.cache_clear()
 
     @classmethod
     def format_raw_case_dict(cls, case_date_dict: Dict[str, str]) -> Dict[str, str]:
@@ -271,3 +312,117 @@ class EngineerRawData:
             case_dict_clean['KNOWN_NOT_TO_BE'] = None
 
         return case_dict_clean
+
+    @classmethod
+    def format_raw_case_record(cls, case_date_dict: Dict[str, str]) -> "CaseRecord":
+        """
+        Compact version of format_raw_case_dict, for holding many cleaned cases in memory.
+        Args:
+            case_date_dict: raw case dictionary from BuildRawData
+        Returns:
+            CaseRecord with the same values as format_raw_case_dict
+        """
+        from .case_record import CaseRecord
+
+        return CaseRecord.from_dict(cls.format_raw_case_dict(case_date_dict))
+
+    @staticmethod
+    def _present(column: pd.Series) -> pd.Series:
+        """
+        Mask of the values format_raw_case_dict treats as present (not missing and not empty).
+        """
+        return column.notna() & (column != '')
+
+    @staticmethod
+    def _on_distinct(
+        column: pd.Series, mask: pd.Series, transform: Callable[[pd.Series], pd.Series]
+    ) -> pd.Series:
+        """
+        Applies a column-wise transform to the distinct values of a column only, and spreads the
+        results back over the rows. Most fields repeat a small set of values, so this avoids
+        cleaning the same string thousands of times.
+        Args:
+            column: raw column
+            mask: rows to transform, the others are set to None
+            transform: function from a series of distinct raw values to their cleaned values
+        Returns:
+            Object column of cleaned values, None where mask is False
+        """
+        codes, distinct = pd.factorize(column.where(mask))
+        cleaned = transform(pd.Series(distinct, dtype=object))
+
+        # Rows outside the mask have code -1, which picks the trailing None
+        lookup = np.empty(len(distinct) + 1, dtype=object)
+        lookup[:-1] = list(cleaned)
+        lookup[-1] = None
+        return pd.Series(lookup[codes], index=column.index, dtype=object)
+
+    @classmethod
+    def format_raw_case_frame(
+        cls, raw_cases: Union[pd.DataFrame, Iterable[Dict[str, str]]]
+    ) -> pd.DataFrame:
+        """
+        Batch version of format_raw_case_dict: cleans a whole data frame (or list) of raw case
+        dictionaries column-wise with pandas string and datetime operations, instead of one
+        dictionary at a time. Produces the same values as format_raw_case_dict, one row per case.
+        Args:
+            raw_cases: data frame, or iterable of dictionaries, of raw cases from BuildRawData
+        Returns:
+            Data frame of cleaned cases with the CLEAN_COLUMNS columns, on the index of raw_cases
+        """
+        if isinstance(raw_cases, pd.DataFrame):
+            raw = raw_cases
+        else:
+            raw = pd.DataFrame.from_records(list(raw_cases))
+
+        def column(name: str) -> pd.Series:
+            if name in raw:
+                return raw[name]
+            return pd.Series(None, index=raw.index, dtype=object)
+
+        clean = {}
+
+        # Clean case number
+        case_numbers = raw['CASE_NUMBER']
+        clean['CASE_NUMBER'] = case_numbers.str.replace(cls.CASE_NUMBER_STRIP, '', regex=True).astype(object)
+
+        # Lower-cased fields; required fields are taken as they are
+        for name, optional in cls.LOWER_CASE_FIELDS.items():
+            values = column(name) if optional else raw[name]
+            mask = cls._present(values) if optional else values.notna()
+            clean[name] = cls._on_distinct(values, mask, lambda distinct: distinct.str.lower())
+
+        # Clean age ranges
+        age_ranges = raw['AGE_RANGE']
+        for name in ('MIN_AGE', 'MAX_AGE'):
+            clean[name] = cls._on_distinct(
+                age_ranges, age_ranges.notna(),
+                lambda distinct: [cls.split_age_range(age_range_str=age_range)[name] for age_range in distinct],
+            )
+
+        # Clean Height: everything before the first 'cm'
+        def height_cm(distinct: pd.Series) -> pd.Series:
+            has_cm = distinct.str.contains('cm', regex=False)
+            return distinct.str.extract(r'^(.*?)cm', flags=re.S)[0].where(has_cm, distinct.str[:-1])
+
+        height = column('HEIGHT')
+        clean['HEIGHT_CM'] = cls._on_distinct(height, cls._present(height), height_cm)
+
+        # Format date found and estimated death date
+        for name, values in (('DATE_FOUND', raw['DATE_FOUND']), ('ESTIMATED_DEATH', column('ESTIMATED_DEATH'))):
+            clean[name] = cls._on_distinct(
+                values, cls._present(values),
+                lambda distinct: pd.to_datetime(distinct, format=cls.DATE_FORMAT).dt.date,
+            )
+
+        # Descriptor fields have no fixed shape and go through the per-value parsers
+        for name, parser in (
+            ('DISTINGUISHING_FEATURES', cls.rough_format_distinguishing_features),
+            ('CLOTHING', cls.rough_format_clothing),
+            ('POSSESSIONS', cls.format_possessions),
+        ):
+            values = column(name)
+            mask = cls._present(values)
+            clean[name] = values.where(mask).map(parser, na_action='ignore').astype(object).where(mask, None)
+
+        return pd.DataFrame({name: clean[name] for name in cls.CLEAN_COLUMNS}, index=raw.index)
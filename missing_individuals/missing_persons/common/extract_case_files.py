@@ -1,10 +1,14 @@
-from typing import Dict
+from typing import Dict, List
 
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as ec
-from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.remote.webelement import WebElement
 from selenium import webdriver
 
+from missing_individuals.utils.browser import wait_visible
+from missing_individuals.utils.metrics import METRICS
+
+from .parse_html import parse_case_page
+
 
 class BuildRawData:
     """
@@ -13,92 +17,96 @@ class BuildRawData:
     Args:
         driver:
             webdriver.Chrome - active webdriver on the URL/webpage in question
+        snapshot:
+            bool - if True, wait once for the case data to render and parse a single
+            snapshot of the page source locally instead of querying each element
+            through the webdriver (optional fields no longer wait out their timeout)
     """
 
-    def __init__(self, driver: webdriver.Chrome):
+    def __init__(self, driver: webdriver.Chrome, snapshot: bool = False):
         self.driver = driver
+        self.snapshot = snapshot
 
     def build_raw_case_dict(self) -> Dict[str, str]:
         """
         Builds raw case data by extracting from URL the webdriver exists at.
         """
+        if self.snapshot:
+            return self.build_raw_case_dict_from_snapshot()
+
+        return self.build_raw_case_dict_from_elements()
+
+    @staticmethod
+    def _wait_visible(parent, by: str, value: str, timeout: float = 5) -> List[WebElement]:
+        """
+        Waits for elements under parent (the driver or an element) to become visible, timing the
+        wait (see wait_visible).
+        """
+        with METRICS.timer('wait'):
+            return wait_visible(parent, by, value, timeout=timeout, page="Case page")
+
+    def build_raw_case_dict_from_snapshot(self) -> Dict[str, str]:
+        """
+        Waits for the case data to be visible, then parses the page source in one pass.
+        """
+        self._wait_visible(self.driver, By.CLASS_NAME, 'CaseData')
+
+        return parse_case_page(page_source=self.driver.page_source)
+
+    def build_raw_case_dict_from_elements(self) -> Dict[str, str]:
+        """
+        Builds raw case data by querying each element through the webdriver.
+        """
 
         case_date_dict = {}
 
         # Find the case number
-        case_number = WebDriverWait(
-            self.driver, 5).until(
-                ec.visibility_of_any_elements_located(
-                    (By.CLASS_NAME, 'PageTitle')))[0].text
+        case_number = self._wait_visible(self.driver, By.CLASS_NAME, 'PageTitle')[0].text
         case_date_dict["CASE_NUMBER"] = case_number
 
         # Find and extract case data
-        case_data_raw = WebDriverWait(
-            self.driver, 5).until(
-                ec.visibility_of_any_elements_located(
-                    (By.CLASS_NAME, 'CaseData')))[0]
+        case_data_raw = self._wait_visible(self.driver, By.CLASS_NAME, 'CaseData')[0]
 
         # All row entries are broken down into divs
         # Divs are split into further divs consisting of 'keys' and 'values'
-        case_data_rows = WebDriverWait(
-            case_data_raw, 5).until(
-                ec.visibility_of_any_elements_located(
-                    (By.CLASS_NAME, 'Entry')))
+        case_data_rows = self._wait_visible(case_data_raw, By.CLASS_NAME, 'Entry')
 
         for entry in case_data_rows:
-            key_ = WebDriverWait(
-                entry, 5).until(
-                    ec.visibility_of_any_elements_located(
-                        (By.CLASS_NAME, 'Key')))[0].text
-
-            value_ = WebDriverWait(
-                entry, 5).until(
-                    ec.visibility_of_any_elements_located(
-                        (By.CLASS_NAME, 'Value')))[0].text
+            key_ = self._wait_visible(entry, By.CLASS_NAME, 'Key')[0].text
+            value_ = self._wait_visible(entry, By.CLASS_NAME, 'Value')[0].text
 
             case_date_dict[key_.upper().replace(" ", "_")] = value_
 
         # Extract location information
-        location_banner = WebDriverWait(
-            self.driver, 5).until(
-                ec.visibility_of_any_elements_located(
-                    (By.CLASS_NAME, 'CaseMap')))[0]
+        location_banner = self._wait_visible(self.driver, By.CLASS_NAME, 'CaseMap')[0]
 
         try:
-            road = WebDriverWait(
-                location_banner, 5).until(
-                    ec.visibility_of_any_elements_located(
-                        (By.CLASS_NAME, 'Road')))[0].text.lower()
+            road = self._wait_visible(location_banner, By.CLASS_NAME, 'Road')[0].text.lower()
             case_date_dict['LOCATION_ROAD'] = road
         except Exception:
+            METRICS.increment('field_failures', field='LOCATION_ROAD')
             case_date_dict['LOCATION_ROAD'] = None
 
         try:
-            county = WebDriverWait(
-                location_banner, 5).until(
-                    ec.visibility_of_any_elements_located(
-                        (By.CLASS_NAME, 'County')))[0].text.lower()
+            county = self._wait_visible(location_banner, By.CLASS_NAME, 'County')[0].text.lower()
             case_date_dict['LOCATION_COUNTY'] = county
         except Exception:
+            METRICS.increment('field_failures', field='LOCATION_COUNTY')
             case_date_dict['LOCATION_COUNTY'] = None
 
         try:
-            country = WebDriverWait(
-                location_banner, 5).until(
-                    ec.visibility_of_any_elements_located(
-                        (By.CLASS_NAME, 'Country')))[0].text.lower()
+            country = self._wait_visible(location_banner, By.CLASS_NAME, 'Country')[0].text.lower()
             case_date_dict['LOCATION_COUNTRY'] = country
         except Exception:
+            METRICS.increment('field_failures', field='LOCATION_COUNTRY')
             case_date_dict['LOCATION_COUNTRY'] = None
 
         # Attempt to find who found them
         try:
-            finders = WebDriverWait(
-                location_banner, 5).until(
-                    ec.visibility_of_any_elements_located(
-                        (By.TAG_NAME, 'strong')))[0].text.lower()
+            finders = self._wait_visible(location_banner, By.TAG_NAME, 'strong')[0].text.lower()
             case_date_dict['FINDING_PARTY'] = finders
         except Exception:
+            METRICS.increment('field_failures', field='FINDING_PARTY')
             case_date_dict['FINDING_PARTY'] = None
 
         return case_date_dict
@@ -1,79 +1,285 @@
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlencode
 
+from bs4 import BeautifulSoup
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as ec
 from selenium.webdriver.support.ui import Select, WebDriverWait
 
+from missing_individuals.utils.browser import wait_visible
+from missing_individuals.utils.fetch import FetchBackend
+from missing_individuals.utils.metrics import METRICS
+from missing_individuals.utils.parsing import make_soup
+from missing_individuals.utils.pool import WorkerPool
+
+from .case_index import CaseIndex, content_hash
+from .engineer_case_data import EngineerRawData
+from .extract_case_files import BuildRawData
+from .parse_html import (parse_case_page, parse_listing_page_urls, parse_listing_tiles,
+                         parse_result_count)
+
 
 class ExtractMissingPersonsUrls:
     """
     A class to extract missing persons' URLs from a website.
+    Args:
+        driver:
+            webdriver.Chrome - webdriver used to click through the search page
+        backend:
+            FetchBackend - if given, the listing pages are fetched with this backend instead of the
+            driver; the warning dialog and page size are then passed as cookie/query parameters
     """
 
     URL: str = "https://missingpersons.police.uk/en-gb/case-search/"
 
-    def __init__(self, driver: webdriver.Chrome):
+    # Browserless equivalents of dismissing the warning dialog and selecting "100 per page"
+    PER_PAGE: int = 100
+    PER_PAGE_PARAM: str = "perPage"
+    WARNING_COOKIE: dict = {"WarningDismissed": "true"}
+
+    # Query parameter holding the page number in the pagination links
+    PAGE_PARAM: str = "page"
+
+    def __init__(self, driver: Optional[webdriver.Chrome] = None, backend: Optional[FetchBackend] = None):
         """
         Initializes the ExtractMissingPersonsUrls class by setting up the Selenium driver and navigating to the URL.
         """
+        if driver is None and backend is None:
+            raise ValueError("Either a driver or a fetch backend is required")
+
         self.driver = driver
+        self.backend = backend
         self.case_urls = []
+        self.failures = []
 
-        self.driver__init__()
+        if self.backend is not None:
+            self.backend__init__()
+        else:
+            self.driver__init__()
 
     def driver__init__(self):
         self.driver.get(self.URL)
         self._ignore_warning_box()
         self._expand_to_100_items()
 
+    @classmethod
+    def build_search_url(cls) -> str:
+        """
+        Returns the search page URL with the page size set as a query parameter.
+        """
+        return f"{cls.URL}?{urlencode({cls.PER_PAGE_PARAM: cls.PER_PAGE})}"
+
+    @classmethod
+    def listing_page_urls(cls, page_source: Union[str, BeautifulSoup], url: str) -> List[str]:
+        """
+        Works out the URL of every listing page from the first one, following the page URLs of its
+        pagination banner (see parse_listing_page_urls). The result count is only checked against
+        the pages found: a shortfall is counted in the pagination_mismatch metric.
+        Args:
+            page_source: raw HTML of the first listing page, or its parsed soup
+            url: URL the first listing page was loaded from
+        Returns:
+            List of listing page URLs, starting with url
+        """
+        soup = make_soup(page_source)
+        page_urls = [url] + parse_listing_page_urls(soup, base_url=url, page_param=cls.PAGE_PARAM)
+
+        total = parse_result_count(soup)
+        if total is not None and len(page_urls) < -(-total // cls.PER_PAGE):
+            METRICS.increment('pagination_mismatch')
+
+        return page_urls
+
+    def backend__init__(self):
+        self.search_url = self.build_search_url()
+        # Parsed once, for both the pagination and the tiles of the first page
+        self.search_page = make_soup(self.backend.get(self.search_url))
+
     def _ignore_warning_box(self):
         """
         Ignores the warning dialog box that may appear on the page.
         """
-        dialog_box = WebDriverWait(self.driver, 5).until(
-            ec.visibility_of_any_elements_located((By.CLASS_NAME, 'Dialog')))[0]
-        close_tag = WebDriverWait(dialog_box, 5).until(
-            ec.visibility_of_any_elements_located((By.TAG_NAME, 'a')))[-1]
+        try:
+            dialog_box = WebDriverWait(self.driver, 5).until(
+                ec.visibility_of_any_elements_located((By.CLASS_NAME, 'Dialog')))[0]
+            close_tag = WebDriverWait(dialog_box, 5).until(
+                ec.visibility_of_any_elements_located((By.TAG_NAME, 'a')))[-1]
+        except TimeoutException:
+            return
         close_tag.click()
 
     def _expand_to_100_items(self):
         """
         Expands the number of items per page to 100.
         """
-        dropdown_per_page = Select(WebDriverWait(self.driver, 5).until(
-            ec.visibility_of_any_elements_located((By.ID, 'setPerPage')))[-1])
+        dropdown_per_page = Select(wait_visible(self.driver, By.ID, 'setPerPage', page="Listing page")[-1])
         dropdown_per_page.select_by_visible_text("100 per page")
 
     def return_page_urls(self):
         """
-        Returns a list of URLs for each page in the pagination.
+        Builds the URL of every listing page from the pagination of the first one (see
+        listing_page_urls), rather than following the pagination anchors, which hide pages behind
+        an ellipsis on large result sets.
         """
-        urls_banner = WebDriverWait(self.driver, 5).until(
-            ec.visibility_of_any_elements_located((By.CLASS_NAME, 'Pagination')))[0]
-        page_urls_tags = WebDriverWait(urls_banner, 5).until(
-            ec.visibility_of_any_elements_located((By.TAG_NAME, 'a')))[1:-2]
-        self.page_urls = [self.driver.current_url]
-        for tag in page_urls_tags:
-            href = tag.get_attribute("href")
-            if href:
-                self.page_urls.append(href)
+        if self.backend is not None:
+            first_url, page_source = self.search_url, self.search_page
+        else:
+            wait_visible(self.driver, By.CLASS_NAME, 'CaseGrid', page="Listing page")
+            first_url, page_source = self.driver.current_url, self.driver.page_source
 
-    def extract_case_urls(self) -> List[str]:
+        self.page_urls = self.listing_page_urls(page_source, url=first_url)
+
+    def extract_page_case_tiles(self, url: str) -> List[Dict[str, str]]:
         """
-        Extracts case URLs from each page and appends them to the case_urls list.
+        Extracts the case tiles from a single listing page.
+        Args:
+            url: URL of the listing page
+        Returns:
+            List of {"URL": case URL, "TEXT": visible text of the tile}
+        """
+        if self.backend is not None:
+            page_source = self.search_page if url == self.search_url else self.backend.get(url)
+            return parse_listing_tiles(page_source, base_url=url)
+
+        self.driver.get(url)
+        case_grid = wait_visible(self.driver, By.CLASS_NAME, 'CaseGrid', page="Listing page")[0]
+        case_url_tags = wait_visible(case_grid, By.TAG_NAME, 'a', page="Listing page")
+
+        return [{"URL": tag.get_attribute("href"), "TEXT": tag.text} for tag in case_url_tags]
+
+    def extract_page_case_urls(self, url: str) -> List[str]:
+        """
+        Extracts the case URLs from a single listing page.
+        Args:
+            url: URL of the listing page
+        Returns:
+            List of case URLs on the page
         """
+        return [tile["URL"] for tile in self.extract_page_case_tiles(url)]
 
+    def iter_case_urls(self) -> Iterator[str]:
+        """
+        Yields the case URLs one listing page at a time, as each page is read.
+        """
         self.return_page_urls()
         for url in self.page_urls:
+            yield from self.extract_page_case_urls(url)
+
+    def extract_case_tiles(self, workers: int = 1) -> List[Dict[str, str]]:
+        """
+        Extracts the case tiles of every listing page.
+        Args:
+            workers: number of listing pages fetched at once (needs a fetch backend). Pages that
+                cannot be read are skipped and recorded with their error in self.failures
+        Returns:
+            List of {"URL": case URL, "TEXT": visible text of the tile}, in listing order
+        """
+        self.return_page_urls()
+        self.failures = []
 
+        if workers <= 1:
+            return [tile for url in self.page_urls for tile in self.extract_page_case_tiles(url)]
+
+        if self.backend is None:
+            raise ValueError("Listing pages can only be fetched concurrently with a fetch backend")
+
+        pool = WorkerPool(workers=workers, failure_budget=len(self.page_urls) + 1)
+        pages = pool.map(lambda _, url: self.extract_page_case_tiles(url), self.page_urls)
+        self.failures = pool.failures
+
+        return [tile for page in pages for tile in page]
+
+    def extract_case_urls(self, workers: int = 1) -> List[str]:
+        """
+        Extracts case URLs from each page and appends them to the case_urls list.
+        Args:
+            workers: number of listing pages fetched at once (see extract_case_tiles)
+        Returns:
+            List of case URLs, in listing order
+        """
+        if workers <= 1:
+            self.case_urls.extend(self.iter_case_urls())
+        else:
+            self.case_urls.extend(tile["URL"] for tile in self.extract_case_tiles(workers=workers))
+
+        return self.case_urls
+
+    def extract_case(self, url: str, snapshot: bool = False) -> Dict[str, str]:
+        """
+        Fetches a case page and cleans its data.
+        Args:
+            url: URL of the case page
+            snapshot: when using the driver, parse one snapshot of the page (see BuildRawData)
+        Returns:
+            Cleaned case dictionary
+        """
+        if self.backend is not None:
+            raw_case_dict = parse_case_page(page_source=self.backend.get(url))
+        else:
             self.driver.get(url)
-            case_grid = WebDriverWait(self.driver, 5).until(
-                ec.visibility_of_any_elements_located((By.CLASS_NAME, 'CaseGrid')))[0]
-            case_url_tags = WebDriverWait(case_grid, 5).until(
-                ec.visibility_of_any_elements_located((By.TAG_NAME, 'a')))
-            for tag in case_url_tags:
-                self.case_urls.append(tag.get_attribute("href"))
+            raw_case_dict = BuildRawData(driver=self.driver, snapshot=snapshot).build_raw_case_dict()
+
+        return EngineerRawData.format_raw_case_dict(case_date_dict=raw_case_dict)
+
+    def iter_cases(
+        self, case_urls: Optional[Iterable[str]] = None, snapshot: bool = False
+    ) -> Iterator[Tuple[str, Dict[str, str]]]:
+        """
+        Yields each case as soon as it has been fetched and cleaned, so that writing (or any other
+        stage) can start before the crawl is finished. Cases that cannot be extracted are skipped
+        and recorded with their error in self.failures.
+        Args:
+            case_urls: case URLs to fetch; defaults to iter_case_urls(), so listing pages are only
+                read as the cases before them are used up
+            snapshot: when using the driver, parse one snapshot of each page (see BuildRawData)
+        Returns:
+            Iterator of (case URL, cleaned case dictionary)
+        """
+        self.failures = []
+
+        for url in (self.iter_case_urls() if case_urls is None else case_urls):
+            try:
+                case_dict = self.extract_case(url, snapshot=snapshot)
+            except Exception as e:
+                self.failures.append((url, e))
+                continue
+
+            yield url, case_dict
+
+    def extract_changed_case_urls(self, index: CaseIndex) -> List[str]:
+        """
+        Extracts only the URLs of cases that are new, or whose listing tile changed, since they
+        were last recorded in the index. Listing pages are walked newest first and paging stops at
+        the first page holding nothing but known, unchanged cases.
+        The listing hash of each returned case is kept in listing_hashes, to be stored in the index
+        once the case has been scraped.
+        Args:
+            index: CaseIndex of previously scraped cases
+        Returns:
+            List of new or changed case URLs
+        """
+        self.listing_hashes = {}
+
+        self.return_page_urls()
+        for url in self.page_urls:
+            tiles = self.extract_page_case_tiles(url)
+
+            unchanged = []
+            for tile in tiles:
+                listing_hash = content_hash(tile["TEXT"])
+                if index.is_unchanged(tile["URL"], listing_hash):
+                    unchanged.append(tile["URL"])
+                else:
+                    self.listing_hashes[tile["URL"]] = listing_hash
+                    self.case_urls.append(tile["URL"])
+
+            index.mark_seen(unchanged)
+
+            # Nothing new on this page, so everything older is already known
+            if tiles and len(unchanged) == len(tiles):
+                break
 
         return self.case_urls
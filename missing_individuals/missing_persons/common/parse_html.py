@@ -0,0 +1,192 @@
+import re
+from typing import Dict, List, Optional, Union
+from urllib.parse import parse_qs, parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from bs4 import BeautifulSoup
+
+from missing_individuals.utils.metrics import METRICS
+from missing_individuals.utils.parsing import find_visible, make_soup, visible_text
+
+# Results summary above the CaseGrid, stating the total number of search results,
+# e.g. "Showing 1 - 100 of 2,345 results"
+RESULT_COUNT_CLASS = 'ResultCount'
+RESULT_COUNT = re.compile(r"([\d,]+)\s+(?:results?|cases?)\b", re.IGNORECASE)
+
+
+def parse_case_page(page_source: str) -> Dict[str, str]:
+    """
+    Builds the raw case dictionary from a static snapshot of a case page.
+    Produces the same dictionary as BuildRawData.build_raw_case_dict does through the webdriver.
+    Args:
+        page_source: raw HTML of a missingpersons.police.uk case page
+    Returns:
+        Raw case dictionary, to be cleaned by EngineerRawData
+    Raises:
+        ValueError: if one of the mandatory page sections cannot be found
+    """
+    soup = make_soup(page_source)
+
+    case_date_dict = {}
+
+    # Find the case number
+    page_title = find_visible(soup, class_name='PageTitle')
+    if not page_title:
+        raise ValueError("Case page has no PageTitle element")
+    case_date_dict["CASE_NUMBER"] = visible_text(page_title[0])
+
+    # Find and extract case data
+    case_data_raw = find_visible(soup, class_name='CaseData')
+    if not case_data_raw:
+        raise ValueError("Case page has no CaseData element")
+
+    # All row entries are broken down into divs
+    # Divs are split into further divs consisting of 'keys' and 'values'
+    for entry in find_visible(case_data_raw[0], class_name='Entry'):
+        key_ = find_visible(entry, class_name='Key')
+        value_ = find_visible(entry, class_name='Value')
+        if not key_ or not value_:
+            raise ValueError("Case data entry is missing its Key or Value")
+
+        case_date_dict[visible_text(key_[0]).upper().replace(" ", "_")] = visible_text(value_[0])
+
+    # Extract location information
+    location_banner = find_visible(soup, class_name='CaseMap')
+    if not location_banner:
+        raise ValueError("Case page has no CaseMap element")
+
+    for key_, class_name in (
+        ('LOCATION_ROAD', 'Road'),
+        ('LOCATION_COUNTY', 'County'),
+        ('LOCATION_COUNTRY', 'Country'),
+    ):
+        found = find_visible(location_banner[0], class_name=class_name)
+        if not found:
+            # Counted like the element waits that run out in BuildRawData
+            METRICS.increment('field_failures', field=key_)
+        text = visible_text(found[0]) if found else ''
+        case_date_dict[key_] = text.lower() if text else None
+
+    # Attempt to find who found them
+    finders = find_visible(location_banner[0], tag_name='strong')
+    if not finders:
+        METRICS.increment('field_failures', field='FINDING_PARTY')
+    text = visible_text(finders[0]) if finders else ''
+    case_date_dict['FINDING_PARTY'] = text.lower() if text else None
+
+    return case_date_dict
+
+
+def _pagination_links(soup: BeautifulSoup, base_url: str) -> List[str]:
+    # Absolute URLs of the anchors of the Pagination banner, in page order
+    urls_banner = find_visible(soup, class_name='Pagination')
+    if not urls_banner:
+        return []
+
+    return [
+        urljoin(base_url, tag.get('href'))
+        for tag in find_visible(urls_banner[0], tag_name='a') if tag.get('href')
+    ]
+
+
+def _page_number(url: str, page_param: str) -> Optional[int]:
+    values = [value for value in parse_qs(urlsplit(url).query).get(page_param, []) if value.isdigit()]
+    return int(values[0]) if values else None
+
+
+def _with_page(url: str, page_param: str, page: int) -> str:
+    parts = urlsplit(url)
+    query = [
+        (key, str(page) if key == page_param else value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+    ]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def parse_pagination_urls(page_source: Union[str, BeautifulSoup], base_url: str) -> List[str]:
+    """
+    Extracts the listing page URLs from the Pagination banner of a search page.
+    Mirrors the anchors the driver used to follow: the first anchor and the last two
+    (next/last page) are skipped.
+    Args:
+        page_source: raw HTML of a listing page, or its parsed soup
+        base_url: URL the page was loaded from, used to resolve relative links
+    Returns:
+        List of absolute listing page URLs, excluding base_url itself
+    """
+    return _pagination_links(make_soup(page_source), base_url)[1:-2]
+
+
+def parse_result_count(page_source: Union[str, BeautifulSoup]) -> Optional[int]:
+    """
+    Reads the total number of search results from the results summary of a listing page.
+    Args:
+        page_source: raw HTML of a listing page, or its parsed soup
+    Returns:
+        Number of results, or None if the page does not state it
+    """
+    summary = find_visible(make_soup(page_source), class_name=RESULT_COUNT_CLASS)
+    match = RESULT_COUNT.search(visible_text(summary[0])) if summary else None
+    return int(match.group(1).replace(',', '')) if match else None
+
+
+def parse_listing_page_urls(page_source: Union[str, BeautifulSoup], base_url: str, page_param: str) -> List[str]:
+    """
+    Builds the URL of every listing page after the first one from its Pagination banner.
+    On large result sets the banner hides pages behind an ellipsis, but always links the last
+    page, so the first pagination link carrying a page number is used as the template of every
+    page URL, up to the highest page linked. Links without page numbers are followed as they are
+    (see parse_pagination_urls).
+    Args:
+        page_source: raw HTML of the first listing page, or its parsed soup
+        base_url: URL the page was loaded from, used to resolve relative links
+        page_param: query parameter holding the page number
+    Returns:
+        List of absolute listing page URLs in page order, excluding base_url itself
+    """
+    links = _pagination_links(make_soup(page_source), base_url)
+
+    numbered = [(_page_number(url, page_param), url) for url in links]
+    numbered = [(page, url) for page, url in numbered if page is not None]
+    if not numbered:
+        return links[1:-2]
+
+    template = numbered[0][1]
+    last_page = max(page for page, _ in numbered)
+    return [_with_page(template, page_param, page) for page in range(2, last_page + 1)]
+
+
+def parse_listing_tiles(page_source: Union[str, BeautifulSoup], base_url: str) -> List[Dict[str, str]]:
+    """
+    Extracts the case tiles from the CaseGrid of a listing page.
+    Args:
+        page_source: raw HTML of a listing page, or its parsed soup
+        base_url: URL the page was loaded from, used to resolve relative links
+    Returns:
+        List of {"URL": absolute case URL, "TEXT": visible text of the tile}, in page order
+    Raises:
+        ValueError: if the page has no CaseGrid element
+    """
+    soup = make_soup(page_source)
+
+    case_grid = find_visible(soup, class_name='CaseGrid')
+    if not case_grid:
+        raise ValueError("Listing page has no CaseGrid element")
+
+    return [
+        {"URL": urljoin(base_url, tag.get('href')), "TEXT": visible_text(tag)}
+        for tag in find_visible(case_grid[0], tag_name='a') if tag.get('href')
+    ]
+
+
+def parse_listing_case_urls(page_source: Union[str, BeautifulSoup], base_url: str) -> List[str]:
+    """
+    Extracts the case URLs from the CaseGrid of a listing page.
+    Args:
+        page_source: raw HTML of a listing page, or its parsed soup
+        base_url: URL the page was loaded from, used to resolve relative links
+    Returns:
+        List of absolute case URLs
+    Raises:
+        ValueError: if the page has no CaseGrid element
+    """
+    return [tile["URL"] for tile in parse_listing_tiles(page_source, base_url=base_url)]
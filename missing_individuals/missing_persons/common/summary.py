@@ -0,0 +1,111 @@
+import re
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from missing_individuals.utils.metrics import METRICS
+
+from .case_index import content_hash
+from .engineer_case_data import EngineerRawData
+
+# Columns of a summary record, in order
+SUMMARY_COLUMNS = ['CASE_NUMBER', 'URL', 'GENDER', 'DATE_FOUND', 'LOCATION', 'LISTING_HASH', 'ENRICHED']
+
+# Summary fields read from the listing tiles, and the field of the cleaned case each one matches
+TILE_FIELDS: Dict[str, str] = {
+    'CASE_NUMBER': 'CASE_NUMBER',
+    'GENDER': 'GENDER',
+    'DATE_FOUND': 'DATE_FOUND',
+    'LOCATION': 'LOCATION_COUNTY',
+}
+
+# Date formats used on the listing tiles
+TILE_DATE_FORMATS = (EngineerRawData.DATE_FORMAT, "%d/%m/%Y", "%Y-%m-%d")
+
+TILE_LINE = re.compile(r'^\s*([^:]+?)\s*:\s*(.*?)\s*$')
+
+
+def _tile_date(text: str) -> Optional[date]:
+    for date_format in TILE_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _clean(field: str, line: str, value: str) -> object:
+    # Cleans a labelled tile line the way EngineerRawData cleans the case field. Case numbers are
+    # cleaned from the whole line, as the case page title they are cleaned from keeps its label.
+    if field == 'CASE_NUMBER':
+        return EngineerRawData.clean_case_number(case_number_str=line)
+    if field == 'DATE_FOUND':
+        return _tile_date(value)
+    return value.lower()
+
+
+def _labelled_lines(text: str) -> Iterable[Tuple[str, str, str]]:
+    # (label, line, value) of each "Label: value" line of a tile
+    for line in text.split('\n'):
+        match = TILE_LINE.match(line)
+        if match and match.group(2):
+            yield match.group(1).lower(), line.strip(), match.group(2)
+
+
+def learn_tile_labels(tiles: Iterable[Dict[str, str]], cases: Iterable[Dict[str, object]]) -> Dict[str, str]:
+    """
+    Learns which summary field each tile label holds from sample tiles and their full cases, so the
+    summary reads whatever labels the listing actually uses. A label is mapped to the field its
+    value matches (once cleaned) in most of the samples showing it.
+    Args:
+        tiles: {"URL": case URL, "TEXT": visible text of the tile}, from ExtractMissingPersonsUrls
+        cases: cleaned case dictionary of each tile, from EngineerRawData
+    Returns:
+        Dictionary of tile label (lower case) to summary field
+    """
+    seen = Counter()
+    matches = Counter()
+    for tile, case in zip(tiles, cases):
+        for label, line, value in _labelled_lines(tile["TEXT"]):
+            seen[label] += 1
+            for field, case_field in TILE_FIELDS.items():
+                if case.get(case_field) is not None and _clean(field, line, value) == case[case_field]:
+                    matches[label, field] += 1
+
+    labels = {}
+    for (label, field), count in matches.most_common():
+        if label not in labels and 2 * count >= seen[label]:
+            labels[label] = field
+    return labels
+
+
+def summarise_tile(tile: Dict[str, str], labels: Dict[str, str]) -> Dict[str, object]:
+    """
+    Builds a summary record from a listing page tile, without visiting the case page.
+    Labelled lines ("Date found: 12 March 2004") are read through the labels learned by
+    learn_tile_labels, and cleaned the way EngineerRawData cleans the full case, so summaries and
+    full cases can be matched on CASE_NUMBER. Fields the tile does not show, or whose value cannot
+    be read, are counted in the field_failures metric.
+    Args:
+        tile: {"URL": case URL, "TEXT": visible text of the tile}, from ExtractMissingPersonsUrls
+        labels: dictionary of tile label to summary field, from learn_tile_labels
+    Returns:
+        Dictionary of the SUMMARY_COLUMNS, with None for the fields the tile does not show and
+        ENRICHED set to False, as the full case still has to be scraped
+    """
+    summary = dict.fromkeys(SUMMARY_COLUMNS)
+
+    for label, line, value in _labelled_lines(tile["TEXT"]):
+        field = labels.get(label)
+        if field is not None and summary[field] is None:
+            summary[field] = _clean(field, line, value)
+
+    for field in TILE_FIELDS:
+        if summary[field] is None:
+            METRICS.increment('field_failures', field=f'TILE_{field}')
+
+    summary['URL'] = tile["URL"]
+    summary['LISTING_HASH'] = content_hash(tile["TEXT"])
+    summary['ENRICHED'] = False
+
+    return summary
@@ -0,0 +1,38 @@
+import argparse
+from typing import List, Optional
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(
+        description="Load scraped missing persons cases into the SQLite case store")
+    parser.add_argument(
+        'paths', nargs='+',
+        help="CSV or Parquet outputs of the missing persons scraper, loaded in order (later ones win)")
+    parser.add_argument(
+        '--store', default=None,
+        help="Path of the case store (defaults to data/missing_persons_store.sqlite)")
+    parser.add_argument(
+        '--chunk-size', type=int, default=5000,
+        help="Number of CSV rows written per transaction")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+
+    args = parse_args(argv)
+
+    import missing_individuals.utils.utils as utils
+    from missing_individuals.missing_persons.common.case_store import CaseStore
+
+    data_path, _ = utils.build_dirs()
+
+    with CaseStore(args.store or f"{data_path}/missing_persons_store.sqlite") as store:
+        for path in args.paths:
+            print(f"Loaded {store.load(path, chunk_size=args.chunk_size)} cases from {path}")
+        print(f"{len(store)} cases in {store.path}")
+
+
+if __name__ == "__main__":
+    main()
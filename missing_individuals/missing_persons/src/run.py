@@ -1,56 +1,653 @@
-import sys
+import argparse
+import itertools
+import os
+import time
 from datetime import date
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
 
-import chromedriver_autoinstaller
-import pandas as pd
-from selenium import webdriver
 
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
 
-def main():
+    parser = argparse.ArgumentParser(
+        description="Scrape unidentified person cases from missingpersons.police.uk")
+    parser.add_argument(
+        '--snapshot', action='store_true',
+        help="Parse each case page from a single page source snapshot instead of per-element waits")
+    parser.add_argument(
+        '--backend', choices=('chrome', 'http'), default='chrome',
+        help="Fetch listing and case pages with Chrome or a pooled HTTP session (Chrome is kept as a fallback)")
+    parser.add_argument(
+        '--base-url', default=None,
+        help="Send HTTP backend requests to this host instead, e.g. a local server with fixture pages")
+    parser.add_argument(
+        '--listing-concurrency', type=int, default=8,
+        help="Listing pages fetched at once during discovery (with --backend http)")
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help="Number of workers (each with its own headless Chrome session) to spread the case pages over")
+    parser.add_argument(
+        '--failure-budget', type=int, default=5,
+        help="Failed case pages after which a worker gives up (with --workers)")
+    parser.add_argument(
+        '--max-attempts', type=int, default=3,
+        help="Attempts at a case page before it counts as failed; only timeouts, dropped connections, "
+             "rate limiting and server errors are retried, after an exponential backoff with jitter")
+    parser.add_argument(
+        '--backoff', type=float, default=2,
+        help="Upper bound in seconds of the first retry backoff, doubled for every further retry")
+    parser.add_argument(
+        '--page-deadline', type=float, default=120,
+        help="Seconds after which a case page is abandoned (and its browser session replaced) and retried later")
+    parser.add_argument(
+        '--breaker-threshold', type=int, default=5,
+        help="Consecutive transient failures against a host after which its pages fail fast for a while")
+    parser.add_argument(
+        '--breaker-cooldown', type=float, default=60,
+        help="Seconds a host is left alone once its circuit breaker opens")
+    parser.add_argument(
+        '--async-crawl', action='store_true',
+        help="Discover and fetch pages concurrently with the trio crawl engine over HTTP (no browser)")
+    parser.add_argument(
+        '--concurrency', type=int, default=8,
+        help="Maximum number of requests in flight (with --async-crawl)")
+    parser.add_argument(
+        '--rate-per-host', type=float, default=2.0,
+        help="Sustained requests per second allowed to each host (with --async-crawl)")
+    parser.add_argument(
+        '--timeout', type=float, default=30,
+        help="Seconds before a single request is abandoned (with --async-crawl)")
+    parser.add_argument(
+        '--chunk-size', type=int, default=500,
+        help="Number of cleaned cases buffered before they are written out")
+    parser.add_argument(
+        '--parquet', action='store_true',
+        help="Also write the cases, with typed and nested columns, to a Parquet dataset partitioned by scrape date")
+    parser.add_argument(
+        '--arrow', action='store_true',
+        help="Also write the cases, with typed and nested columns, to an Arrow IPC file in the same dataset")
+    parser.add_argument(
+        '--dataset-dir', default=None,
+        help="Root of the partitioned Parquet/Arrow dataset (defaults to <output dir>/missing_persons)")
+    parser.add_argument(
+        '--store', default=None,
+        help="Also upsert the cases into this SQLite case store (indexed and full-text searchable)")
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help="Only scrape cases that are new or changed since the last run, using a persistent case index")
+    parser.add_argument(
+        '--index-path', default=None,
+        help="Path of the case index used by --incremental, --summary and --enrich-pending "
+             "(defaults to data/missing_persons_index.sqlite)")
+    parser.add_argument(
+        '--summary', action='store_true',
+        help="Only read the listing pages: write a summary record per case (case number, date found, gender, "
+             "location) and mark new or changed cases in the case index for enrichment later")
+    parser.add_argument(
+        '--enrich-pending', action='store_true',
+        help="Fully scrape the cases that a --summary run marked for enrichment, without reading the listing")
+    parser.add_argument(
+        '--label-samples', type=int, default=5,
+        help="Cases fully scraped by --summary to learn which tile labels hold which summary fields")
+    parser.add_argument(
+        '--cache-dir', default=None,
+        help="Keep the raw HTML of every fetched page in this on-disk cache")
+    parser.add_argument(
+        '--cache-ttl', type=float, default=24,
+        help="Hours after which a cached page is fetched again (with --cache-dir)")
+    parser.add_argument(
+        '--cache-max-mb', type=float, default=None,
+        help="Size cap of the page cache, least recently used pages are evicted beyond it")
+    parser.add_argument(
+        '--replay', action='store_true',
+        help="Re-run extraction and engineering over every cached case page, without fetching anything")
+    parser.add_argument(
+        '--checkpoint-dir', default=None,
+        help="Where run progress is checkpointed (defaults to data/checkpoints/missing_persons)")
+    parser.add_argument(
+        '--resume', action='store_true',
+        help="Resume the checkpointed run: skip discovery and finished cases, retry failed ones")
+    parser.add_argument(
+        '--queue', default=None,
+        help="Split the crawl with other processes or boxes through this SQLite work queue "
+             "(on a filesystem every box can reach): cases are leased a batch at a time and acked once written")
+    parser.add_argument(
+        '--seed', action='store_true',
+        help="Discover the case URLs into the --queue and exit, for the workers to scrape")
+    parser.add_argument(
+        '--merge', action='store_true',
+        help="Combine the output files of every --queue worker into one CSV, in listing order, and exit")
+    parser.add_argument(
+        '--worker-id', default=None,
+        help="Name of this --queue worker, used in its output file name (defaults to <host>-<pid>)")
+    parser.add_argument(
+        '--lease-batch', type=int, default=50,
+        help="Cases leased from the --queue at a time")
+    parser.add_argument(
+        '--lease-seconds', type=float, default=1800,
+        help="Seconds a leased case has to be written before the --queue hands it to another worker")
+    parser.add_argument(
+        '--queue-poll', type=float, default=30,
+        help="Seconds between checks of the --queue while it is not seeded, or while other workers hold "
+             "the remaining leases")
+    parser.add_argument(
+        '--output-dir', default=None,
+        help="Directory the scraped data and metrics are written to (defaults to data/)")
+    parser.add_argument(
+        '--metrics-path', default=None,
+        help="Path (without extension) of the JSON and Prometheus metrics files "
+             "(defaults to <output dir>/metrics/missing_persons)")
+    parser.add_argument(
+        '--browser-max-pages', type=int, default=500,
+        help="Pages loaded by a Chrome session before it is restarted (0 for no limit)")
+    parser.add_argument(
+        '--browser-max-rss-mb', type=float, default=1500,
+        help="Resident memory in MB of a Chrome session (browser and renderers) beyond which it is restarted "
+             "(0 for no limit)")
+    parser.add_argument(
+        '--lean-browser', action='store_true',
+        help="Run Chrome headless with eager page loads, a small window, no extensions and no images, "
+             "stylesheets, fonts or media")
 
-    todays_date = date.today().strftime("%Y_%m_%d")
-    FILE_NAME: str = f'missing_persons_{todays_date}.csv'
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+
+    args = parse_args(argv)
+
+    if args.incremental and args.async_crawl:
+        raise SystemExit("--incremental walks the listing pages in order and cannot be used with --async-crawl")
+    if args.replay and (args.incremental or args.async_crawl):
+        raise SystemExit("--replay cannot be combined with --incremental or --async-crawl")
+    if args.resume and (args.replay or args.async_crawl):
+        raise SystemExit("--resume cannot be combined with --replay or --async-crawl")
+    if args.summary and (args.incremental or args.enrich_pending or args.replay or args.async_crawl or args.resume):
+        raise SystemExit("--summary cannot be combined with a full scrape, --replay or --resume")
+    if args.summary and args.label_samples < 1:
+        raise SystemExit("--label-samples must be at least 1")
+    if args.enrich_pending and (args.incremental or args.replay or args.async_crawl):
+        raise SystemExit("--enrich-pending cannot be combined with --incremental, --replay or --async-crawl")
+    if (args.seed or args.merge) and not args.queue:
+        raise SystemExit("--seed and --merge need a --queue")
+    if args.queue and (args.incremental or args.summary or args.enrich_pending or args.replay or args.async_crawl
+                       or args.resume or args.parquet or args.arrow):
+        raise SystemExit("--queue cannot be combined with --incremental, --summary, --enrich-pending, --replay, "
+                         "--async-crawl, --resume, --parquet or --arrow")
 
-    folder_path = '../../'
-    sys.path.append(folder_path)
+    todays_date = date.today().strftime("%Y_%m_%d")
+    FILE_STEM: str = f'missing_persons_{todays_date}'
+    scrape_date = date.today().isoformat()
 
     import missing_individuals.utils.utils as utils
+    from missing_individuals.utils.browser import ManagedBrowser
+    from missing_individuals.utils.cache import CachingFetchBackend, PageCache
+    from missing_individuals.utils.checkpoint import Checkpoint
+    from missing_individuals.utils.crawler import AsyncCrawler
+    from missing_individuals.utils.fetch import HttpFetchBackend
+    from missing_individuals.utils.metrics import METRICS
+    from missing_individuals.utils.pool import WorkerPool
+    from missing_individuals.utils.retry import CircuitBreaker, RetryPolicy
+    from missing_individuals.utils.writer import ChunkedWriter
 
     from missing_individuals import (BuildRawData, EngineerRawData,
                                      ExtractMissingPersonsUrls)
+    from missing_individuals.missing_persons.common.case_index import CaseIndex, content_hash
+    from missing_individuals.missing_persons.common.crawl import (discover_case_urls,
+                                                                   process_case_page)
+    from missing_individuals.missing_persons.common.parse_html import parse_case_page
 
     data_path, chromedriver_path = utils.build_dirs()
 
-    chromedriver_autoinstaller.install(path=chromedriver_path)
-    driver = webdriver.Chrome()
+    output_path = args.output_dir or data_path
+    os.makedirs(output_path, exist_ok=True)
+    output_stem = f"{output_path}/{FILE_STEM}"
+
+    def report_metrics() -> None:
+        metrics_path = args.metrics_path or f"{output_path}/metrics/missing_persons"
+        METRICS.write(metrics_path)
+        print(METRICS.summary())
+        print(f"Metrics written to {metrics_path}.json and {metrics_path}.prom")
+
+    def managed_browser(**kwargs) -> ManagedBrowser:
+        return ManagedBrowser(
+            chromedriver_path=chromedriver_path,
+            lean=args.lean_browser,
+            max_pages=args.browser_max_pages or None,
+            max_rss_mb=args.browser_max_rss_mb or None,
+            **kwargs,
+        )
+
+    chrome = managed_browser()
+    backend = None
+
+    retry = RetryPolicy(
+        max_attempts=args.max_attempts,
+        base_delay=args.backoff,
+        deadline=args.page_deadline,
+        breaker=CircuitBreaker(threshold=args.breaker_threshold, cooldown=args.breaker_cooldown),
+    )
+
+    cache = None
+    if args.cache_dir or args.replay:
+        cache = PageCache(
+            root=args.cache_dir or f"{data_path}/page_cache",
+            ttl=args.cache_ttl * 3600,
+            max_bytes=int(args.cache_max_mb * 1024 ** 2) if args.cache_max_mb else None,
+        )
+
+    def http_backend(pool_size: int, **kwargs) -> CachingFetchBackend:
+        http = HttpFetchBackend(
+            base_url=args.base_url,
+            cookies=ExtractMissingPersonsUrls.WARNING_COOKIE,
+            pool_size=pool_size,
+            **kwargs,
+        )
+        return CachingFetchBackend(cache=cache, backend=http) if cache is not None else http
+
+    store = None
+    if args.store:
+        from missing_individuals.missing_persons.common.case_store import CaseStore
+
+        store = CaseStore(args.store)
+
+    index = None
+    pending_index_updates = {}
+    if args.incremental or args.summary or args.enrich_pending:
+        index = CaseIndex(args.index_path or f"{data_path}/missing_persons_index.sqlite")
+
+    work_queue = None
+    if args.queue:
+        from missing_individuals.utils.work_queue import WorkQueue
+
+        work_queue = WorkQueue(args.queue, worker_id=args.worker_id, lease_seconds=args.lease_seconds)
+
+    if args.seed:
+        if args.backend == 'http':
+            backend = http_backend(pool_size=max(10, args.listing_concurrency))
+            extract = ExtractMissingPersonsUrls(backend=backend)
+        else:
+            extract = ExtractMissingPersonsUrls(driver=chrome.get())
+
+        case_urls = extract.extract_case_urls(workers=args.listing_concurrency if backend is not None else 1)
+        for url, error in extract.failures:
+            print(f"Failed to read listing page {url}: {error!r}")
+            METRICS.increment('page_failures', error=type(error).__name__)
+
+        added = work_queue.add(case_urls)
+        # Workers name their output after the crawl's date, whenever they start
+        work_queue.set_metadata(seeded=True, file_stem=FILE_STEM, scrape_date=scrape_date)
+        print(f"Queued {added} new cases out of {len(case_urls)} listed in {args.queue}")
+
+        work_queue.close()
+        if backend is not None:
+            backend.close()
+        chrome.quit()
+        report_metrics()
+        return
+
+    if args.merge:
+        metadata = work_queue.metadata()
+        if not metadata.get('seeded'):
+            raise SystemExit(f"The queue {args.queue} has not been seeded")
+
+        merged_path = f"{output_path}/{metadata['file_stem']}.csv"
+        merged = work_queue.merge(merged_path)
+        counts = work_queue.counts()
+        print(f"Merged {merged} cases into {merged_path}; {counts['pending'] + counts['leased']} cases "
+              f"still to do, {counts['failed']} failed")
+
+        work_queue.close()
+        return
+
+    if work_queue is not None:
+        while not work_queue.metadata().get('seeded'):
+            print(f"Waiting for {args.queue} to be seeded")
+            time.sleep(args.queue_poll)
+
+        # Every worker writes its own file, named after the crawl it belongs to
+        metadata = work_queue.metadata()
+        output_stem = f"{output_path}/{metadata['file_stem']}.{work_queue.worker_id}"
+        scrape_date = metadata['scrape_date']
+
+    if args.summary:
+        from missing_individuals.missing_persons.common.summary import (SUMMARY_COLUMNS, TILE_FIELDS,
+                                                                        learn_tile_labels, summarise_tile)
+
+        if args.backend == 'http':
+            backend = http_backend(pool_size=max(10, args.listing_concurrency))
+            extract = ExtractMissingPersonsUrls(backend=backend)
+        else:
+            extract = ExtractMissingPersonsUrls(driver=chrome.get())
+
+        with METRICS.timer('navigate'):
+            tiles = extract.extract_case_tiles(workers=args.listing_concurrency if backend is not None else 1)
+        for url, error in extract.failures:
+            print(f"Failed to read listing page {url}: {error!r}")
+            METRICS.increment('page_failures', error=type(error).__name__)
+
+        # The tile labels are learned from the full cases of the first tiles
+        samples, sample_cases = [], []
+        for tile in tiles[:args.label_samples]:
+            try:
+                sample_cases.append(extract.extract_case(tile["URL"]))
+            except Exception as e:
+                print(f"Failed to extract {tile['URL']}: {e!r}")
+                METRICS.increment('page_failures', error=type(e).__name__)
+                continue
+            samples.append(tile)
+
+        labels = learn_tile_labels(samples, sample_cases)
+        unlabelled = [field for field in TILE_FIELDS if field not in labels.values()]
+        print(f"Learned tile labels {labels} from {len(samples)} cases")
+        if unlabelled:
+            print(f"No tile label found for {', '.join(unlabelled)}")
+
+        with METRICS.timer('extract'):
+            summaries = [summarise_tile(tile, labels=labels) for tile in tiles]
+        for summary in summaries:
+            summary['ENRICHED'] = index.is_unchanged(summary['URL'], summary['LISTING_HASH'])
+        index.mark_summarised(summaries)
+
+        with ChunkedWriter(
+            path_stem=f"{output_path}/missing_persons_summary_{todays_date}",
+            chunk_size=args.chunk_size,
+            columns=SUMMARY_COLUMNS,
+        ) as summary_writer:
+            summary_writer.write_many(summaries)
+
+        pending = sum(not summary['ENRICHED'] for summary in summaries)
+        print(f"Summarised {len(summaries)} cases from {len(extract.page_urls)} listing pages, "
+              f"{pending} marked for enrichment")
 
-    # Extract all URLs
-    extract = ExtractMissingPersonsUrls(driver=driver)
-    case_urls = extract.extract_case_urls()
+        index.close()
+        if backend is not None:
+            backend.close()
+        chrome.quit()
+        report_metrics()
+        return
 
-    full_df = pd.DataFrame()
-    for n, url in enumerate(case_urls, start=1):
+    checkpoint = None
+    if not (args.replay or args.async_crawl or args.queue):
+        checkpoint = Checkpoint(args.checkpoint_dir or f"{data_path}/checkpoints/missing_persons")
+        if args.resume:
+            if not checkpoint.has_urls():
+                raise SystemExit(f"No checkpoint to resume from in {checkpoint.path}")
+            # Resumed runs append to the output of the run they continue
+            output_stem = checkpoint.metadata()['output']
+            if not os.path.dirname(output_stem):
+                output_stem = f"{data_path}/{output_stem}"
+            scrape_date = checkpoint.metadata().get('scrape_date', scrape_date)
+        else:
+            checkpoint.clear()
 
-        print(f"Running for URL {n} out of {len(case_urls)}")
+    def cases_written(records: List[dict], urls: List[str]) -> None:
+        # Cases only count as done once they are safely on disk
+        if index is not None:
+            for record, url in zip(records, urls):
+                update = pending_index_updates.pop(url, None)
+                if update is not None:
+                    index.update(url, record['CASE_NUMBER'], *update)
 
-        driver.get(url)
+        if store is not None:
+            store.upsert(records)
+
+        if checkpoint is not None:
+            checkpoint.mark_completed(urls)
+
+        if work_queue is not None:
+            work_queue.ack(urls, [record['CASE_NUMBER'] for record in records])
+
+    formats = ['csv']
+    columnar = {}
+    if args.parquet:
+        formats.append('parquet')
+    if args.arrow:
+        formats.append('arrow')
+    if args.parquet or args.arrow:
+        from missing_individuals.missing_persons.common.case_schema import CASE_SCHEMA, columnar_case
+
+        columnar = dict(
+            schema=CASE_SCHEMA,
+            columnar_record=columnar_case,
+            dataset_dir=args.dataset_dir or f"{output_path}/missing_persons",
+            partition={'scrape_date': scrape_date},
+        )
+
+    writer = ChunkedWriter(
+        path_stem=output_stem,
+        chunk_size=args.chunk_size,
+        formats=formats,
+        on_flush=cases_written,
+        append=args.resume or work_queue is not None,
+        **columnar,
+    )
+
+    def build_case(browser: ManagedBrowser, url: str) -> dict:
 
         # Build raw dict
-        build = BuildRawData(driver=driver)
-        raw_case_dict = build.build_raw_case_dict()
+        raw_case_dict = None
+        if backend is not None:
+            try:
+                page_source = backend.get(url)
+                with METRICS.timer('extract'):
+                    raw_case_dict = parse_case_page(page_source=page_source)
+            except ValueError:
+                if args.replay:
+                    raise
+                print(f"Case page not readable without a browser, falling back to Chrome: {url}")
+
+        if raw_case_dict is None:
+            driver = browser.get()
+            with METRICS.timer('navigate'):
+                driver.get(url)
+            with METRICS.timer('extract'):
+                build = BuildRawData(driver=driver, snapshot=args.snapshot)
+                raw_case_dict = build.build_raw_case_dict()
+
+            if cache is not None:
+                cache.put(url, driver.page_source)
 
         # Build cleaned dict
-        clean_case_dict = EngineerRawData.format_raw_case_dict(
-            case_date_dict=raw_case_dict
+        with METRICS.timer('engineer'):
+            return EngineerRawData.format_raw_case_dict(
+                case_date_dict=raw_case_dict
+            )
+
+    if args.replay:
+        backend = CachingFetchBackend(cache=cache)
+        search_host = urlsplit(ExtractMissingPersonsUrls.URL).netloc
+        case_urls = [
+            url for url in cache.urls(host=search_host)
+            if not url.startswith(ExtractMissingPersonsUrls.URL)
+        ]
+
+        for url in case_urls:
+            try:
+                writer.write(build_case(chrome, url))
+            except Exception as e:
+                print(f"Failed to replay {url}: {e!r}")
+                METRICS.increment('page_failures', error=type(e).__name__)
+
+        writer.close()
+        backend.close()
+        if store is not None:
+            store.close()
+        report_metrics()
+        return
+
+    if args.async_crawl:
+        backend = http_backend(pool_size=args.concurrency, timeout=args.timeout)
+        crawler = AsyncCrawler(
+            backend=backend,
+            concurrency=args.concurrency,
+            rate_per_host=args.rate_per_host,
+            timeout=args.timeout,
+            retry=retry,
+        )
+        crawler.run(discover_case_urls, process_case_page, sink=writer.write)
+
+        for url, error in crawler.failures:
+            print(f"Failed to extract {url}: {error!r}")
+            METRICS.increment('page_failures', error=type(error).__name__)
+
+        writer.close()
+        backend.close()
+        if store is not None:
+            store.close()
+        report_metrics()
+        return
+
+    def store_case(url: str, clean_case_dict: dict) -> None:
+
+        if index is not None:
+            listing_hash = listing_hashes.get(url)
+            case_hash = content_hash(clean_case_dict)
+            entry = index.get(url)
+
+            # Listing tile changed but the case itself did not
+            if entry is not None and entry['content_hash'] == case_hash:
+                index.update(url, clean_case_dict['CASE_NUMBER'], listing_hash, case_hash)
+                checkpoint.mark_completed([url])
+                return
+
+            pending_index_updates[url] = (listing_hash, case_hash)
+
+        writer.write(clean_case_dict, key=url)
+
+    if args.backend == 'http':
+        backend = http_backend(pool_size=max(10, args.workers))
+
+    if work_queue is not None:
+        # Cases are leased from the queue below
+        case_urls = []
+        work_queue.register(writer.csv_path)
+    elif args.resume:
+        # Skip discovery and every case already on disk
+        listing_hashes = checkpoint.metadata().get('listing_hashes', {})
+        case_urls = checkpoint.pending()
+        print(f"Resuming: {len(case_urls)} cases left, {len(checkpoint.failed())} of them failed last time")
+        METRICS.increment('retries', len(checkpoint.failed()), backend='resume')
+    elif args.enrich_pending:
+        # The listing was read by a --summary run
+        case_urls = index.pending_enrichment()
+        listing_hashes = {url: index.get(url)['listing_hash'] for url in case_urls}
+        print(f"Enriching {len(case_urls)} cases marked by summary runs")
+
+        checkpoint.save_urls(case_urls, output=output_stem, scrape_date=scrape_date, listing_hashes=listing_hashes)
+    else:
+        # Extract all URLs
+        if backend is not None:
+            extract = ExtractMissingPersonsUrls(backend=backend)
+        else:
+            extract = ExtractMissingPersonsUrls(driver=chrome.get())
+
+        listing_hashes = {}
+        try:
+            if index is not None:
+                case_urls = extract.extract_changed_case_urls(index=index)
+                listing_hashes = extract.listing_hashes
+            else:
+                case_urls = extract.extract_case_urls(workers=args.listing_concurrency if backend is not None else 1)
+                for url, error in extract.failures:
+                    print(f"Failed to read listing page {url}: {error!r}")
+                    METRICS.increment('page_failures', error=type(error).__name__)
+        finally:
+            # Several workers run headless sessions of their own, started with this one's cookies
+            # (e.g. the dismissed warning dialog); a single worker reuses this one
+            if args.workers > 1:
+                chrome.save_cookies()
+                chrome.quit()
+
+        checkpoint.save_urls(case_urls, output=output_stem, scrape_date=scrape_date, listing_hashes=listing_hashes)
+
+    def scrape(urls: List[str]) -> List[Tuple[str, Exception]]:
+        if args.workers > 1:
+            pool = WorkerPool(
+                workers=args.workers,
+                session_factory=lambda: managed_browser(headless=True, cookies=chrome.cookies),
+                session_closer=lambda browser: browser.quit(),
+                failure_budget=args.failure_budget,
+                retry=retry,
+            )
+        else:
+            # A single worker on the main session, which restarts lazily if a page runs over its deadline
+            pool = WorkerPool(
+                workers=1,
+                session_factory=lambda: chrome,
+                session_closer=lambda browser: browser.quit(),
+                failure_budget=len(urls) + 1,
+                retry=retry,
+            )
+        stored = itertools.count(1)
+
+        def store_result(result: Tuple[str, dict]) -> None:
+            print(f"Stored case {next(stored)} out of {len(urls)}")
+            store_case(*result)
+            if work_queue is not None:
+                # Keep the rest of the batch leased while it is worked through
+                work_queue.renew(urls)
+
+        pool.map(
+            lambda browser, url: (url, build_case(browser, url)),
+            urls,
+            sink=store_result,
         )
+        return pool.failures
+
+    if work_queue is not None:
+        failures = []
+        while True:
+            case_urls = work_queue.lease(args.lease_batch)
+            if not case_urls:
+                if work_queue.is_finished():
+                    break
+                # The remaining cases are leased by other workers, and come back if their leases expire
+                time.sleep(args.queue_poll)
+                continue
+
+            print(f"Leased {len(case_urls)} cases, {work_queue.counts()['pending']} left in the queue")
+            batch_failures = scrape(case_urls)
+
+            # Written cases are acked by cases_written
+            writer.flush()
+            for url, error in batch_failures:
+                work_queue.fail(url, error)
+            failures.extend(batch_failures)
+    else:
+        failures = scrape(case_urls)
+
+    for url, error in failures:
+        print(f"Failed to extract {url}: {error!r}")
+        METRICS.increment('page_failures', error=type(error).__name__)
+        if checkpoint is not None:
+            checkpoint.mark_failed(url, error)
+
+    writer.close()
+
+    if work_queue is not None:
+        work_queue.finish()
+        counts = work_queue.counts()
+        print(f"Queue finished: {counts['done']} cases done, {counts['failed']} failed, "
+              f"merge the worker outputs with --merge")
+        work_queue.close()
+    elif failures:
+        print(f"{len(failures)} cases failed, re-run with --resume to retry them")
+    else:
+        checkpoint.clear()
+
+    if index is not None:
+        index.close()
 
-        # Build single data frame row
-        row_df = pd.DataFrame([clean_case_dict])
+    if store is not None:
+        store.close()
 
-        # Concatenate row_df to full_df
-        full_df = pd.concat([full_df, row_df], ignore_index=True)
+    if backend is not None:
+        backend.close()
+    elif cache is not None:
+        cache.close()
 
-    full_df.to_csv(f"{data_path}/{FILE_NAME}", index=False)
+    report_metrics()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,348 @@
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import chromedriver_autoinstaller
+import psutil
+from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException, TimeoutException
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.remote.webelement import WebElement
+from selenium.webdriver.support import expected_conditions as ec
+from selenium.webdriver.support.ui import WebDriverWait
+
+from missing_individuals.utils.metrics import METRICS
+
+# URL patterns blocked for each kind of resource a scrape never reads
+RESOURCE_URL_PATTERNS: Dict[str, Tuple[str, ...]] = {
+    "images": ("*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp"),
+    "stylesheets": ("*.css",),
+    "fonts": ("*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"),
+    "media": ("*.mp4", "*.webm", "*.mp3", "*.ogg"),
+}
+
+LEAN_BLOCKED_RESOURCES: Tuple[str, ...] = ("images", "stylesheets", "fonts", "media")
+LEAN_WINDOW_SIZE: Tuple[int, int] = (1024, 768)
+
+# File recording the chromedriver binary a chromedriver directory is pinned to
+CHROMEDRIVER_PIN_FILE: str = "chromedriver_pin.json"
+
+# Cookie fields carried over from a recycled Chrome session to the next one
+COOKIE_PARAM_FIELDS: Tuple[str, ...] = (
+    "name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires", "priority",
+)
+
+# Chromedriver binaries already resolved by this process, by install directory
+_installed_chromedrivers: Dict[Optional[str], str] = {}
+_install_lock = threading.Lock()
+
+
+def build_chrome_options(
+    headless: bool = False,
+    lean: bool = False,
+    blocked_resources: Optional[Sequence[str]] = None,
+) -> webdriver.ChromeOptions:
+    """
+    Builds the Chrome options of a scraping session.
+    Args:
+        headless: run Chrome without a window
+        lean: use the lean profile: headless, "eager" page loads (return once the DOM is ready,
+            without waiting for subresources), no extensions and a small fixed window
+        blocked_resources: kinds of resource (keys of RESOURCE_URL_PATTERNS) that are not downloaded;
+            defaults to LEAN_BLOCKED_RESOURCES with lean, and to none otherwise. Leave out
+            "stylesheets" for pages that hide elements through CSS, as the visibility waits
+            would then see them
+    Returns:
+        Chrome options
+    """
+    if blocked_resources is None:
+        blocked_resources = LEAN_BLOCKED_RESOURCES if lean else ()
+
+    options = webdriver.ChromeOptions()
+    if headless or lean:
+        options.add_argument("--headless=new")
+
+    if lean:
+        options.page_load_strategy = "eager"
+        options.add_argument("--disable-extensions")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--mute-audio")
+        options.add_argument(f"--window-size={LEAN_WINDOW_SIZE[0]},{LEAN_WINDOW_SIZE[1]}")
+
+    if "images" in blocked_resources:
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+
+    return options
+
+
+def block_resources(driver: webdriver.Chrome, blocked_resources: Sequence[str]) -> None:
+    """
+    Stops the browser from downloading the given kinds of resource, through the DevTools protocol.
+    Args:
+        driver: active webdriver
+        blocked_resources: kinds of resource, keys of RESOURCE_URL_PATTERNS
+    """
+    unknown = set(blocked_resources) - set(RESOURCE_URL_PATTERNS)
+    if unknown:
+        raise ValueError(f"Unknown resource kinds: {sorted(unknown)}")
+
+    patterns = [pattern for kind in blocked_resources for pattern in RESOURCE_URL_PATTERNS[kind]]
+    if patterns:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+
+
+def install_chromedriver(chromedriver_path: Optional[str] = None, refresh: bool = False) -> str:
+    """
+    Returns the chromedriver binary to start Chrome with, only installing one when needed.
+    The first install into chromedriver_path is pinned in its CHROMEDRIVER_PIN_FILE, and later
+    sessions (of this or any later run) reuse the pinned binary without checking for updates.
+    Args:
+        chromedriver_path: directory the chromedriver binary is installed into
+        refresh: install the chromedriver matching the current Chrome and pin it, e.g. once Chrome
+            has been upgraded past the pinned binary
+    Returns:
+        Path of the chromedriver binary
+    """
+    with _install_lock:
+        if not refresh and chromedriver_path in _installed_chromedrivers:
+            return _installed_chromedrivers[chromedriver_path]
+
+        pin_file = os.path.join(chromedriver_path, CHROMEDRIVER_PIN_FILE) if chromedriver_path else None
+
+        binary = None
+        if not refresh and pin_file is not None and os.path.exists(pin_file):
+            with open(pin_file) as f:
+                binary = json.load(f).get("binary")
+            if binary is not None and not os.path.isfile(binary):
+                binary = None
+
+        if binary is None:
+            if chromedriver_path is not None:
+                os.makedirs(chromedriver_path, exist_ok=True)
+            binary = chromedriver_autoinstaller.install(path=chromedriver_path)
+            if not binary:
+                raise RuntimeError("Could not install a chromedriver matching the installed Chrome")
+
+            if pin_file is not None:
+                with open(pin_file, "w") as f:
+                    json.dump({"binary": binary, "chrome_version": chromedriver_autoinstaller.get_chrome_version()}, f)
+
+        _installed_chromedrivers[chromedriver_path] = binary
+        return binary
+
+
+def build_chrome_driver(
+    chromedriver_path: Optional[str] = None,
+    headless: bool = False,
+    lean: bool = False,
+    blocked_resources: Optional[Sequence[str]] = None,
+) -> webdriver.Chrome:
+    """
+    Starts a Chrome session with the pinned chromedriver (see install_chromedriver).
+    Args:
+        chromedriver_path: directory the chromedriver binary is installed into
+        headless: run Chrome without a window
+        lean: use the lean browser profile (see build_chrome_options)
+        blocked_resources: kinds of resource that are not downloaded (see build_chrome_options)
+    Returns:
+        Active webdriver
+    """
+    if blocked_resources is None:
+        blocked_resources = LEAN_BLOCKED_RESOURCES if lean else ()
+
+    options = build_chrome_options(headless=headless, lean=lean, blocked_resources=blocked_resources)
+
+    try:
+        driver = webdriver.Chrome(
+            service=Service(executable_path=install_chromedriver(chromedriver_path)), options=options)
+    except SessionNotCreatedException:
+        # Chrome was upgraded past the pinned chromedriver
+        driver = webdriver.Chrome(
+            service=Service(executable_path=install_chromedriver(chromedriver_path, refresh=True)),
+            options=options)
+    block_resources(driver, blocked_resources)
+
+    return driver
+
+
+def wait_visible(parent, by: str, value: str, timeout: float = 5, page: str = "Page") -> List[WebElement]:
+    """
+    Waits for elements under parent (the driver or an element) to become visible, counting waits
+    that run out.
+    Args:
+        parent: driver or element to search within
+        by: locator strategy, e.g. By.CLASS_NAME
+        value: locator value
+        timeout: seconds to wait
+        page: kind of page, for the error message
+    Returns:
+        Visible matching elements
+    Raises:
+        ValueError: if no such element becomes visible, as for a page missing it, which trying
+            again will not fix
+    """
+    try:
+        return WebDriverWait(parent, timeout).until(ec.visibility_of_any_elements_located((by, value)))
+    except TimeoutException as e:
+        METRICS.increment("wait_timeouts", locator=value)
+        raise ValueError(f"{page} has no visible {value} element") from e
+
+
+class LazyChromeDriver:
+    """
+    Holds a Chrome session that is only started the first time it is needed, so workers that
+    mostly fetch pages without a browser do not pay the browser startup cost.
+    Args:
+        chromedriver_path: directory the chromedriver binary is installed into
+        headless: run Chrome without a window
+        lean: use the lean browser profile (see build_chrome_options)
+    """
+
+    def __init__(self, chromedriver_path: Optional[str] = None, headless: bool = False, lean: bool = False):
+        self.chromedriver_path = chromedriver_path
+        self.headless = headless
+        self.lean = lean
+        self.driver = None
+
+    def get(self) -> webdriver.Chrome:
+        """
+        Returns the Chrome session, starting it on first use.
+        """
+        if self.driver is None:
+            self.driver = build_chrome_driver(
+                chromedriver_path=self.chromedriver_path, headless=self.headless, lean=self.lean)
+        return self.driver
+
+    def quit(self) -> None:
+        """
+        Closes the Chrome session if one was started.
+        """
+        if self.driver is not None:
+            self.driver.quit()
+            self.driver = None
+
+
+def browser_rss(driver: webdriver.Chrome) -> int:
+    """
+    Returns the resident memory in bytes of a Chrome session: chromedriver, the browser and every
+    renderer and helper process under it.
+    """
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        processes = [process] + process.children(recursive=True)
+    except (AttributeError, psutil.Error):
+        return 0
+
+    rss = 0
+    for child in processes:
+        try:
+            rss += child.memory_info().rss
+        except psutil.Error:
+            continue
+    return rss
+
+
+def _cookie_param(cookie: Dict[str, Any]) -> Dict[str, Any]:
+    # Keeps the fields Network.setCookies takes back; session cookies must not carry an expiry
+    param = {field: cookie[field] for field in COOKIE_PARAM_FIELDS if field in cookie}
+    if cookie.get("session"):
+        param.pop("expires", None)
+    return param
+
+
+class ManagedBrowser(LazyChromeDriver):
+    """
+    Lazily started Chrome session that is recycled on long runs, as Chrome keeps growing its memory
+    over thousands of page loads. Before handing out the session for another page, get restarts it
+    once it has served max_pages pages, or once its resident memory (see browser_rss) passes
+    max_rss_mb. Cookies, such as the dismissed warning dialog, are carried over to the new session.
+    Args:
+        chromedriver_path: directory the chromedriver binary is installed into
+        headless: run Chrome without a window
+        lean: use the lean browser profile (see build_chrome_options)
+        max_pages: pages served by a session before it is restarted, None for no limit
+        max_rss_mb: resident memory of a session in MB beyond which it is restarted, None for no limit
+        cookies: cookies (as kept by save_cookies) to set on the first session, e.g. those of
+            another session that already dismissed the warning dialog
+    """
+
+    def __init__(
+        self,
+        chromedriver_path: Optional[str] = None,
+        headless: bool = False,
+        lean: bool = False,
+        max_pages: Optional[int] = 500,
+        max_rss_mb: Optional[float] = 1500,
+        cookies: Optional[List[Dict[str, Any]]] = None,
+    ):
+        super().__init__(chromedriver_path=chromedriver_path, headless=headless, lean=lean)
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.pages = 0
+        self.cookies: List[Dict[str, Any]] = list(cookies or [])
+
+    def _recycle_reason(self) -> Optional[str]:
+        if self.max_pages is not None and self.pages >= self.max_pages:
+            return "pages"
+        if self.max_rss_mb is not None and browser_rss(self.driver) > self.max_rss_mb * 1024 ** 2:
+            return "memory"
+        return None
+
+    def get(self) -> webdriver.Chrome:
+        """
+        Returns the Chrome session for the next page, starting or recycling it as needed.
+        """
+        if self.driver is not None:
+            reason = self._recycle_reason()
+            if reason is not None:
+                self.recycle(reason)
+
+        if self.driver is None:
+            super().get()
+            if self.cookies:
+                self.driver.execute_cdp_cmd("Network.setCookies", {"cookies": self.cookies})
+
+        self.pages += 1
+        return self.driver
+
+    def save_cookies(self) -> None:
+        """
+        Keeps the cookies (of every domain) of the current session, to be set on the next one. If
+        the session can no longer give its cookies, e.g. as Chrome crashed, the cookies kept
+        earlier are left as they are.
+        """
+        if self.driver is None:
+            return
+        try:
+            cookies = self.driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+            self.cookies = [_cookie_param(cookie) for cookie in cookies]
+        except Exception:
+            METRICS.increment("cookie_read_failures")
+
+    def recycle(self, reason: str = "manual") -> None:
+        """
+        Closes the session, keeping its cookies for the next one (see save_cookies). If the session
+        can no longer be closed it is dropped all the same.
+        """
+        METRICS.increment("browser_restarts", reason=reason)
+        try:
+            self.save_cookies()
+        finally:
+            try:
+                self.quit()
+            except Exception:
+                # The session is dropped all the same, and a new one started for the next page
+                METRICS.increment("session_close_failures")
+
+    def quit(self) -> None:
+        """
+        Closes the Chrome session if one was started. The session is dropped even if closing it
+        fails. Cookies kept from earlier recycles are still set on the next session.
+        """
+        try:
+            super().quit()
+        finally:
+            self.driver = None
+            self.pages = 0
@@ -0,0 +1,254 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlencode, urlsplit
+
+from missing_individuals.utils.fetch import FetchBackend
+
+
+class CacheMiss(LookupError):
+    """
+    Raised when an offline cache is asked for a page it does not hold.
+    """
+
+
+class PageCache:
+    """
+    Content addressed on-disk cache of raw page HTML.
+
+    Pages are stored gzipped under blobs/ named by the SHA-256 of their content, so identical pages
+    are stored once. A SQLite index maps each URL to its content hash, fetch time, last access time
+    and stored size. Entries older than `ttl` are treated as stale when fetching online, and the
+    least recently used entries are evicted once the blobs exceed `max_bytes`.
+
+    Safe to share between threads.
+
+    Args:
+        root:
+            str - directory holding the index and the blobs, created if it does not exist
+        ttl:
+            float - seconds after which an entry is stale (None to never expire)
+        max_bytes:
+            int - size cap of the stored blobs (None for no cap)
+    """
+
+    def __init__(self, root: str, ttl: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.root = Path(root)
+        self.blob_path = self.root / "blobs"
+        self.blob_path.mkdir(parents=True, exist_ok=True)
+
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+        self.connection = sqlite3.connect(str(self.root / "index.sqlite"), check_same_thread=False)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS pages_content_hash ON pages (content_hash)")
+        self.connection.commit()
+
+    def _blob(self, content_hash: str) -> Path:
+        return self.blob_path / content_hash[:2] / f"{content_hash}.html.gz"
+
+    def get(self, url: str, allow_stale: bool = False) -> Optional[str]:
+        """
+        Returns the cached HTML of a URL.
+        Args:
+            url: URL of the page
+            allow_stale: also return entries older than the TTL (used when replaying offline)
+        Returns:
+            HTML of the page, or None if it is not cached (or stale)
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT content_hash, fetched_at FROM pages WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+
+            content_hash, fetched_at = row
+            if not allow_stale and self.ttl is not None and time.time() - fetched_at > self.ttl:
+                return None
+
+            try:
+                page_source = gzip.decompress(self._blob(content_hash).read_bytes()).decode("utf-8")
+            except FileNotFoundError:
+                self.connection.execute("DELETE FROM pages WHERE url = ?", (url,))
+                self.connection.commit()
+                return None
+
+            self.connection.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self.connection.commit()
+
+        return page_source
+
+    def put(self, url: str, page_source: str) -> str:
+        """
+        Stores the HTML of a URL, evicting old entries if the cache goes over its size cap.
+        Args:
+            url: URL of the page
+            page_source: HTML of the page
+        Returns:
+            Content hash the page is stored under
+        """
+        data = page_source.encode("utf-8")
+        content_hash = hashlib.sha256(data).hexdigest()
+        blob = self._blob(content_hash)
+
+        with self.lock:
+            if not blob.exists():
+                blob.parent.mkdir(exist_ok=True)
+                temp = blob.with_suffix(f".{threading.get_ident()}.tmp")
+                temp.write_bytes(gzip.compress(data))
+                os.replace(temp, blob)
+
+            previous = self.connection.execute(
+                "SELECT content_hash FROM pages WHERE url = ?", (url,)).fetchone()
+
+            now = time.time()
+            self.connection.execute(
+                """
+                INSERT INTO pages (url, content_hash, fetched_at, accessed_at, size) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    fetched_at = excluded.fetched_at,
+                    accessed_at = excluded.accessed_at,
+                    size = excluded.size
+                """,
+                (url, content_hash, now, now, blob.stat().st_size),
+            )
+            if previous is not None and previous[0] != content_hash:
+                self._delete_unreferenced(previous[0])
+
+            self.connection.commit()
+            self._evict()
+
+        return content_hash
+
+    def _delete_unreferenced(self, content_hash: str) -> None:
+        referenced = self.connection.execute(
+            "SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1", (content_hash,)).fetchone()
+        if referenced is None:
+            self._blob(content_hash).unlink(missing_ok=True)
+
+    def size(self) -> int:
+        """
+        Returns the size in bytes of the stored blobs.
+        """
+        (total,) = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT content_hash, size FROM pages)").fetchone()
+        return total
+
+    def _evict(self) -> None:
+        if self.max_bytes is None:
+            return
+
+        total = self.size()
+        while total > self.max_bytes:
+            row = self.connection.execute(
+                "SELECT url, content_hash, size FROM pages ORDER BY accessed_at LIMIT 1").fetchone()
+            if row is None:
+                break
+
+            url, content_hash, size = row
+            self.connection.execute("DELETE FROM pages WHERE url = ?", (url,))
+            self._delete_unreferenced(content_hash)
+            if not self._blob(content_hash).exists():
+                total -= size
+
+        self.connection.commit()
+
+    def expire(self) -> int:
+        """
+        Deletes every entry older than the TTL.
+        Returns:
+            Number of entries deleted
+        """
+        if self.ttl is None:
+            return 0
+
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT url, content_hash FROM pages WHERE fetched_at < ?", (time.time() - self.ttl,)).fetchall()
+            for url, content_hash in rows:
+                self.connection.execute("DELETE FROM pages WHERE url = ?", (url,))
+                self._delete_unreferenced(content_hash)
+            self.connection.commit()
+
+        return len(rows)
+
+    def urls(self, host: Optional[str] = None) -> List[str]:
+        """
+        Returns the cached URLs, optionally only those of one host, in the order they were fetched.
+        """
+        with self.lock:
+            rows = self.connection.execute("SELECT url FROM pages ORDER BY fetched_at, url").fetchall()
+
+        return [url for (url,) in rows if host is None or urlsplit(url).netloc == host]
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            (entries,) = self.connection.execute("SELECT COUNT(*) FROM pages").fetchone()
+            return {"entries": entries, "bytes": self.size()}
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class CachingFetchBackend(FetchBackend):
+    """
+    Fetch backend that serves pages from a PageCache and only falls through to the wrapped backend
+    on a miss, storing what it fetches. Without a wrapped backend it replays the cache offline:
+    stale entries are served and misses raise CacheMiss.
+    Args:
+        cache:
+            PageCache - cache to read from and write to
+        backend:
+            FetchBackend - backend used on a cache miss; None for offline replay
+    """
+
+    def __init__(self, cache: PageCache, backend: Optional[FetchBackend] = None):
+        self.cache = cache
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def offline(self) -> bool:
+        return self.backend is None
+
+    def get(self, url: str, params: Optional[Dict[str, str]] = None) -> str:
+        if params:
+            url = f"{url}{'&' if urlsplit(url).query else '?'}{urlencode(params)}"
+
+        page_source = self.cache.get(url, allow_stale=self.offline)
+        if page_source is not None:
+            self.hits += 1
+            return page_source
+
+        self.misses += 1
+        if self.offline:
+            raise CacheMiss(url)
+
+        page_source = self.backend.get(url)
+        self.cache.put(url, page_source)
+        return page_source
+
+    def close(self) -> None:
+        if self.backend is not None:
+            self.backend.close()
+        self.cache.close()
@@ -0,0 +1,127 @@
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class Checkpoint:
+    """
+    Durable progress record of a scraping run, so a crashed or interrupted run can be resumed.
+
+    Kept in a directory holding:
+        - urls.json: the discovered URL list, written once and atomically
+        - completed.txt: URLs whose records are on disk, one per line, appended and fsynced
+        - failed.jsonl: URLs that failed with their error, appended and fsynced
+
+    A URL that failed and later completed counts as completed.
+    Safe to share between threads.
+
+    Args:
+        path:
+            str - checkpoint directory, created if it does not exist
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+
+    @property
+    def urls_path(self) -> Path:
+        return self.path / "urls.json"
+
+    @property
+    def completed_path(self) -> Path:
+        return self.path / "completed.txt"
+
+    @property
+    def failed_path(self) -> Path:
+        return self.path / "failed.jsonl"
+
+    @staticmethod
+    def _append(path: Path, lines: Iterable[str]) -> None:
+        data = "".join(f"{line}\n" for line in lines)
+        if not data:
+            return
+
+        with open(path, "a", encoding="utf-8") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+
+    def has_urls(self) -> bool:
+        return self.urls_path.exists()
+
+    def save_urls(self, urls: List[str], **metadata: Any) -> None:
+        """
+        Stores the discovered URL list, along with any JSON serialisable run metadata needed to
+        resume (e.g. the output file).
+        """
+        temp = self.urls_path.with_suffix(".tmp")
+        with open(temp, "w", encoding="utf-8") as file:
+            json.dump({"urls": urls, "metadata": metadata}, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp, self.urls_path)
+
+    def _load(self) -> Dict[str, Any]:
+        with open(self.urls_path, encoding="utf-8") as file:
+            return json.load(file)
+
+    def load_urls(self) -> List[str]:
+        return self._load()["urls"]
+
+    def metadata(self) -> Dict[str, Any]:
+        return self._load()["metadata"]
+
+    def mark_completed(self, urls: Iterable[str]) -> None:
+        with self.lock:
+            self._append(self.completed_path, urls)
+
+    def mark_failed(self, url: str, error: Exception) -> None:
+        with self.lock:
+            self._append(self.failed_path, [json.dumps({"url": url, "error": repr(error)})])
+
+    def completed(self) -> set:
+        if not self.completed_path.exists():
+            return set()
+
+        with open(self.completed_path, encoding="utf-8") as file:
+            # A crash mid-write can leave a partial last line, which never matches a real URL
+            return {line.rstrip("\n") for line in file if line.endswith("\n")}
+
+    def failed(self) -> Dict[str, str]:
+        """
+        Returns the URLs that failed and have not completed since, with their last error.
+        """
+        if not self.failed_path.exists():
+            return {}
+
+        failures = {}
+        with open(self.failed_path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    failure = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                failures[failure["url"]] = failure["error"]
+
+        completed = self.completed()
+        return {url: error for url, error in failures.items() if url not in completed}
+
+    def pending(self, urls: Optional[List[str]] = None) -> List[str]:
+        """
+        Returns the URLs still to do (never attempted, interrupted or failed), in discovery order.
+        """
+        urls = urls if urls is not None else self.load_urls()
+        completed = self.completed()
+        return [url for url in urls if url not in completed]
+
+    def clear(self) -> None:
+        """
+        Deletes the checkpoint, e.g. once a run has finished cleanly.
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.path.mkdir(parents=True, exist_ok=True)
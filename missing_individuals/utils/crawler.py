@@ -0,0 +1,255 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import trio
+
+from missing_individuals.utils.fetch import FetchBackend
+from missing_individuals.utils.metrics import METRICS
+from missing_individuals.utils.retry import CircuitOpenError, DeadlineExceeded, RetryPolicy, is_transient
+
+# A discovery coroutine receives the crawler and a send channel, and sends (order_key, url) pairs
+# for every page to process. The order key fixes the position of the record in the output.
+Discover = Callable[["AsyncCrawler", trio.MemorySendChannel], Awaitable[None]]
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter: allows bursts of up to `capacity` requests, refilled at `rate`
+    tokens per second.
+    Args:
+        rate: tokens added per second
+        capacity: maximum number of tokens held
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = trio.current_time()
+        self.lock = trio.Lock()
+
+    def _refill(self) -> None:
+        now = trio.current_time()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        """
+        Waits until a token is available and takes it. Waiters are served in arrival order.
+        """
+        async with self.lock:
+            self._refill()
+            while self.tokens < 1:
+                await trio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class AsyncCrawler:
+    """
+    trio based crawl engine. Page discovery and page fetching run as concurrent tasks connected
+    by memory channels, and fetched pages are handed to a processing function (parsing and
+    engineering) through a second channel.
+
+    Fetches go through a FetchBackend on worker threads, limited by a shared concurrency limit,
+    a token bucket per host and a per-request timeout.
+
+    With a retry policy, requests go through its circuit breaker, and pages failing with a
+    transient error are retried by a separate task after their backoff, so the fetch task moves
+    on to the next page in the meantime. Pages turned away by an open circuit wait for it to let
+    a probe through, without counting as an attempt. The crawler timeout is the deadline of every
+    attempt.
+
+    Args:
+        backend:
+            FetchBackend - backend used to load the pages (should be thread safe, e.g. HttpFetchBackend)
+        concurrency:
+            int - maximum number of requests in flight across all hosts
+        rate_per_host:
+            float - sustained requests per second allowed to any one host
+        burst:
+            int - number of requests allowed to a host in a burst
+        timeout:
+            float - seconds before a single request is abandoned
+        retry:
+            RetryPolicy - optional circuit breaker and backoff for failed page fetches
+    """
+
+    def __init__(
+        self,
+        backend: FetchBackend,
+        concurrency: int = 8,
+        rate_per_host: float = 2.0,
+        burst: int = 2,
+        timeout: float = 30,
+        retry: Optional[RetryPolicy] = None,
+    ):
+        self.backend = backend
+        self.concurrency = concurrency
+        self.rate_per_host = rate_per_host
+        self.burst = burst
+        self.timeout = timeout
+        self.retry = retry
+
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.failures: List[Tuple[str, Exception]] = []
+        self.pages_fetched = 0
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(rate=self.rate_per_host, capacity=self.burst)
+        return self.buckets[host]
+
+    async def fetch(self, url: str) -> str:
+        """
+        Fetches a page, honouring the circuit breaker, the host rate limit, the concurrency limit
+        and the timeout.
+        Args:
+            url: URL of the page
+        Returns:
+            HTML of the page
+        Raises:
+            DeadlineExceeded: if the request takes longer than the timeout
+            CircuitOpenError: if the circuit of the host is open
+        """
+        breaker = self.retry.breaker if self.retry is not None else None
+        if breaker is not None:
+            breaker.before(url)
+
+        await self._bucket(url).acquire()
+
+        try:
+            async with self.limiter:
+                try:
+                    with trio.fail_after(self.timeout):
+                        page_source = await trio.to_thread.run_sync(self.backend.get, url, cancellable=True)
+                except trio.TooSlowError:
+                    METRICS.increment("deadline_exceeded")
+                    raise DeadlineExceeded(f"No response after {self.timeout:g}s") from None
+        except Exception as e:
+            if breaker is not None and is_transient(e):
+                breaker.record_failure(url)
+            elif breaker is not None:
+                # The host answered, the page itself is the problem
+                breaker.record_success(url)
+            raise
+
+        if breaker is not None:
+            breaker.record_success(url)
+
+        self.pages_fetched += 1
+        return page_source
+
+    async def _fetch_page(
+        self,
+        key: Any,
+        url: str,
+        page_send: trio.MemorySendChannel,
+        attempt: int = 1,
+    ) -> None:
+        try:
+            page_source = await self.fetch(url)
+        except CircuitOpenError:
+            # The host was not called, so the page waits out its circuit without spending an attempt
+            self.nursery.start_soon(
+                self._retry_page, key, url, page_send.clone(), attempt, self.retry.circuit_delay(url))
+            return
+        except Exception as e:
+            if self.retry is not None and self.retry.should_retry(e, attempt):
+                METRICS.increment("retries", backend="crawler")
+                self.nursery.start_soon(
+                    self._retry_page, key, url, page_send.clone(), attempt + 1, self.retry.delay(attempt, key=url))
+            else:
+                self.failures.append((url, e))
+            return
+
+        await page_send.send((key, url, page_source))
+
+    async def _retry_page(
+        self,
+        key: Any,
+        url: str,
+        page_send: trio.MemorySendChannel,
+        attempt: int,
+        delay: float,
+    ) -> None:
+        async with page_send:
+            await trio.sleep(delay)
+            await self._fetch_page(key, url, page_send, attempt)
+
+    async def _fetch_pages(
+        self,
+        url_receive: trio.MemoryReceiveChannel,
+        page_send: trio.MemorySendChannel,
+    ) -> None:
+        async with url_receive, page_send:
+            async for key, url in url_receive:
+                await self._fetch_page(key, url, page_send)
+
+    async def crawl(
+        self,
+        discover: Discover,
+        process: Callable[[str], Any],
+        sink: Optional[Callable[[Any], None]] = None,
+    ) -> List[Any]:
+        """
+        Runs discovery, fetching and processing concurrently until every discovered page is done.
+        Args:
+            discover: coroutine sending (order_key, url) pairs of the pages to process
+            process: function turning the HTML of a page into a record
+            sink: optional function receiving each record as soon as it is processed (in completion
+                order), instead of holding every record until the crawl is done
+        Returns:
+            Records of the successfully processed pages, ordered by their order key (empty if a
+            sink is given)
+        """
+        self.limiter = trio.CapacityLimiter(self.concurrency)
+        self.failures = []
+        self.pages_fetched = 0
+
+        url_send, url_receive = trio.open_memory_channel(self.concurrency * 4)
+        page_send, page_receive = trio.open_memory_channel(self.concurrency)
+        results = []
+
+        async def run_discovery() -> None:
+            async with url_send:
+                await discover(self, url_send)
+
+        async with trio.open_nursery() as nursery:
+            self.nursery = nursery
+            nursery.start_soon(run_discovery)
+
+            async with url_receive, page_send:
+                for _ in range(self.concurrency):
+                    nursery.start_soon(self._fetch_pages, url_receive.clone(), page_send.clone())
+
+            async with page_receive:
+                async for key, url, page_source in page_receive:
+                    try:
+                        record = await trio.to_thread.run_sync(process, page_source)
+                    except Exception as e:
+                        self.failures.append((url, e))
+                        continue
+
+                    if sink is not None:
+                        sink(record)
+                    else:
+                        results.append((key, record))
+
+        return [record for _, record in sorted(results, key=lambda result: result[0])]
+
+    def run(
+        self,
+        discover: Discover,
+        process: Callable[[str], Any],
+        sink: Optional[Callable[[Any], None]] = None,
+    ) -> List[Any]:
+        """
+        Synchronous entry point for crawl.
+        """
+        return trio.run(self.crawl, discover, process, sink)
+
@@ -0,0 +1,157 @@
+from typing import Dict, Optional
+from urllib.parse import urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from missing_individuals.utils.metrics import METRICS
+
+
+class FetchBackend:
+    """
+    Base class for the page fetch backends. A backend takes a URL and returns the HTML of the page,
+    so the parsing code does not need to know whether a browser or a plain HTTP client was used.
+    """
+
+    def get(self, url: str, params: Optional[Dict[str, str]] = None) -> str:
+        """
+        Fetches a page.
+        Args:
+            url: URL of the page
+            params: optional query parameters to add to the URL
+        Returns:
+            HTML of the page
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """
+        Releases any resources held by the backend.
+        """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class HttpFetchBackend(FetchBackend):
+    """
+    Fetches server-rendered pages with a pooled, keep-alive requests.Session.
+    Args:
+        base_url:
+            str - optional scheme and host every request is redirected to, e.g. a local server
+            serving recorded fixture pages ("http://127.0.0.1:8000")
+        cookies:
+            dict - cookies set on the session before the first request (e.g. dismissed dialogs)
+        pool_size:
+            int - number of keep-alive connections kept per host
+        timeout:
+            float - per-request timeout in seconds
+        max_retries:
+            int - number of retries on connection errors and 5xx responses
+    """
+
+    USER_AGENT: str = (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/114.0 Safari/537.36"
+    )
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        cookies: Optional[Dict[str, str]] = None,
+        pool_size: int = 10,
+        timeout: float = 30,
+        max_retries: int = 3,
+    ):
+        self.base_url = base_url
+        self.timeout = timeout
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.5,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=("GET",),
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"User-Agent": self.USER_AGENT})
+
+        for name, value in (cookies or {}).items():
+            self.session.cookies.set(name, value)
+
+    def rebase_url(self, url: str) -> str:
+        """
+        Swaps the scheme and host of a URL for base_url, when one is set.
+        """
+        if not self.base_url:
+            return url
+
+        base = urlsplit(self.base_url)
+        parts = urlsplit(url)
+        return urlunsplit((base.scheme, base.netloc, parts.path, parts.query, parts.fragment))
+
+    def get(self, url: str, params: Optional[Dict[str, str]] = None) -> str:
+        with METRICS.timer("navigate"):
+            response = self.session.get(self.rebase_url(url), params=params, timeout=self.timeout)
+
+        retries = getattr(response.raw, "retries", None)
+        if retries is not None and retries.history:
+            METRICS.increment("retries", len(retries.history), backend="http")
+
+        if not response.ok:
+            METRICS.increment("fetch_errors", backend="http", status=response.status_code)
+        response.raise_for_status()
+        return response.text
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class ChromeFetchBackend(FetchBackend):
+    """
+    Fetches pages through an existing webdriver, returning the rendered page source.
+    Used as a fallback for pages that cannot be read without a browser.
+    Args:
+        driver:
+            webdriver.Chrome - active webdriver
+        wait_for_class:
+            str - optional class name to wait for before the page source is read
+        timeout:
+            float - seconds to wait for wait_for_class to become visible
+    """
+
+    def __init__(self, driver, wait_for_class: Optional[str] = None, timeout: float = 5):
+        self.driver = driver
+        self.wait_for_class = wait_for_class
+        self.timeout = timeout
+
+    def get(self, url: str, params: Optional[Dict[str, str]] = None) -> str:
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as ec
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        if params:
+            url = f"{url}{'&' if urlsplit(url).query else '?'}{urlencode(params)}"
+
+        with METRICS.timer("navigate"):
+            self.driver.get(url)
+
+        if self.wait_for_class:
+            with METRICS.timer("wait"):
+                try:
+                    WebDriverWait(self.driver, self.timeout).until(
+                        ec.visibility_of_any_elements_located((By.CLASS_NAME, self.wait_for_class)))
+                except TimeoutException as e:
+                    # The page loaded without the element: trying again will not fix it
+                    METRICS.increment("wait_timeouts", locator=self.wait_for_class)
+                    raise ValueError(f"Page has no visible {self.wait_for_class} element") from e
+
+        return self.driver.page_source
@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+# Stages of a scrape, in pipeline order
+STAGES: Tuple[str, ...] = ("navigate", "wait", "extract", "engineer", "write")
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _prometheus_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")) for name, value in key
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Metrics:
+    """
+    Thread-safe registry of stage timers and counters for a scraping run.
+
+    Timers accumulate the number of calls, total and longest duration of each stage (stages nest,
+    e.g. "wait" is part of "extract"). Counters count events such as waits that hit their timeout,
+    fields that could not be extracted or retried requests, optionally broken down by labels.
+    Args:
+        prefix:
+            str - prefix of the exported metric names
+    """
+
+    def __init__(self, prefix: str = "scraper"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Clears all timers and counters and restarts the run clock.
+        """
+        with self._lock:
+            self.started = time.time()
+            self.timers: Dict[str, Dict[str, float]] = {}
+            self.counters: Dict[str, Dict[LabelKey, float]] = {}
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """
+        Records one timed call of a stage.
+        """
+        with self._lock:
+            timer = self.timers.setdefault(stage, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            timer["count"] += 1
+            timer["total_seconds"] += seconds
+            timer["max_seconds"] = max(timer["max_seconds"], seconds)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """
+        Times the enclosed block as one call of a stage, whether or not it raises.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def increment(self, name: str, value: float = 1, **labels: Any) -> None:
+        """
+        Adds to a counter.
+        Args:
+            name: counter name, e.g. "wait_timeouts"
+            value: amount to add
+            labels: optional breakdown of the counter, e.g. field="LOCATION_ROAD"
+        """
+        with self._lock:
+            counter = self.counters.setdefault(name, {})
+            key = _label_key(labels)
+            counter[key] = counter.get(key, 0) + value
+
+    def count(self, name: str, **labels: Any) -> float:
+        """
+        Returns the value of a counter, summed over all labels if none are given.
+        """
+        with self._lock:
+            counter = self.counters.get(name, {})
+            if labels:
+                return counter.get(_label_key(labels), 0)
+            return sum(counter.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns the timers and counters as a JSON-serialisable dictionary.
+        """
+        with self._lock:
+            return {
+                "started": self.started,
+                "elapsed_seconds": round(time.time() - self.started, 3),
+                "stages": {
+                    stage: {
+                        "count": timer["count"],
+                        "total_seconds": round(timer["total_seconds"], 6),
+                        "mean_seconds": round(timer["total_seconds"] / timer["count"], 6),
+                        "max_seconds": round(timer["max_seconds"], 6),
+                    }
+                    for stage, timer in self.timers.items()
+                },
+                "counters": {
+                    name: [{"labels": dict(key), "value": value} for key, value in sorted(counter.items())]
+                    for name, counter in self.counters.items()
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Returns the timers and counters in the Prometheus text exposition format.
+        """
+        lines: List[str] = []
+        with self._lock:
+            for suffix, help_text, field in (
+                ("stage_seconds_total", "Total seconds spent in each stage", "total_seconds"),
+                ("stage_calls_total", "Number of timed calls of each stage", "count"),
+                ("stage_seconds_max", "Longest single call of each stage", "max_seconds"),
+            ):
+                name = f"{self.prefix}_{suffix}"
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {'gauge' if suffix.endswith('max') else 'counter'}")
+                for stage, timer in sorted(self.timers.items()):
+                    lines.append(f"{name}{_prometheus_labels((('stage', stage),))} {timer[field]}")
+
+            for counter_name, counter in sorted(self.counters.items()):
+                name = f"{self.prefix}_{counter_name}_total"
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(counter.items()):
+                    lines.append(f"{name}{_prometheus_labels(key)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path_stem: str) -> None:
+        """
+        Writes the metrics to path_stem.json and, for the Prometheus node exporter textfile
+        collector, path_stem.prom. Each file is replaced atomically.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path_stem)), exist_ok=True)
+        for extension, content in (
+            ("json", json.dumps(self.to_dict(), indent=2)),
+            ("prom", self.to_prometheus()),
+        ):
+            path = f"{path_stem}.{extension}"
+            with open(f"{path}.tmp", "w") as f:
+                f.write(content)
+            os.replace(f"{path}.tmp", path)
+
+    def summary(self) -> str:
+        """
+        Returns a human readable summary of where the time went and what went wrong.
+        """
+        data = self.to_dict()
+        lines = [f"Run took {data['elapsed_seconds']:.1f}s"]
+
+        ordered = [stage for stage in STAGES if stage in data["stages"]]
+        ordered += sorted(set(data["stages"]) - set(STAGES))
+        for stage in ordered:
+            timer = data["stages"][stage]
+            lines.append(
+                f"  {stage:<10} {timer['total_seconds']:>10.2f}s over {timer['count']:>6} calls "
+                f"(mean {timer['mean_seconds'] * 1000:.1f}ms, max {timer['max_seconds'] * 1000:.1f}ms)"
+            )
+
+        for name, entries in sorted(data["counters"].items()):
+            total = sum(entry["value"] for entry in entries)
+            breakdown = ", ".join(
+                f"{','.join(f'{k}={v}' for k, v in entry['labels'].items())}: {entry['value']:g}"
+                for entry in entries if entry["labels"]
+            )
+            lines.append(f"  {name}: {total:g}" + (f" ({breakdown})" if breakdown else ""))
+
+        return "\n".join(lines)
+
+
+# Registry the pipeline reports to
+METRICS = Metrics()
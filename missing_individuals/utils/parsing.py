@@ -0,0 +1,93 @@
+import re
+from typing import Union
+
+from bs4 import BeautifulSoup
+from bs4.element import Comment, NavigableString, Tag
+
+# Elements rendered on their own line, used to mimic the webdriver ``.text``
+# property (innerText) when working from a static page snapshot.
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'dd', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3',
+    'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre',
+    'section', 'table', 'tr', 'ul',
+}
+SKIPPED_TAGS = {'head', 'noscript', 'script', 'style', 'template'}
+WHITESPACE = re.compile(r'\s+')
+
+
+def make_soup(page_source: Union[str, BeautifulSoup]) -> BeautifulSoup:
+    """
+    Parses a page source into a BeautifulSoup tree using the standard library parser.
+    Args:
+        page_source: raw HTML of the page, or a page already parsed, which is returned as it is
+    Returns:
+        Parsed BeautifulSoup document
+    """
+    if isinstance(page_source, BeautifulSoup):
+        return page_source
+    return BeautifulSoup(page_source, 'html.parser')
+
+
+def _is_hidden(tag: Tag) -> bool:
+    style = (tag.get('style') or '').replace(' ', '').lower()
+    return tag.has_attr('hidden') or 'display:none' in style or 'visibility:hidden' in style
+
+
+def _collect_text(tag: Tag, parts: list) -> None:
+    for child in tag.children:
+        if isinstance(child, Comment):
+            continue
+        if isinstance(child, NavigableString):
+            parts.append(WHITESPACE.sub(' ', str(child)))
+            continue
+        if child.name in SKIPPED_TAGS or _is_hidden(child):
+            continue
+        if child.name == 'br':
+            parts.append('\n')
+            continue
+
+        is_block = child.name in BLOCK_TAGS
+        if is_block:
+            parts.append('\n')
+        _collect_text(child, parts)
+        if is_block:
+            parts.append('\n')
+
+
+def visible_text(tag: Tag) -> str:
+    """
+    Returns the rendered text of an element in the same shape as the webdriver ``.text``
+    property: whitespace collapsed within lines, one line per block element or <br>,
+    and empty lines dropped.
+    Args:
+        tag: element to extract the text from
+    Returns:
+        Visible text of the element
+    """
+    parts = []
+    _collect_text(tag, parts)
+    lines = (' '.join(line.split()) for line in ''.join(parts).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def find_visible(tag: Tag, class_name: str = None, tag_name: str = None) -> list:
+    """
+    Finds all visible descendants of an element by class name or tag name, matching the
+    semantics of ``ec.visibility_of_any_elements_located``.
+    Args:
+        tag: element to search within
+        class_name: class name to search for
+        tag_name: tag name to search for
+    Returns:
+        List of visible matching elements, in document order
+    """
+    if class_name is not None:
+        found = tag.find_all(class_=class_name)
+    else:
+        found = tag.find_all(tag_name)
+
+    return [
+        element for element in found
+        if not any(_is_hidden(parent) for parent in [element, *element.parents])
+    ]
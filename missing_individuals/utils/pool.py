@@ -0,0 +1,219 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+from missing_individuals.utils.metrics import METRICS
+from missing_individuals.utils.retry import CircuitOpenError, RetryPolicy, RetryQueue, is_session_lost
+
+
+class _OrderedResults:
+    """
+    Reorder buffer: accepts results in completion order and releases them in input order,
+    either to a sink or to an in-memory list. An item keeps its slot while it is deferred for a
+    retry, so it holds back the results after it until it succeeds or finally fails (skip).
+    """
+
+    _SKIPPED = object()
+
+    def __init__(self, sink: Optional[Callable[[Any], None]] = None):
+        self.sink = sink
+        self.collected: List[Any] = []
+        self.pending: dict = {}
+        self.next_index = 0
+        self.lock = threading.Lock()
+
+    def add(self, index: int, result: Any) -> None:
+        with self.lock:
+            self.pending[index] = result
+            self._release()
+
+    def skip(self, index: int) -> None:
+        self.add(index, self._SKIPPED)
+
+    def _release(self) -> None:
+        while self.next_index in self.pending:
+            result = self.pending.pop(self.next_index)
+            self.next_index += 1
+            if result is self._SKIPPED:
+                continue
+            if self.sink is not None:
+                self.sink(result)
+            else:
+                self.collected.append(result)
+
+    def results(self) -> List[Any]:
+        return self.collected
+
+
+class WorkerPool:
+    """
+    Runs a function over a list of items on N worker threads, each holding its own session
+    (typically a headless webdriver). Scraping is bound by page wall time rather than CPU,
+    so threads give close to linear speed up with the number of workers.
+
+    Items are pulled from a shared queue, so a slow page only holds up its own worker.
+    Results are returned in the order of the input items, whatever order they complete in.
+
+    With a retry policy, each attempt runs within the policy deadline and through its circuit
+    breaker (items are taken to be URLs), and items failing with a transient error are deferred
+    to the back of the queue with a backoff rather than retried on the spot. Items turned away by
+    an open circuit are deferred until it lets a probe through, without counting as an attempt.
+
+    Args:
+        workers:
+            int - number of worker threads (and sessions)
+        session_factory:
+            callable - builds the per-worker session passed as the first argument to the mapped
+            function; if None, the function is called with None
+        session_closer:
+            callable - releases a session once its worker is done, e.g. lambda d: d.quit()
+        failure_budget:
+            int - number of failed items after which a worker gives up; its remaining work is
+            picked up by the other workers. Only final failures count, not deferred retries; a
+            session that fails to start also counts, and is tried again after the policy backoff
+        retry:
+            RetryPolicy - optional deadline, circuit breaker and backoff applied to every item.
+            A session whose attempt ran over the deadline, or whose browser died (see
+            is_session_lost), is closed and replaced
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        session_factory: Optional[Callable[[], Any]] = None,
+        session_closer: Optional[Callable[[Any], None]] = None,
+        failure_budget: int = 5,
+        retry: Optional[RetryPolicy] = None,
+    ):
+        if workers < 1:
+            raise ValueError("A worker pool needs at least one worker")
+
+        self.workers = workers
+        self.session_factory = session_factory
+        self.session_closer = session_closer
+        self.failure_budget = failure_budget
+        self.retry = retry
+        self.failures: List[Tuple[Any, Exception]] = []
+
+    def _close_session(self, session: Any) -> None:
+        if session is not None and self.session_closer is not None:
+            try:
+                self.session_closer(session)
+            except Exception:
+                # A crashed session may fail to close, it is dropped all the same
+                METRICS.increment('session_close_failures')
+
+    def _start_session(self, failures: int) -> Any:
+        try:
+            return self.session_factory()
+        except Exception as e:
+            METRICS.increment('session_start_failures', error=type(e).__name__)
+            if self.retry is not None:
+                time.sleep(self.retry.delay(failures + 1))
+            raise
+
+    def _work(
+        self,
+        func: Callable[[Any, Any], Any],
+        items: RetryQueue,
+        results: "_OrderedResults",
+        failed: list,
+        lock: threading.Lock,
+    ) -> None:
+        session = None
+        needs_session = self.session_factory is not None
+        failures = 0
+        try:
+            while failures < self.failure_budget:
+                work = items.get()
+                if work is None:
+                    return
+                index, item, attempt = work
+
+                if needs_session:
+                    # A browser that fails to start costs the worker, not the item it was given
+                    try:
+                        session = self._start_session(failures)
+                    except Exception:
+                        failures += 1
+                        items.defer((index, item, attempt), 0)
+                        continue
+                    needs_session = False
+
+                try:
+                    if self.retry is not None:
+                        result = self.retry.call(item, func, session, item)
+                    else:
+                        result = func(session, item)
+                except CircuitOpenError:
+                    # The host was not called, so the item waits out its circuit without spending
+                    # an attempt or failure budget
+                    items.defer((index, item, attempt), self.retry.circuit_delay(item))
+                    continue
+                except Exception as e:
+                    if self.retry is not None and self.retry.should_retry(e, attempt):
+                        METRICS.increment('retries', backend='pool')
+                        items.defer((index, item, attempt + 1), self.retry.delay(attempt, key=item))
+                    else:
+                        failures += 1
+                        with lock:
+                            failed.append((index, item, e))
+                        results.skip(index)
+                        items.done()
+
+                    # The abandoned attempt may still be driving the session, or the session crashed
+                    if is_session_lost(e):
+                        self._close_session(session)
+                        session = None
+                        needs_session = self.session_factory is not None
+                    continue
+
+                results.add(index, result)
+                items.done()
+        finally:
+            self._close_session(session)
+
+    def map(
+        self,
+        func: Callable[[Any, Any], Any],
+        items: Iterable[Any],
+        sink: Optional[Callable[[Any], None]] = None,
+    ) -> List[Any]:
+        """
+        Applies func(session, item) to every item.
+        Args:
+            func: function taking the worker session and an item
+            items: items to process
+            sink: optional function receiving each result as soon as every earlier item is done,
+                so results stream out in input order without being held until the end. An item
+                deferred for a retry holds back the results after it until it is done
+        Returns:
+            Results of the successful items, in input order (empty if a sink is given). Failed items
+            (and items left over once every worker has spent its failure budget) are recorded in
+            self.failures.
+        """
+        work_queue = RetryQueue()
+        for index, item in enumerate(items):
+            work_queue.put((index, item, 1))
+
+        results = _OrderedResults(sink=sink)
+        failed = []
+        lock = threading.Lock()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                executor.submit(self._work, func, work_queue, results, failed, lock)
+                for _ in range(self.workers)
+            ]
+            for future in futures:
+                future.result()
+
+        # Anything still queued was abandoned by workers that ran out of failure budget
+        for index, item, _ in work_queue.drain():
+            failed.append((index, item, RuntimeError("All workers exhausted their failure budget")))
+            results.skip(index)
+
+        self.failures = [(item, error) for _, item, error in sorted(failed, key=lambda failure: failure[0])]
+
+        return results.results()
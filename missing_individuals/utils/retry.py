@@ -0,0 +1,374 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from selenium.common.exceptions import (InvalidSessionIdException, NoSuchElementException,
+                                        NoSuchWindowException, TimeoutException, WebDriverException)
+
+from missing_individuals.utils.metrics import METRICS
+
+# HTTP statuses worth retrying: request timeouts, rate limiting and server side errors
+TRANSIENT_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised when a page is not done within its deadline.
+    """
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised instead of making a call while the circuit breaker of its host is open.
+    """
+
+
+# Errors that say nothing about the page itself, so trying again later may succeed. Of the
+# timeouts, only page deadlines and network timeouts are here: selenium waits that run out are not
+TRANSIENT_ERRORS: Tuple[type, ...] = (
+    DeadlineExceeded,
+    CircuitOpenError,
+    TimeoutError,
+    ConnectionError,
+    requests.ConnectionError,
+    requests.Timeout,
+)
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Classifies an error as transient (timeouts, dropped connections, rate limiting, server errors,
+    crashed browser sessions) or permanent (missing pages, pages that cannot be parsed).
+    Args:
+        error: error raised while processing a page
+    Returns:
+        True if the page is worth trying again
+    """
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in TRANSIENT_STATUSES
+    if isinstance(error, TRANSIENT_ERRORS):
+        return True
+    # Other webdriver errors are lost or crashed sessions, apart from waits that run out and
+    # elements that are not there
+    return isinstance(error, WebDriverException) and not isinstance(error, (TimeoutException, NoSuchElementException))
+
+
+# Webdriver errors raised once the browser session itself is gone
+SESSION_LOST_ERRORS: Tuple[type, ...] = (InvalidSessionIdException, NoSuchWindowException)
+
+# Messages of the generic WebDriverException raised when Chrome or its tab has died
+SESSION_LOST_MESSAGES = ("disconnected", "tab crashed", "chrome not reachable")
+
+
+def is_session_lost(error: BaseException) -> bool:
+    """
+    Tells whether the session a page was processed in can no longer be trusted after an error: the
+    attempt ran over its deadline (and may still be driving the session), or the browser session
+    died (invalid session, closed window, disconnected or crashed Chrome). Waits that run out and
+    other element errors leave the session healthy.
+    Args:
+        error: error raised while processing a page
+    Returns:
+        True if the session should be closed and replaced
+    """
+    if isinstance(error, (DeadlineExceeded,) + SESSION_LOST_ERRORS):
+        return True
+    if type(error) is not WebDriverException:
+        return False
+    message = (error.msg or "").lower()
+    return any(marker in message for marker in SESSION_LOST_MESSAGES)
+
+
+def run_with_deadline(deadline: Optional[float], func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Calls func(*args), giving up once deadline seconds have passed.
+    The call runs on a daemon thread, which is abandoned (not stopped) when the deadline passes:
+    whatever session it was using should be closed and replaced by the caller.
+    Args:
+        deadline: seconds allowed for the call, or None for no limit
+        func: function to call
+        args: arguments of the call
+    Returns:
+        Result of the call
+    Raises:
+        DeadlineExceeded: if the call has not returned in time
+    """
+    if deadline is None:
+        return func(*args)
+
+    outcome = {}
+
+    def target() -> None:
+        try:
+            outcome["result"] = func(*args)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(deadline)
+
+    if thread.is_alive():
+        METRICS.increment("deadline_exceeded")
+        raise DeadlineExceeded(f"No result after {deadline:g}s")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def _host(key: str) -> str:
+    return urlsplit(key).netloc or key
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker per host. After `threshold` consecutive transient failures against a host its
+    circuit opens, and calls to it fail fast with CircuitOpenError for `cooldown` seconds. The first
+    call after the cooldown is let through as a probe: success closes the circuit, failure opens it
+    for another cooldown.
+    Args:
+        threshold:
+            int - consecutive failures that open the circuit of a host
+        cooldown:
+            float - seconds a circuit stays open before a probe is let through
+        clock:
+            callable - monotonic clock, in seconds
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30, clock: Callable[[], float] = time.monotonic):
+        if threshold < 1:
+            raise ValueError("A circuit breaker needs a threshold of at least one failure")
+
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.failures: Dict[str, int] = {}
+        self.opened: Dict[str, float] = {}
+        self.probing: Dict[str, bool] = {}
+
+    def before(self, key: str) -> None:
+        """
+        Lets a call to the host of key (a URL or host name) go ahead, or raises CircuitOpenError.
+        """
+        host = _host(key)
+        with self.lock:
+            opened = self.opened.get(host)
+            if opened is None:
+                return
+            if self.probing.get(host) or self.clock() - opened < self.cooldown:
+                raise CircuitOpenError(f"Circuit open for {host}")
+            self.probing[host] = True
+
+    def retry_after(self, key: str) -> float:
+        """
+        Returns the seconds left before the circuit of the host of key lets a probe through.
+        """
+        with self.lock:
+            opened = self.opened.get(_host(key))
+            return 0.0 if opened is None else max(0.0, opened + self.cooldown - self.clock())
+
+    def record_success(self, key: str) -> None:
+        """
+        Records a call the host answered, closing its circuit.
+        """
+        host = _host(key)
+        with self.lock:
+            self.failures.pop(host, None)
+            self.opened.pop(host, None)
+            self.probing.pop(host, None)
+
+    def record_failure(self, key: str) -> None:
+        """
+        Records a transient failure of a call to the host, opening its circuit at the threshold or
+        when a probe fails.
+        """
+        host = _host(key)
+        with self.lock:
+            self.failures[host] = self.failures.get(host, 0) + 1
+            probe_failed = self.probing.pop(host, False)
+            if probe_failed or (host not in self.opened and self.failures[host] >= self.threshold):
+                METRICS.increment("circuit_opened", host=host)
+                self.opened[host] = self.clock()
+
+    def is_open(self, key: str) -> bool:
+        """
+        Returns True if the circuit of the host of key is open (or letting a probe through).
+        """
+        with self.lock:
+            return _host(key) in self.opened
+
+
+class RetryPolicy:
+    """
+    How failed pages are handled: a hard deadline on each attempt, a circuit breaker per host, and
+    exponential backoff with full jitter between the attempts at a page. Only transient errors
+    (see is_transient) are retried.
+    Args:
+        max_attempts:
+            int - attempts at each page, including the first
+        base_delay:
+            float - upper bound of the first backoff in seconds, doubled for every further retry
+        max_delay:
+            float - cap of the backoff in seconds
+        deadline:
+            float - seconds allowed for one attempt at a page, None for no limit
+        breaker:
+            CircuitBreaker - optional circuit breaker shared by every attempt
+        seed:
+            int - optional seed of the jitter
+    """
+
+    # Seconds between checks of a circuit whose probe is in flight
+    PROBE_POLL: float = 1.0
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 1,
+        max_delay: float = 60,
+        deadline: Optional[float] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        seed: Optional[int] = None,
+    ):
+        if max_attempts < 1:
+            raise ValueError("A retry policy needs at least one attempt")
+
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.breaker = breaker
+        self.random = random.Random(seed)
+
+    def call(self, key: str, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Makes one attempt at a page: checks the circuit of its host, then calls func(*args) within
+        the deadline and records the outcome with the circuit breaker.
+        Args:
+            key: URL of the page (its host is the circuit breaker key)
+            func: function processing the page
+            args: arguments of func
+        Returns:
+            Result of func
+        """
+        if self.breaker is not None:
+            self.breaker.before(key)
+
+        try:
+            result = run_with_deadline(self.deadline, func, *args)
+        except Exception as e:
+            if self.breaker is not None:
+                if is_transient(e):
+                    self.breaker.record_failure(key)
+                else:
+                    # The host answered, the page itself is the problem
+                    self.breaker.record_success(key)
+            raise
+
+        if self.breaker is not None:
+            self.breaker.record_success(key)
+        return result
+
+    def should_retry(self, error: BaseException, attempt: int) -> bool:
+        """
+        Returns True if a page that failed on its attempt-th attempt should be tried again.
+        """
+        return attempt < self.max_attempts and is_transient(error)
+
+    def circuit_delay(self, key: str) -> float:
+        """
+        Returns the wait before trying again a page turned away by the open circuit of its host
+        (CircuitOpenError), which does not count as an attempt: the rest of the cooldown, and at
+        least PROBE_POLL seconds while another call probes the host.
+        """
+        retry_after = self.breaker.retry_after(key) if self.breaker is not None else 0.0
+        return max(retry_after, self.PROBE_POLL)
+
+    def delay(self, attempt: int, key: Optional[str] = None) -> float:
+        """
+        Returns the backoff before the next attempt at a page that failed attempt times: a random
+        delay of up to base_delay * 2 ** (attempt - 1) seconds, capped at max_delay, and no shorter
+        than the time left before the circuit of its host lets a probe through.
+        """
+        delay = self.random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if key is not None and self.breaker is not None:
+            delay = max(delay, self.breaker.retry_after(key))
+        return delay
+
+
+class RetryQueue:
+    """
+    Thread-safe queue of work items, each with the time it becomes ready. Items come out in order of
+    ready time (then insertion order), so fresh items are served in input order and deferred
+    retries are picked up once their backoff has passed, without holding up a worker meanwhile.
+
+    Items count as outstanding from put until done, so get can tell an empty queue from one whose
+    remaining items are in flight and may still be deferred.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.heap: List[Tuple[float, int, Any]] = []
+        self.counter = itertools.count()
+        self.outstanding = 0
+        self.condition = threading.Condition()
+
+    def put(self, item: Any) -> None:
+        """
+        Adds a new item, ready straight away.
+        """
+        with self.condition:
+            self.outstanding += 1
+            heapq.heappush(self.heap, (self.clock(), next(self.counter), item))
+            self.condition.notify()
+
+    def defer(self, item: Any, delay: float) -> None:
+        """
+        Puts back an item taken with get, to be ready again after delay seconds.
+        """
+        with self.condition:
+            heapq.heappush(self.heap, (self.clock() + delay, next(self.counter), item))
+            self.condition.notify()
+
+    def done(self) -> None:
+        """
+        Marks an item taken with get as finished, whether it succeeded or finally failed.
+        """
+        with self.condition:
+            self.outstanding -= 1
+            self.condition.notify_all()
+
+    def get(self) -> Optional[Any]:
+        """
+        Takes the next ready item, waiting for deferred items to become ready.
+        Returns:
+            Next item, or None once every item is done
+        """
+        with self.condition:
+            while True:
+                if self.heap:
+                    wait = self.heap[0][0] - self.clock()
+                    if wait <= 0:
+                        return heapq.heappop(self.heap)[2]
+                elif self.outstanding == 0:
+                    return None
+                else:
+                    wait = None
+                self.condition.wait(wait)
+
+    def drain(self) -> List[Any]:
+        """
+        Removes and returns every queued item, ready or not, in queue order.
+        """
+        with self.condition:
+            items = [item for _, _, item in sorted(self.heap)]
+            self.heap = []
+            self.outstanding -= len(items)
+            self.condition.notify_all()
+            return items
@@ -12,7 +12,7 @@ def build_dirs() -> Union[str, os.PathLike]:
     data_path = f"{REPO_PATH}/data"
     chromedriver_path = f"{REPO_PATH}/chromedrivers"
 
+    # The chromedriver directory is only created when a driver is installed into it
     Path(data_path).mkdir(parents=True, exist_ok=True)
-    Path(chromedriver_path).mkdir(parents=True, exist_ok=True)
 
     return data_path, chromedriver_path
@@ -0,0 +1,329 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from missing_individuals.utils.metrics import METRICS
+
+
+def default_worker_id() -> str:
+    """
+    Returns an identifier unique to this process across scrape boxes, e.g. "box-1-4242".
+    """
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    """
+    Durable queue of the URLs of one crawl, kept in a SQLite database that several processes (on one
+    box, or on several boxes through a shared filesystem) consume together.
+
+    Workers lease a batch of URLs for lease_seconds, and ack each URL once its record is on disk.
+    A URL is leased to one worker at a time, so no case is fetched twice while its worker is alive.
+    Leases of crashed or stuck workers expire, and are reclaimed for other workers by the next
+    lease call. Failed URLs go back to the queue until they have been leased max_attempts times.
+
+    Each worker registers the file it writes its records to, and merge combines these files,
+    keeping for every URL only the record of the worker whose ack counted.
+
+    Lease times use the wall clock, as they are compared across boxes: keep the boxes' clocks in
+    sync well within lease_seconds. The database uses SQLite's default rollback journal rather
+    than WAL, which does not work over network filesystems; the filesystem must support locking.
+
+    Args:
+        path:
+            str - path of the SQLite database file, created if it does not exist
+        worker_id:
+            str - identifier of this worker, defaults to default_worker_id()
+        lease_seconds:
+            float - time a worker has to ack a leased URL before it is handed to another worker
+        max_attempts:
+            int - leases of a URL after which a failure is final
+        timeout:
+            float - seconds to wait for another worker's write to finish before giving up
+    """
+
+    STATES = ("pending", "leased", "done", "failed")
+
+    def __init__(
+        self,
+        path: str,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = 1800,
+        max_attempts: int = 3,
+        timeout: float = 60,
+    ):
+        self.path = path
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+
+        # Transactions are opened explicitly, so leases can take the write lock up front
+        self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS items (
+                position INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                state TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                record_key TEXT,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS items_state ON items (state, position);
+            CREATE TABLE IF NOT EXISTS workers (
+                worker TEXT PRIMARY KEY,
+                output TEXT,
+                started TEXT,
+                finished TEXT
+            );
+            CREATE TABLE IF NOT EXISTS metadata (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            """
+        )
+
+    def _transaction(self, statements) -> Any:
+        # Runs statements(cursor) in an immediate (write locked) transaction
+        with self.lock:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(cursor)
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+            return result
+
+    def add(self, urls: Iterable[str]) -> int:
+        """
+        Queues URLs in the given order, skipping any already in the queue (in any state), so
+        discovery can safely be run more than once.
+        Returns:
+            Number of URLs added
+        """
+        urls = [(url,) for url in urls]
+
+        def statements(cursor: sqlite3.Cursor) -> int:
+            before = cursor.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+            cursor.executemany("INSERT OR IGNORE INTO items (url) VALUES (?)", urls)
+            return cursor.execute("SELECT COUNT(*) FROM items").fetchone()[0] - before
+
+        return self._transaction(statements)
+
+    def set_metadata(self, **values: Any) -> None:
+        """
+        Stores JSON serialisable values shared by every worker of the crawl (e.g. its scrape date).
+        """
+        self._transaction(lambda cursor: cursor.executemany(
+            "INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)",
+            [(key, json.dumps(value)) for key, value in values.items()],
+        ))
+
+    def metadata(self) -> Dict[str, Any]:
+        with self.lock:
+            rows = self.connection.execute("SELECT key, value FROM metadata").fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def register(self, output: str) -> None:
+        """
+        Records the file this worker writes its records to, for merge.
+        """
+        self._transaction(lambda cursor: cursor.execute(
+            """
+            INSERT INTO workers (worker, output, started) VALUES (?, ?, datetime('now'))
+            ON CONFLICT(worker) DO UPDATE SET output = excluded.output, finished = NULL
+            """,
+            (self.worker_id, os.path.abspath(output)),
+        ))
+
+    def finish(self) -> None:
+        """
+        Records that this worker has stopped taking work.
+        """
+        self._transaction(lambda cursor: cursor.execute(
+            "UPDATE workers SET finished = datetime('now') WHERE worker = ?", (self.worker_id,)))
+
+    def lease(self, n: int) -> List[str]:
+        """
+        Leases up to n URLs to this worker, in queue order, after reclaiming expired leases.
+        Returns:
+            Leased URLs, empty if nothing is pending (other workers may still hold leases)
+        """
+        def statements(cursor: sqlite3.Cursor) -> List[str]:
+            now = time.time()
+            reclaimed = cursor.execute(
+                """
+                UPDATE items SET state = 'pending', worker = NULL, lease_expires = NULL
+                WHERE state = 'leased' AND lease_expires < ?
+                """,
+                (now,),
+            ).rowcount
+            if reclaimed:
+                METRICS.increment("leases_reclaimed", reclaimed)
+
+            rows = cursor.execute(
+                """
+                UPDATE items SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1
+                WHERE position IN (
+                    SELECT position FROM items WHERE state = 'pending' ORDER BY position LIMIT ?
+                )
+                RETURNING position, url
+                """,
+                (self.worker_id, now + self.lease_seconds, n),
+            ).fetchall()
+            return [url for _, url in sorted(rows)]
+
+        return self._transaction(statements)
+
+    def renew(self, urls: Iterable[str]) -> None:
+        """
+        Extends this worker's leases on URLs it is still working on.
+        """
+        expires = time.time() + self.lease_seconds
+        self._transaction(lambda cursor: cursor.executemany(
+            "UPDATE items SET lease_expires = ? WHERE url = ? AND worker = ? AND state = 'leased'",
+            [(expires, url, self.worker_id) for url in urls],
+        ))
+
+    def ack(self, urls: Iterable[str], record_keys: Optional[Iterable[Any]] = None) -> int:
+        """
+        Marks URLs done by this worker, once their records are on disk. A URL whose lease expired
+        still counts if no other worker has leased it since; otherwise the ack is ignored and the
+        other worker's record is the one kept by merge.
+        Args:
+            urls: URLs whose records are written
+            record_keys: key of each URL's record in the output (e.g. its CASE_NUMBER), used by merge
+        Returns:
+            Number of URLs acked
+        """
+        urls = list(urls)
+        record_keys = [None] * len(urls) if record_keys is None else [
+            None if key is None else str(key) for key in record_keys]
+
+        def statements(cursor: sqlite3.Cursor) -> int:
+            acked = 0
+            for url, record_key in zip(urls, record_keys):
+                acked += cursor.execute(
+                    """
+                    UPDATE items SET state = 'done', worker = ?, lease_expires = NULL, record_key = ?, error = NULL
+                    WHERE url = ? AND (
+                        (state = 'leased' AND worker = ?) OR state = 'pending'
+                    )
+                    """,
+                    (self.worker_id, record_key, url, self.worker_id),
+                ).rowcount
+            return acked
+
+        acked = self._transaction(statements)
+        if acked < len(urls):
+            METRICS.increment("acks_ignored", len(urls) - acked)
+        return acked
+
+    def fail(self, url: str, error: Exception) -> None:
+        """
+        Gives a leased URL up after an error: it goes back to the queue for any worker, unless it
+        has been leased max_attempts times, in which case it is marked failed.
+        """
+        self._transaction(lambda cursor: cursor.execute(
+            """
+            UPDATE items SET
+                state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                worker = CASE WHEN attempts >= ? THEN worker END,
+                lease_expires = NULL,
+                error = ?
+            WHERE url = ? AND worker = ? AND state = 'leased'
+            """,
+            (self.max_attempts, self.max_attempts, repr(error), url, self.worker_id),
+        ))
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Returns the number of URLs in each state.
+        """
+        with self.lock:
+            rows = self.connection.execute("SELECT state, COUNT(*) FROM items GROUP BY state").fetchall()
+        counts = dict.fromkeys(self.STATES, 0)
+        counts.update(rows)
+        return counts
+
+    def is_finished(self) -> bool:
+        """
+        Returns True once no URL is pending or leased.
+        """
+        counts = self.counts()
+        return counts["pending"] == 0 and counts["leased"] == 0
+
+    def failed(self) -> Dict[str, str]:
+        """
+        Returns the URLs whose failure is final, with their last error.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT url, error FROM items WHERE state = 'failed' ORDER BY position").fetchall()
+        return dict(rows)
+
+    def merge(self, path: str, key_column: str = "CASE_NUMBER", chunk_size: int = 10000) -> int:
+        """
+        Combines the CSV files of every worker into one, in queue order. For each done URL only the
+        record acked by its worker is kept, so records written twice (after a lease expired on a
+        worker that was only slow) appear once.
+        Args:
+            path: path of the merged CSV file
+            key_column: column holding the record keys passed to ack
+            chunk_size: rows read from a worker file at a time
+        Returns:
+            Number of records written
+        """
+        with self.lock:
+            outputs = dict(self.connection.execute("SELECT worker, output FROM workers").fetchall())
+            done = self.connection.execute(
+                "SELECT worker, record_key, position FROM items WHERE state = 'done' AND record_key IS NOT NULL"
+            ).fetchall()
+
+        positions: Dict[str, Dict[str, int]] = {}
+        for worker, record_key, position in done:
+            positions.setdefault(worker, {})[record_key] = position
+
+        frames = []
+        for worker, keys in positions.items():
+            output = outputs.get(worker)
+            if output is None or not os.path.exists(output):
+                continue
+
+            # Values are carried over as written, without type inference
+            for chunk in pd.read_csv(output, dtype=str, keep_default_na=False, chunksize=chunk_size):
+                chunk = chunk[chunk[key_column].isin(keys)]
+                frames.append(chunk.assign(_position=chunk[key_column].map(keys)))
+
+        if not frames:
+            pd.DataFrame().to_csv(path, index=False)
+            return 0
+
+        merged = (
+            pd.concat(frames, ignore_index=True)
+            .sort_values("_position", kind="stable")
+            .drop_duplicates("_position")
+            .drop(columns="_position")
+        )
+        merged.to_csv(path, index=False)
+        return len(merged)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
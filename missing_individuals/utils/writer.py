@@ -0,0 +1,289 @@
+import glob
+import json
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+from missing_individuals.utils.metrics import METRICS
+
+
+class ChunkedWriter:
+    """
+    Streaming output stage for scraped records. Records are buffered and flushed in chunks of
+    `chunk_size` rows, so memory use is capped at one chunk however many records are written and
+    each row is only copied once.
+
+    Each flush appends to a CSV file and, if "parquet" or "arrow" are among the formats, adds a row
+    group to a Parquet file or a record batch to an Arrow IPC file. Without a schema, nested values
+    (dicts, lists) are stored as their string form, as in the CSV, and every columnar column is a
+    string column so that chunks always share one schema. With a schema, records are written with
+    its types (structs, lists, dates, ...); dictionary-encoded fields share one growing dictionary
+    across chunks.
+
+    Columnar files go next to the CSV, or into a partition directory of a dataset (one tree per
+    format), e.g. "data/missing_persons/parquet/scrape_date=2023-07-23/part.parquet", which pyarrow
+    reads back as one table with a "scrape_date" column.
+
+    Args:
+        path_stem:
+            str - output path without extension, e.g. "data/missing_persons_2023_07_23"
+        chunk_size:
+            int - number of records buffered before they are written out
+        formats:
+            sequence - any of "csv", "parquet" and "arrow"
+        columns:
+            sequence - output columns; taken from the first chunk if not given. A record with a
+            field outside the columns raises a ValueError, unless an extra_column is given
+        on_flush:
+            callable - called with the list of records, and the list of keys they were written
+            with, once they are written to disk
+        append:
+            bool - add to an existing CSV instead of replacing it (e.g. when resuming a run);
+            columnar output then goes to a new numbered file next to the existing ones
+        schema:
+            pyarrow.Schema - column types of the Parquet and Arrow output; also sets the columns
+        columnar_record:
+            callable - reshapes each record to fit the schema before it is written to Parquet or Arrow
+        dataset_dir:
+            str - root directory of a partitioned dataset to write the columnar files into
+        partition:
+            dict - partition values of this run within dataset_dir, e.g. {"scrape_date": "2023-07-23"}
+        extra_column:
+            str - column that the fields outside the columns are stored in, as a JSON object, for
+            records whose fields are not known in advance (e.g. headings read from the page)
+    """
+
+    FORMATS = ("csv", "parquet", "arrow")
+    COLUMNAR_FORMATS = ("parquet", "arrow")
+
+    def __init__(
+        self,
+        path_stem: str,
+        chunk_size: int = 500,
+        formats: Sequence[str] = ("csv",),
+        columns: Optional[Sequence[str]] = None,
+        on_flush: Optional[Callable[[List[Dict[str, Any]], List[Any]], None]] = None,
+        append: bool = False,
+        schema=None,
+        columnar_record: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+        dataset_dir: Optional[str] = None,
+        partition: Optional[Dict[str, Any]] = None,
+        extra_column: Optional[str] = None,
+    ):
+        unknown = set(formats) - set(self.FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown output formats: {sorted(unknown)}")
+
+        self.path_stem = path_stem
+        self.chunk_size = chunk_size
+        self.formats = tuple(formats)
+        self.on_flush = on_flush
+        self.append = append
+        self.schema = schema
+        self.columnar_record = columnar_record
+        self.dataset_dir = dataset_dir
+        self.partition = dict(partition or {})
+        self.extra_column = extra_column
+
+        if columns is not None:
+            self.columns = list(columns)
+        elif schema is not None:
+            self.columns = list(schema.names)
+        else:
+            self.columns = None
+
+        self.buffer: List[Dict[str, Any]] = []
+        self.keys: List[Any] = []
+        self.rows_written = 0
+        self._columnar_writers: Dict[str, Any] = {}
+        self._dictionaries: Dict[str, Dict[Any, int]] = {}
+
+        if dataset_dir is not None:
+            for extension in self.COLUMNAR_FORMATS:
+                if extension in self.formats:
+                    os.makedirs(self.partition_dir(extension), exist_ok=True)
+                    if not append:
+                        self._remove_parts(extension)
+
+        self.parquet_path = self._new_columnar_path("parquet")
+        self.arrow_path = self._new_columnar_path("arrow")
+
+        if append and os.path.exists(self.csv_path) and self.columns is None:
+            self.columns = list(pd.read_csv(self.csv_path, nrows=0).columns)
+        self._add_extra_column()
+
+    @property
+    def csv_path(self) -> str:
+        return f"{self.path_stem}.csv"
+
+    def partition_dir(self, extension: str) -> Optional[str]:
+        """
+        Returns the directory the files of one columnar format go into, e.g.
+        "data/missing_persons/parquet/scrape_date=2023-07-23", or None without a dataset_dir.
+        """
+        if self.dataset_dir is None:
+            return None
+        partitions = (f"{key}={value}" for key, value in self.partition.items())
+        return os.path.join(self.dataset_dir, extension, *partitions)
+
+    def _columnar_stem(self, extension: str) -> str:
+        if self.dataset_dir is None:
+            return self.path_stem
+        return os.path.join(self.partition_dir(extension), "part")
+
+    def _remove_parts(self, extension: str) -> None:
+        # A fresh run replaces the partition, as it replaces the CSV
+        stem = glob.escape(self._columnar_stem(extension))
+        for path in glob.glob(f"{stem}.{extension}") + glob.glob(f"{stem}-*.{extension}"):
+            os.remove(path)
+
+    def _new_columnar_path(self, extension: str) -> str:
+        stem = self._columnar_stem(extension)
+        path = f"{stem}.{extension}"
+
+        n = 0
+        while self.append and os.path.exists(path):
+            n += 1
+            path = f"{stem}-{n}.{extension}"
+        return path
+
+    def _add_extra_column(self) -> None:
+        if self.extra_column is not None and self.columns is not None and self.extra_column not in self.columns:
+            self.columns.append(self.extra_column)
+
+    def _fit_columns(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        # Checked as records come in, so a bad record is reported before anything is buffered
+        unknown = [key for key in record if key not in self.columns]
+        if not unknown:
+            return record
+
+        if self.extra_column is None:
+            raise ValueError(f"Record has fields that are not among the output columns: {unknown}")
+
+        METRICS.increment("extra_fields", len(unknown))
+        fitted = {key: value for key, value in record.items() if key not in unknown}
+        fitted[self.extra_column] = json.dumps({key: record[key] for key in unknown}, default=str)
+        return fitted
+
+    def write(self, record: Dict[str, Any], key: Any = None) -> None:
+        """
+        Adds a record to the buffer, flushing it once it holds a full chunk.
+        Args:
+            record: record to write
+            key: optional identifier of the record (e.g. its URL), handed back to on_flush
+        Raises:
+            ValueError: if the record has fields outside the output columns and there is no extra_column
+        """
+        if self.columns is not None:
+            record = self._fit_columns(record)
+
+        self.buffer.append(record)
+        self.keys.append(key)
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def write_many(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.write(record)
+
+    def _frame(self, records: List[Dict[str, Any]]) -> pd.DataFrame:
+        if self.columns is None:
+            # The first chunk sets the columns, so every record of it fits them
+            self.columns = list(dict.fromkeys(key for record in records for key in record))
+            self._add_extra_column()
+
+        return pd.DataFrame.from_records(records, columns=self.columns)
+
+    def _encode_dictionary(self, name: str, values: List[Any], data_type):
+        """
+        Dictionary-encodes values against the dictionary of earlier chunks, extended with any new
+        values, so that every chunk's dictionary starts with the previous one.
+        """
+        import pyarrow as pa
+
+        codes = self._dictionaries.setdefault(name, {})
+        indices = [None if value is None else codes.setdefault(value, len(codes)) for value in values]
+        return pa.DictionaryArray.from_arrays(
+            pa.array(indices, type=data_type.index_type),
+            pa.array(list(codes), type=data_type.value_type),
+        )
+
+    def _columnar_table(self, records: List[Dict[str, Any]], df: pd.DataFrame):
+        import pyarrow as pa
+
+        if self.schema is None:
+            strings = df.apply(lambda column: column.map(lambda value: None if value is None else str(value)))
+            return pa.Table.from_pandas(
+                strings, schema=pa.schema([(column, pa.string()) for column in self.columns]), preserve_index=False)
+
+        if self.columnar_record is not None:
+            records = [self.columnar_record(record) for record in records]
+
+        arrays = []
+        for field in self.schema:
+            values = [record.get(field.name) for record in records]
+            if pa.types.is_dictionary(field.type):
+                arrays.append(self._encode_dictionary(field.name, values, field.type))
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+    def _write_columnar(self, extension: str, table) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = self._columnar_writers.get(extension)
+        if writer is None:
+            if extension == "parquet":
+                writer = pq.ParquetWriter(self.parquet_path, table.schema)
+            else:
+                writer = pa.ipc.new_file(
+                    self.arrow_path, table.schema, options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+            self._columnar_writers[extension] = writer
+        writer.write_table(table)
+
+    def flush(self) -> None:
+        """
+        Writes the buffered records out and empties the buffer.
+        """
+        if not self.buffer:
+            return
+
+        records, self.buffer = self.buffer, []
+        keys, self.keys = self.keys, []
+
+        with METRICS.timer("write"):
+            df = self._frame(records)
+
+            if "csv" in self.formats:
+                new_file = self.rows_written == 0 and not (self.append and os.path.exists(self.csv_path))
+                df.to_csv(self.csv_path, mode="w" if new_file else "a", header=new_file, index=False)
+            columnar_formats = [extension for extension in self.COLUMNAR_FORMATS if extension in self.formats]
+            if columnar_formats:
+                table = self._columnar_table(records, df)
+                for extension in columnar_formats:
+                    self._write_columnar(extension, table)
+
+        self.rows_written += len(records)
+        if self.on_flush is not None:
+            self.on_flush(records, keys)
+
+    def close(self) -> None:
+        """
+        Flushes any remaining records and closes the output files.
+        """
+        self.flush()
+
+        if "csv" in self.formats and self.rows_written == 0 and not (self.append and os.path.exists(self.csv_path)):
+            pd.DataFrame(columns=self.columns).to_csv(self.csv_path, index=False)
+
+        for writer in self._columnar_writers.values():
+            writer.close()
+        self._columnar_writers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,14 +1,212 @@
+import argparse
+import json
+import os
+import re
+import shlex
+import subprocess
 import sys
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional
 
+REPO_PATH = Path(__file__).resolve().parent.parent
 
-def main():
+# Scraper entry points, run as `python -m <module>`; new sources only need an entry here
+SOURCES: Dict[str, str] = {
+    "missing_persons": "missing_individuals.missing_persons.src.run",
+    "missing_people": "missing_individuals.missing_people.src.run",
+}
 
-    folder_path = '../'
-    sys.path.append(folder_path)
+# Progress lines printed by the scrapers, e.g. "Running for URL 12 out of 340"
+PROGRESS = re.compile(r"(\d+) out of (\d+)")
 
-    from missing_individuals.missing_persons.src.run import \
-        main as missing_persons_run
-    missing_persons_run()
+
+def share_budget(budget: int, sources: List[str]) -> Dict[str, int]:
+    """
+    Splits a concurrency budget evenly over the sources.
+    Args:
+        budget: total number of browser sessions (or, with --async-crawl, requests in flight),
+            at least one per source. A source's discovery session is closed, or handed to its single
+            worker, before its workers start, so the workers get every slot of the source
+        sources: names of the sources run
+    Returns:
+        Dictionary of the slots of each source, adding up to at most budget
+    """
+    if budget < len(sources):
+        raise ValueError(f"A budget of {budget} cannot give each of {len(sources)} sources a slot")
+
+    share, remainder = divmod(budget, len(sources))
+    return {source: share + (n < remainder) for n, source in enumerate(sources)}
+
+
+class SourceRun:
+    """
+    One scraper running as a child process, with its output prefixed by the source name and its
+    progress tracked from the lines it prints.
+    Args:
+        name:
+            str - source name, a key of SOURCES
+        args:
+            list - command line arguments of the scraper
+        log_path:
+            str - file the scraper's full output is written to
+    """
+
+    def __init__(self, name: str, args: List[str], log_path: str):
+        self.name = name
+        self.args = args
+        self.log_path = log_path
+
+        self.done = 0
+        self.total = None
+        self.started = None
+        self.finished = None
+        self.returncode = None
+
+    def start(self) -> "SourceRun":
+        self.started = time.time()
+        self.process = subprocess.Popen(
+            [sys.executable, "-u", "-m", SOURCES[self.name], *self.args],
+            cwd=REPO_PATH,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+        )
+        self.reader = threading.Thread(target=self._follow, daemon=True)
+        self.reader.start()
+        return self
+
+    def _follow(self) -> None:
+        with open(self.log_path, "w") as log:
+            for line in self.process.stdout:
+                log.write(line)
+
+                progress = PROGRESS.search(line)
+                if progress:
+                    self.done, self.total = int(progress.group(1)), int(progress.group(2))
+                else:
+                    print(f"[{self.name}] {line}", end="", flush=True)
+
+        self.returncode = self.process.wait()
+        self.finished = time.time()
+
+    def wait(self) -> int:
+        self.reader.join()
+        return self.returncode
+
+    @property
+    def running(self) -> bool:
+        return self.reader.is_alive()
+
+    def progress(self) -> str:
+        if self.returncode is not None:
+            state = "done" if self.returncode == 0 else f"failed ({self.returncode})"
+        elif self.total:
+            state = f"{self.done}/{self.total}"
+        else:
+            state = "starting"
+        return f"{self.name} {state}"
+
+    def summary(self) -> dict:
+        return {
+            "args": self.args,
+            "returncode": self.returncode,
+            "seconds": round(self.finished - self.started, 1) if self.finished else None,
+            "done": self.done,
+            "total": self.total,
+            "log": self.log_path,
+        }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(
+        description="Run every scraper concurrently, writing their outputs into one dated run directory")
+    parser.add_argument(
+        '--sources', nargs='+', choices=sorted(SOURCES), default=list(SOURCES),
+        help="Sources to scrape (defaults to all)")
+    parser.add_argument(
+        '--budget', type=int, default=4,
+        help="Browser sessions shared by all sources (requests in flight with --async-crawl); at least one "
+             "per source. Each source closes its discovery session before its workers start")
+    parser.add_argument(
+        '--async-crawl', action='store_true',
+        help="Scrape every source with the trio crawl engine over HTTP instead of Chrome")
+    parser.add_argument(
+        '--lean-browser', action='store_true',
+        help="Run Chrome with the lean profile in every source")
+    parser.add_argument(
+        '--run-dir', default=None,
+        help="Directory of this run's outputs (defaults to data/runs/<date>)")
+    parser.add_argument(
+        '--source-args', action='append', default=[], metavar='SOURCE=ARGS',
+        help="Extra arguments for one source, e.g. missing_persons='--parquet --snapshot'")
+    parser.add_argument(
+        '--progress-interval', type=float, default=30,
+        help="Seconds between progress reports")
+
+    args = parser.parse_args(argv)
+    if args.budget < len(args.sources):
+        parser.error(f"--budget must be at least the number of sources run ({len(args.sources)})")
+
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
+
+    args = parse_args(argv)
+
+    extra_args = {source: [] for source in args.sources}
+    for entry in args.source_args:
+        source, _, source_args = entry.partition('=')
+        if source not in extra_args:
+            raise SystemExit(f"--source-args names a source that is not run: {source}")
+        extra_args[source].extend(shlex.split(source_args))
+
+    run_dir = args.run_dir or str(REPO_PATH / "data" / "runs" / date.today().strftime("%Y_%m_%d"))
+    os.makedirs(f"{run_dir}/logs", exist_ok=True)
+
+    runs = []
+    for source, slots in share_budget(args.budget, args.sources).items():
+        source_args = ['--output-dir', run_dir]
+        if args.async_crawl:
+            source_args += ['--async-crawl', '--concurrency', str(slots)]
+        else:
+            source_args += ['--workers', str(slots)]
+        if args.lean_browser:
+            source_args.append('--lean-browser')
+
+        runs.append(SourceRun(source, source_args + extra_args[source], log_path=f"{run_dir}/logs/{source}.log"))
+
+    started = datetime.now()
+    for run in runs:
+        print(f"Starting {run.name}: {' '.join(run.args)}")
+        run.start()
+
+    while any(run.running for run in runs):
+        for run in runs:
+            run.reader.join(timeout=args.progress_interval / len(runs))
+        print("Progress: " + " | ".join(run.progress() for run in runs), flush=True)
+
+    for run in runs:
+        run.wait()
+
+    summary = {
+        "started": started.isoformat(timespec="seconds"),
+        "seconds": round((datetime.now() - started).total_seconds(), 1),
+        "budget": args.budget,
+        "sources": {run.name: run.summary() for run in runs},
+    }
+    with open(f"{run_dir}/run.json", "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"Run summary written to {run_dir}/run.json")
+
+    failed = [run.name for run in runs if run.returncode != 0]
+    if failed:
+        raise SystemExit(f"Sources failed: {', '.join(failed)}")
 
 
 if __name__ == "__main__":